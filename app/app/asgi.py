@@ -2,6 +2,9 @@
 ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Async views, such as the token endpoint at ``api/user/token/async/`` and the
+recipe read endpoints under ``api/recipe/*/async/``, run directly on the
+event loop when served through it.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
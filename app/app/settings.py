@@ -37,18 +37,21 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
-    'core',
-    'user'
+    'core.apps.CoreConfig',
+    'user.apps.UserConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -75,17 +78,124 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
+# Connections are kept for DB_CONN_MAX_AGE seconds (0 closes them after each
+# request) and health checked before their first use in a request. Behind a
+# transaction-level pooler such as PgBouncer set DB_POOLER=transaction:
+# server-side cursors cannot outlive a transaction there, so querysets are
+# iterated client side instead.
+
+DB_POOLER = os.environ.get('DB_POOLER', '')
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.environ.get(
+            'DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOLER == 'transaction',
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
     }
 }
 
+# Read replicas: DB_REPLICA_HOSTS lists the hosts of streaming replicas of
+# the database. Safe token requests to the recipe and user APIs read from a
+# random replica, unless the user wrote within the last DB_REPLICA_PIN_SECONDS
+# (keep it above DB_REPLICA_MAX_LAG so users read their own writes). Replicas
+# lagging more than DB_REPLICA_MAX_LAG seconds are skipped, unreachable ones
+# for DB_REPLICA_RETRY_INTERVAL seconds, falling back to the primary. Users
+# are pinned through the 'api' cache, which must then be shared by all
+# workers (see API_CACHE_BACKEND below).
+# Replicas mirror the default database in tests. DB_TEST_REPLICA_NAME adds a
+# separate 'replica_standin' database on the primary's server instead, which
+# only the routing tests read from.
+
+DB_REPLICA_HOSTS = [
+    host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host
+]
+DB_REPLICA_ALIASES = []
+
+for index, host in enumerate(DB_REPLICA_HOSTS, start=1):
+    DB_REPLICA_ALIASES.append(f'replica_{index}')
+    DATABASES[f'replica_{index}'] = dict(
+        DATABASES['default'],
+        HOST=host,
+        OPTIONS=dict(DATABASES['default']['OPTIONS']),
+        TEST={'MIRROR': 'default'},
+    )
+
+if os.environ.get('DB_TEST_REPLICA_NAME'):
+    DATABASES['replica_standin'] = dict(
+        DATABASES['default'],
+        NAME=os.environ['DB_TEST_REPLICA_NAME'],
+        OPTIONS=dict(DATABASES['default']['OPTIONS']),
+    )
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+DATABASE_REPLICAS = {
+    'ALIASES': DB_REPLICA_ALIASES,
+    'NAMESPACES': ('recipe', 'user'),
+    'PIN_SECONDS': int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5)),
+    'MAX_LAG': float(os.environ.get('DB_REPLICA_MAX_LAG', 2)),
+    'CHECK_INTERVAL': float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 1)),
+    'RETRY_INTERVAL': float(os.environ.get('DB_REPLICA_RETRY_INTERVAL', 10)),
+}
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# The 'api' cache holds per-user list responses. It defaults to local memory;
+# point API_CACHE_BACKEND/API_CACHE_LOCATION at a shared cache in production.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        'BACKEND': os.environ.get(
+            'API_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('API_CACHE_LOCATION', 'api'),
+        'TIMEOUT': int(os.environ.get('API_CACHE_TIMEOUT', 300)),
+    },
+}
+
+# Token authentication cache: a per-process LRU (LOCAL_SIZE entries,
+# LOCAL_TTL seconds) in front of the shared 'api' cache (SHARED_TTL seconds).
+
+AUTH_TOKEN_CACHE = {
+    'LOCAL_SIZE': int(os.environ.get('AUTH_TOKEN_LOCAL_SIZE', 1024)),
+    'LOCAL_TTL': int(os.environ.get('AUTH_TOKEN_LOCAL_TTL', 30)),
+    'SHARED_TTL': int(os.environ.get('AUTH_TOKEN_SHARED_TTL', 300)),
+}
+
+# Password hashing for the async token endpoint runs on a bounded pool of
+# PASSWORD_HASH_WORKERS threads with up to PASSWORD_HASH_QUEUE waiting jobs.
+
+PASSWORD_HASH_WORKERS = int(os.environ.get(
+    'PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 64))
+
+# The async read endpoints use non-blocking connections, up to
+# ASYNC_DB_POOL_SIZE per event loop (i.e. per ASGI worker process).
+
+ASYNC_DB_POOL_SIZE = int(os.environ.get('ASYNC_DB_POOL_SIZE', 10))
+
+# A SERVER_TIMING_SAMPLE_RATE share (0 to 1) of the recipe and user API
+# requests get a Server-Timing header with their query count and db, auth,
+# serializer and total time, also logged by core.middleware at INFO level.
+
+SERVER_TIMING = {
+    'SAMPLE_RATE': float(os.environ.get('SERVER_TIMING_SAMPLE_RATE', 0.01)),
+    'NAMESPACES': ('recipe', 'user'),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -126,4 +236,39 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# How uploaded media is served: 'django' streams files from Python, 'x-accel'
+# (nginx) and 'x-sendfile' (Apache, lighttpd) only authorize the request and
+# let the web server send the file. For nginx, MEDIA_ACCEL_PREFIX must be an
+# internal location aliased to MEDIA_ROOT.
+MEDIA_SERVE_MODE = os.environ.get('MEDIA_SERVE_MODE', 'django')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_SIGNED_URLS = os.environ.get('MEDIA_SIGNED_URLS') == '1'
+MEDIA_SIGNED_URL_WINDOW = int(os.environ.get('MEDIA_SIGNED_URL_WINDOW', 3600))
+
+# Seconds between in-process runs of the orphaned media collector (see the
+# gc_media command); 0 disables it.
+MEDIA_GC_INTERVAL = int(os.environ.get('MEDIA_GC_INTERVAL', 0))
+MEDIA_GC_MIN_AGE = int(os.environ.get('MEDIA_GC_MIN_AGE', 3600))
+
 AUTH_USER_MODEL = "core.User"
+
+RECIPE_IMAGE_VARIANTS = {
+    'thumb': (150, 150),
+    'medium': (600, 600),
+}
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_QUEUE = int(os.environ.get('RECIPE_IMAGE_QUEUE', 256))
+RECIPE_IMAGE_EAGER = os.environ.get('RECIPE_IMAGE_EAGER') == '1'
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_MAX_BYTES', 10 * 2 ** 20))
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 40_000_000))
+RECIPE_IMAGE_MAX_HEADER_BYTES = 256 * 2 ** 10
+RECIPE_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get('RECIPE_BULK_MAX_ITEMS', 1000))
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 100)),
+}
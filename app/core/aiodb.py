@@ -0,0 +1,207 @@
+import asyncio
+import contextlib
+import time
+import weakref
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+from core.timing import record_query
+
+# One pool per event loop and database alias: connections register their
+# sockets with the loop that opened them.
+_pools = weakref.WeakKeyDictionary()
+
+
+async def _wait(conn):
+    """Wait on the event loop until an async connection is ready
+
+    :param conn:
+    :return:
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+
+        ready = loop.create_future()
+        fd = conn.fileno()
+
+        def wake():
+            if not ready.done():
+                ready.set_result(None)
+
+        if state == psycopg2.extensions.POLL_READ:
+            loop.add_reader(fd, wake)
+            remove = loop.remove_reader
+        else:
+            loop.add_writer(fd, wake)
+            remove = loop.remove_writer
+
+        try:
+            await ready
+        finally:
+            remove(fd)
+
+
+async def connect(alias="default"):
+    """Open a non-blocking connection to a configured database
+
+    Uses psycopg2's asynchronous mode with the same parameters and session
+    settings as Django's own connection for the alias.
+
+    :param alias:
+    :return:
+    """
+    wrapper = connections[alias]
+    params = wrapper.get_connection_params()
+    params["options"] = " ".join(filter(None, (
+        params.get("options"), f"-c TimeZone={wrapper.timezone_name}")))
+
+    conn = psycopg2.connect(**params, async_=1)
+    await _wait(conn)
+    # Django's JSONField decodes jsonb itself.
+    psycopg2.extras.register_default_jsonb(conn, loads=lambda value: value)
+    return conn
+
+
+class AsyncPool:
+    """Bounded pool of non-blocking connections for one event loop
+
+    Connections are opened on demand up to max_size and reused after. A
+    connection whose query raised or was cancelled is closed instead of
+    being returned, since it may still have a query in flight.
+    """
+
+    def __init__(self, alias, max_size):
+        self.alias = alias
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_size)
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        """Borrow a connection, waiting while all of them are in use
+
+        :return:
+        """
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else \
+                await connect(self.alias)
+            try:
+                yield conn
+            except BaseException:
+                conn.close()
+                raise
+            if not conn.closed:
+                self._idle.append(conn)
+
+    def close(self):
+        """Close the idle connections
+
+        :return:
+        """
+        while self._idle:
+            self._idle.pop().close()
+
+
+def get_pool(alias="default"):
+    """Return the current event loop's pool for a database alias
+
+    :param alias:
+    :return:
+    """
+    pools = _pools.setdefault(asyncio.get_running_loop(), {})
+    if alias not in pools:
+        pools[alias] = AsyncPool(
+            alias, getattr(settings, "ASYNC_DB_POOL_SIZE", 10))
+    return pools[alias]
+
+
+def close_pools():
+    """Close the idle connections of every pool
+
+    :return:
+    """
+    for pools in list(_pools.values()):
+        for pool in pools.values():
+            pool.close()
+
+
+async def execute(sql, params, alias="default"):
+    """Run a query on a pooled connection and return all rows
+
+    :param sql:
+    :param params:
+    :param alias:
+    :return:
+    """
+    async with get_pool(alias).connection() as conn:
+        start = time.perf_counter()
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        await _wait(conn)
+        rows = cursor.fetchall() if cursor.description else []
+        cursor.close()
+        record_query(time.perf_counter() - start)
+        return rows
+
+
+async def _fetch(queryset):
+    """Run a queryset's SQL and return its compiler and converted rows
+
+    :param queryset:
+    :return:
+    """
+    compiler = queryset.query.get_compiler(queryset.db)
+    try:
+        sql, params = compiler.as_sql()
+    except EmptyResultSet:
+        return compiler, []
+
+    rows = await execute(sql, params, queryset.db)
+    if compiler.has_extra_select:
+        rows = [row[:compiler.col_count] for row in rows]
+
+    converters = compiler.get_converters(
+        [col for col, _, _ in compiler.select[:compiler.col_count]])
+    if converters:
+        rows = list(compiler.apply_converters(rows, converters))
+
+    return compiler, rows
+
+
+async def fetch_values(queryset):
+    """Evaluate a values() queryset without blocking the event loop
+
+    Returns the same dicts as iterating the queryset would.
+
+    :param queryset:
+    :return:
+    """
+    query = queryset.query
+    names = [*query.extra_select, *query.values_select,
+             *query.annotation_select]
+    _, rows = await _fetch(queryset)
+
+    return [dict(zip(names, row)) for row in rows]
+
+
+async def fetch_instances(queryset):
+    """Evaluate a plain model queryset without blocking the event loop
+
+    Only querysets selecting the model's own columns are supported, i.e.
+    without annotations, values() or select_related().
+
+    :param queryset:
+    :return:
+    """
+    compiler, rows = await _fetch(queryset)
+    names = [col.target.attname
+             for col, _, _ in compiler.select[:compiler.col_count]]
+
+    return [queryset.model.from_db(queryset.db, names, row) for row in rows]
@@ -1,5 +1,19 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core import checks
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core import signals  # noqa: F401
+        from core.routers import check_pin_cache
+
+        checks.register(check_pin_cache, checks.Tags.caches)
+
+        if settings.MEDIA_GC_INTERVAL:
+            from core.media_gc import start_periodic_gc
+            start_periodic_gc(
+                settings.MEDIA_GC_INTERVAL,
+                min_age=settings.MEDIA_GC_MIN_AGE)
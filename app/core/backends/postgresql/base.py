@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+
+from django.db.backends.postgresql import base
+
+logger = logging.getLogger(__name__)
+
+_stats = {"connects": 0, "seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+def get_connection_stats():
+    """Return how many connections this process opened and the time spent
+
+    :return: dict of connects and seconds
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_connection_stats():
+    """Zero the connection counters
+
+    :return:
+    """
+    with _stats_lock:
+        _stats.update(connects=0, seconds=0.0)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend with connection health checks and setup timing
+
+    With ``CONN_HEALTH_CHECKS`` a persistent connection is checked once per
+    request, right before its first use, so a connection dropped by the
+    server or a pooler is replaced instead of failing the request. Requests
+    that never touch the database pay nothing. Every new connection's setup
+    time, including session initialisation, is counted.
+    """
+
+    health_check_enabled = False
+    health_check_done = False
+    connect_seconds = None
+
+    def connect(self):
+        """Open a connection, recording how long it took
+
+        :return:
+        """
+        start = time.perf_counter()
+        super().connect()
+        self.connect_seconds = time.perf_counter() - start
+
+        self.health_check_enabled = self.settings_dict.get(
+            "CONN_HEALTH_CHECKS", False)
+        self.health_check_done = True
+
+        with _stats_lock:
+            _stats["connects"] += 1
+            _stats["seconds"] += self.connect_seconds
+        logger.debug("Connected to %s in %.1fms", self.alias,
+                     self.connect_seconds * 1000)
+
+    def ensure_connection(self):
+        """Replace a persistent connection that fails its health check
+
+        :return:
+        """
+        self.close_if_health_check_failed()
+        super().ensure_connection()
+
+    def close_if_health_check_failed(self):
+        """Close the connection if it fails its once-per-request check
+
+        :return:
+        """
+        if self.connection is None or not self.health_check_enabled or \
+                self.health_check_done:
+            return
+
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        """Close an errored or expired connection at a request boundary
+
+        A kept connection is health checked again before its next use.
+
+        :return:
+        """
+        super().close_if_unusable_or_obsolete()
+        # Reset afterwards: the checks above go through ensure_connection.
+        if self.connection is not None:
+            self.health_check_done = False
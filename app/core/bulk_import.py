@@ -0,0 +1,358 @@
+import csv
+import io
+import itertools
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from core.models import ImportCheckpoint, Ingredient, Tag
+from core.search import SEARCH_CONFIG
+
+IMPORT_FORMATS = ("ndjson", "csv")
+MAX_PRICE = Decimal("999.99")
+# Range of the integer column time_minutes is staged and stored in.
+MIN_TIME_MINUTES, MAX_TIME_MINUTES = -2 ** 31, 2 ** 31 - 1
+# Only the first errors are kept in the stats; the rest are counted.
+MAX_ERRORS = 100
+
+STAGING_SQL = """
+CREATE TEMP TABLE import_recipe (
+    id integer, user_id integer, title text, time_minutes integer,
+    price numeric(5, 2), link text
+) ON COMMIT DROP;
+CREATE TEMP TABLE import_recipe_tag (
+    recipe_id integer, tag_id integer
+) ON COMMIT DROP;
+CREATE TEMP TABLE import_recipe_ingredient (
+    recipe_id integer, ingredient_id integer
+) ON COMMIT DROP;
+"""
+
+# Ids are drawn from the recipe sequence before the rows are copied, so the
+# links can be staged alongside their recipes.
+RESERVE_IDS_SQL = """
+SELECT nextval(pg_get_serial_sequence('core_recipe', 'id'))
+FROM generate_series(1, %s)
+"""
+
+# The search vector is built from the staged names as the recipes are
+# inserted, weighted like core.search.update_search_vectors. The staging
+# tables are dropped explicitly as well, since a batch may run in a
+# savepoint of a longer transaction.
+LOAD_SQL = """
+INSERT INTO core_recipe
+    (id, user_id, title, time_minutes, price, link, image, image_variants,
+     updated_at, search_vector)
+SELECT r.id, r.user_id, r.title, r.time_minutes, r.price, r.link, '', '{}',
+    now(),
+    setweight(to_tsvector(%(config)s::regconfig, r.title), 'A') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce(t.names, '')), 'B')
+    || setweight(
+        to_tsvector(%(config)s::regconfig, coalesce(i.names, '')), 'B')
+FROM import_recipe r
+LEFT JOIN (
+    SELECT s.recipe_id, string_agg(tag.name, ' ') AS names
+    FROM import_recipe_tag s JOIN core_tag tag ON tag.id = s.tag_id
+    GROUP BY s.recipe_id
+) t ON t.recipe_id = r.id
+LEFT JOIN (
+    SELECT s.recipe_id, string_agg(ingredient.name, ' ') AS names
+    FROM import_recipe_ingredient s
+    JOIN core_ingredient ingredient ON ingredient.id = s.ingredient_id
+    GROUP BY s.recipe_id
+) i ON i.recipe_id = r.id;
+INSERT INTO core_recipe_tags (recipe_id, tag_id)
+SELECT recipe_id, tag_id FROM import_recipe_tag;
+INSERT INTO core_recipe_ingredients (recipe_id, ingredient_id)
+SELECT recipe_id, ingredient_id FROM import_recipe_ingredient;
+DROP TABLE import_recipe, import_recipe_tag, import_recipe_ingredient;
+"""
+
+
+class InvalidRow(ValueError):
+    """Raised for an input row that cannot be imported"""
+
+
+class CheckpointError(Exception):
+    """Raised when an import's checkpoint does not match its input"""
+
+
+def file_fingerprint(path):
+    """Return a fingerprint of a file's size and modification time
+
+    :param path:
+    :return:
+    """
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def read_rows(stream, input_format):
+    """Yield input rows as dicts
+
+    CSV rows use the export's layout, with tag and ingredient names joined
+    by "|".
+
+    :param stream: text stream
+    :param input_format: "ndjson" or "csv"
+    :return:
+    """
+    if input_format == "csv":
+        for row in csv.DictReader(stream):
+            for name in ("tags", "ingredients"):
+                value = row.get(name) or ""
+                row[name] = value.split("|") if value else []
+            yield row
+        return
+
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield InvalidRow(f"invalid JSON: {exc}")
+
+
+def _text(row, name, required=False):
+    value = row.get(name)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise InvalidRow(f"{name} is required")
+    if len(value) > 255:
+        raise InvalidRow(f"{name} is longer than 255 characters")
+    return value
+
+
+def _names(row, name):
+    values = row.get(name) or []
+    if not isinstance(values, list):
+        raise InvalidRow(f"{name} must be a list of names")
+    names = [str(value).strip() for value in values]
+    if any(not value or len(value) > 255 for value in names):
+        raise InvalidRow(f"{name} contains an empty or too long name")
+    return names
+
+
+def clean_row(row):
+    """Validate an input row
+
+    :param row:
+    :return: dict of user, title, time_minutes, price, link, tags and
+        ingredients
+    """
+    if isinstance(row, InvalidRow):
+        raise row
+    if not isinstance(row, dict):
+        raise InvalidRow("expected an object")
+
+    try:
+        time_minutes = int(row.get("time_minutes"))
+    except (TypeError, ValueError):
+        raise InvalidRow("time_minutes must be an integer")
+    if not MIN_TIME_MINUTES <= time_minutes <= MAX_TIME_MINUTES:
+        raise InvalidRow("time_minutes is out of range")
+
+    try:
+        price = Decimal(str(row.get("price"))).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError):
+        raise InvalidRow("price must be a number")
+    if not price.is_finite() or abs(price) > MAX_PRICE:
+        raise InvalidRow(f"price must be at most {MAX_PRICE}")
+
+    return {
+        "user": _text(row, "user"),
+        "title": _text(row, "title", required=True),
+        "time_minutes": time_minutes,
+        "price": price,
+        "link": _text(row, "link"),
+        "tags": _names(row, "tags"),
+        "ingredients": _names(row, "ingredients"),
+    }
+
+
+def _copy(cursor, table, columns, rows):
+    """Load rows into a table with COPY
+
+    :param cursor:
+    :param table:
+    :param columns:
+    :param rows:
+    :return:
+    """
+    buffer = io.StringIO()
+    # Quoted empty strings are loaded as such rather than as NULL.
+    csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer)
+
+
+def _resolve_users(rows, default_user):
+    """Return {email: user} for every user the rows refer to
+
+    :param rows:
+    :param default_user: user of rows without a "user" email
+    :return:
+    """
+    emails = {row["user"] for row in rows if row["user"]}
+    users = {
+        user.email: user
+        for user in get_user_model().objects.filter(email__in=emails)
+    }
+    users[""] = default_user
+    return users
+
+
+def import_batch(rows, default_user=None):
+    """Store a batch of cleaned rows
+
+    Tags and ingredients are resolved or created per user with one upsert
+    each. Recipes and their links are copied into temporary staging tables
+    and moved into the real tables with one INSERT ... SELECT per table,
+    which also fills in the search vectors.
+    Must run inside a transaction.
+
+    :param rows: cleaned rows
+    :param default_user:
+    :return: (ids of the imported recipes, errors as (row index, message))
+    """
+    users = _resolve_users(rows, default_user)
+    errors = []
+    accepted = []
+    for index, row in enumerate(rows):
+        user = users.get(row["user"])
+        if user is None:
+            errors.append((index, f"unknown user {row['user']!r}"
+                                  if row["user"] else "user is required"))
+        else:
+            accepted.append((user, row))
+
+    if not accepted:
+        return [], errors
+
+    names = {}
+    for user, row in accepted:
+        for key in ("tags", "ingredients"):
+            names.setdefault((user.pk, key), (user, set()))[1].update(
+                row[key])
+
+    resolved = {}
+    for (user_id, key), (user, wanted) in names.items():
+        if wanted:
+            model = Tag if key == "tags" else Ingredient
+            resolved[user_id, key] = model.objects.bulk_get_or_create(
+                user, sorted(wanted))
+
+    with connection.cursor() as cursor:
+        cursor.execute(RESERVE_IDS_SQL, [len(accepted)])
+        ids = [row[0] for row in cursor.fetchall()]
+
+        links = {"tags": [], "ingredients": []}
+        recipes = []
+        for recipe_id, (user, row) in zip(ids, accepted):
+            recipes.append((
+                recipe_id, user.pk, row["title"], row["time_minutes"],
+                row["price"], row["link"]))
+            for key in links:
+                related = dict.fromkeys(
+                    resolved[user.pk, key][name][0]
+                    for name in row[key])
+                links[key].extend(
+                    (recipe_id, related_id) for related_id in related)
+
+        cursor.execute(STAGING_SQL)
+        _copy(cursor, "import_recipe",
+              ("id", "user_id", "title", "time_minutes", "price", "link"),
+              recipes)
+        _copy(cursor, "import_recipe_tag", ("recipe_id", "tag_id"),
+              links["tags"])
+        _copy(cursor, "import_recipe_ingredient",
+              ("recipe_id", "ingredient_id"), links["ingredients"])
+        cursor.execute(LOAD_SQL, {"config": SEARCH_CONFIG})
+
+    return ids, errors
+
+
+def import_recipes(stream, input_format, name, user=None, batch_size=5000,
+                   restart=False, report=None, fingerprint=""):
+    """Import recipes from a stream in batches, resuming from a checkpoint
+
+    Each batch and the checkpoint recording its end position are committed
+    together, so an interrupted import run again with the same name skips
+    exactly the rows already stored. Invalid rows are skipped and reported.
+    Completed imports, and interrupted ones whose input has a different
+    fingerprint, are only run again with restart.
+
+    :param stream: text stream of NDJSON or CSV rows
+    :param input_format: "ndjson" or "csv"
+    :param name: checkpoint name, usually the input path
+    :param user: owner of rows that name no user
+    :param batch_size:
+    :param restart: ignore the checkpoint and import from the first row
+    :param report: optional callable receiving the stats after each batch
+    :param fingerprint: input fingerprint, see file_fingerprint
+    :return: dict of read, imported, skipped, seconds, rate (rows per
+        second), resumed_at and the first errors as (row number, message)
+    :raises CheckpointError: if the checkpoint cannot be resumed
+    """
+    checkpoint, _ = ImportCheckpoint.objects.get_or_create(name=name)
+    if not restart and checkpoint.completed:
+        raise CheckpointError(f"{name} was already imported")
+    if not restart and checkpoint.position and \
+            checkpoint.fingerprint != fingerprint:
+        raise CheckpointError(f"{name} changed since it was checkpointed")
+    if restart or not checkpoint.position:
+        checkpoint.position = checkpoint.imported = 0
+        checkpoint.fingerprint = fingerprint
+        checkpoint.completed = False
+        checkpoint.save()
+
+    stats = {"read": 0, "imported": 0, "skipped": 0, "errors": [],
+             "seconds": 0.0, "rate": 0.0, "resumed_at": checkpoint.position}
+    start = time.monotonic()
+
+    rows = itertools.islice(
+        read_rows(stream, input_format), checkpoint.position, None)
+    position = checkpoint.position
+
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+
+        cleaned, offsets, errors = [], [], []
+        for offset, row in enumerate(batch, start=position + 1):
+            try:
+                cleaned.append(clean_row(row))
+                offsets.append(offset)
+            except InvalidRow as exc:
+                errors.append((offset, str(exc)))
+
+        with transaction.atomic():
+            ids, rejected = import_batch(cleaned, user) \
+                if cleaned else ([], [])
+            position += len(batch)
+            ImportCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                position=position, imported=checkpoint.imported + len(ids))
+            checkpoint.imported += len(ids)
+
+        errors.extend((offsets[index], message)
+                      for index, message in rejected)
+        errors.sort()
+        stats["errors"].extend(errors[:MAX_ERRORS - len(stats["errors"])])
+        stats["read"] += len(batch)
+        stats["imported"] += len(ids)
+        stats["skipped"] += len(errors)
+        stats["seconds"] = time.monotonic() - start
+        stats["rate"] = stats["read"] / stats["seconds"]
+        if report is not None:
+            report(stats)
+
+    ImportCheckpoint.objects.filter(pk=checkpoint.pk).update(completed=True)
+    return stats
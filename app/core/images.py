@@ -0,0 +1,339 @@
+import hashlib
+import logging
+import os
+import queue
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.functions import Now
+from PIL import Image
+
+from core.models import ImageBlob, Recipe, sharded_image_path
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {
+    "JPEG": ".jpg",
+    "PNG": ".png",
+    "GIF": ".gif",
+    "WEBP": ".webp",
+}
+
+DEFAULT_VARIANTS = {
+    "thumb": (150, 150),
+    "medium": (600, 600),
+}
+
+
+def get_variants():
+    """Return the configured variant names and their bounding boxes
+
+    :return:
+    """
+    return getattr(settings, "RECIPE_IMAGE_VARIANTS", DEFAULT_VARIANTS)
+
+
+def variant_path(name, variant, content):
+    """Return the storage path of a variant of the image stored at name
+
+    The path ends with a hash of the rendered content, so a variant
+    rendered differently gets a new URL instead of replacing the file that
+    browsers and proxies cache as immutable.
+
+    :param name:
+    :param variant:
+    :param content: encoded variant bytes
+    :return:
+    """
+    root, _ = os.path.splitext(name)
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    return f"{root}_{variant}_{digest}.jpg"
+
+
+def render_variants(source):
+    """Resize an image file into every configured variant
+
+    JPEG sources are decoded at a reduced scale when the variant is much
+    smaller than the original, which avoids decoding the full image.
+
+    :param source: open image file
+    :return: mapping of variant name to encoded JPEG bytes
+    """
+    rendered = {}
+    for variant, size in get_variants().items():
+        source.seek(0)
+        with Image.open(source) as image:
+            image.draft("RGB", size)
+            image = image.convert("RGB")
+            image.thumbnail(size, Image.LANCZOS)
+
+            out = BytesIO()
+            image.save(out, format="JPEG", quality=85, optimize=True)
+            rendered[variant] = out.getvalue()
+
+    return rendered
+
+
+def _store_variants(name):
+    """Render the variants of the image stored at name and save them
+
+    Variants already stored with the same content are kept as they are.
+    Those replaced by a new rendering are left for gc_media to delete once
+    no recipe refers to them.
+
+    :param name:
+    :return: mapping of variant name to storage path
+    """
+    with default_storage.open(name, "rb") as source:
+        rendered = render_variants(source)
+
+    paths = {}
+    for variant, content in rendered.items():
+        path = variant_path(name, variant, content)
+        if not default_storage.exists(path):
+            path = default_storage.save(path, ContentFile(content))
+        paths[variant] = path
+
+    return paths
+
+
+def process_image_blob(blob_id, force=False):
+    """Create the variants of a shared image once and record them
+
+    Every recipe using the blob gets the variant paths, so uploading the
+    same content again never renders it again.
+
+    :param blob_id:
+    :param force: render the variants again even if the blob has them, and
+        update every recipe using it
+    :return: mapping of variant name to storage path, or None if skipped
+    """
+    blob = ImageBlob.objects.filter(pk=blob_id).first()
+    if blob is None:
+        return None
+
+    paths = blob.variants
+    if force:
+        paths = _store_variants(blob.image.name)
+        ImageBlob.objects.filter(pk=blob_id).update(variants=paths)
+    elif not paths:
+        paths = _store_variants(blob.image.name)
+        if not ImageBlob.objects.filter(pk=blob_id, variants={}).update(
+                variants=paths):
+            paths = ImageBlob.objects.get(pk=blob_id).variants
+
+    recipes = Recipe.objects.filter(image_blob_id=blob_id)
+    if not force:
+        recipes = recipes.filter(image_variants={})
+    recipes.update(image_variants=paths, updated_at=Now())
+    return paths
+
+
+def process_recipe_image(recipe_id, force=False):
+    """Create the resized variants of a recipe image and record them
+
+    Images shared through a blob are processed once for the blob. For
+    images stored before deduplication, the recipe is only updated if its
+    image has not been replaced while the variants were rendered, so a slow
+    job never overwrites newer variants.
+
+    :param recipe_id:
+    :param force: render the variants of a shared image again, see
+        process_image_blob
+    :return: mapping of variant name to storage path, or None if skipped
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        "image", "image_blob").first()
+    if recipe is None or not recipe.image:
+        return None
+    if recipe.image_blob_id is not None:
+        return process_image_blob(recipe.image_blob_id, force=force)
+
+    name = recipe.image.name
+    paths = _store_variants(name)
+
+    updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_variants=paths, updated_at=Now())
+    if not updated:
+        for path in paths.values():
+            default_storage.delete(path)
+        return None
+
+    return paths
+
+
+def content_hash(file):
+    """Return the SHA-256 hex digest of an uploaded file
+
+    Uses the digest computed while the upload streamed in when there is one.
+
+    :param file:
+    :return:
+    """
+    digest = getattr(file, "sha256", None)
+    if digest is None:
+        hasher = hashlib.sha256()
+        for chunk in file.chunks():
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+
+    return digest
+
+
+def attach_image(recipe, file):
+    """Set a recipe image, sharing the stored file of identical content
+
+    The file is only written when no blob holds the same content yet;
+    otherwise the recipe points at the existing file and its variants. The
+    recipe's previous blob loses a reference.
+
+    :param recipe:
+    :param file: uploaded image file
+    :return: True if the content was new
+    """
+    sha256 = content_hash(file)
+    ext = FORMAT_EXTENSIONS.get(getattr(file, "image_format", None)) \
+        or os.path.splitext(file.name)[1].lower()
+    path = sharded_image_path(f"{sha256}{ext}")
+
+    with transaction.atomic():
+        blob_id, name, variants, created = ImageBlob.objects.acquire(
+            sha256, path, file.size)
+        if created:
+            name = default_storage.save(path, file)
+            if name != path:
+                ImageBlob.objects.filter(pk=blob_id).update(image=name)
+
+        previous_blob_id = recipe.image_blob_id
+        recipe.image = name
+        recipe.image_blob_id = blob_id
+        recipe.image_variants = variants
+        recipe.save(update_fields=[
+            "image", "image_blob", "image_variants", "updated_at"])
+
+        if previous_blob_id is not None:
+            release_blob(previous_blob_id)
+
+        if not variants:
+            schedule_recipe_image(recipe.pk)
+
+    return created
+
+
+def release_blob(blob_id):
+    """Drop a reference to a blob, deleting its files once unused
+
+    :param blob_id:
+    :return:
+    """
+    deleted = ImageBlob.objects.release(blob_id)
+    if deleted is None:
+        return
+
+    image, variants = deleted
+    transaction.on_commit(
+        lambda: _delete_unused_files(image, list(variants.values())))
+
+
+def _delete_unused_files(image, variants):
+    # The same content may have been uploaded again since the blob was
+    # released; its new blob reuses the same path.
+    if ImageBlob.objects.filter(image=image).exists():
+        return
+
+    for path in [image] + variants:
+        default_storage.delete(path)
+
+
+class ImageWorker:
+    """Background threads consuming a bounded queue of recipe ids
+
+    Jobs are processed outside the request/response cycle. When the queue
+    is full the job is dropped and logged; those recipes keep an empty
+    ``image_variants`` and are picked up by ``process_recipe_images``.
+    """
+
+    def __init__(self, fn, workers, queue_size):
+        self.fn = fn
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = [
+            threading.Thread(
+                target=self._run, name=f"image-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, *args):
+        """Queue fn(*args), returning False if the queue is full
+
+        :param args:
+        :return:
+        """
+        try:
+            self._queue.put_nowait(args)
+        except queue.Full:
+            logger.warning("Image queue full, dropping job %r", args)
+            return False
+
+        return True
+
+    def join(self):
+        """Block until every queued job has been processed
+
+        :return:
+        """
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            args = self._queue.get()
+            close_old_connections()
+            try:
+                self.fn(*args)
+            except Exception:
+                logger.exception("Image job %r failed", args)
+            finally:
+                close_old_connections()
+                self._queue.task_done()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    """Return the process-wide image worker, starting it on first use
+
+    :return:
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = ImageWorker(
+                process_recipe_image,
+                workers=getattr(settings, "RECIPE_IMAGE_WORKERS", 2),
+                queue_size=getattr(settings, "RECIPE_IMAGE_QUEUE", 256),
+            )
+
+    return _worker
+
+
+def schedule_recipe_image(recipe_id):
+    """Process a recipe image once the current transaction commits
+
+    With ``RECIPE_IMAGE_EAGER`` set the variants are rendered immediately
+    in the calling thread instead.
+
+    :param recipe_id:
+    :return:
+    """
+    if getattr(settings, "RECIPE_IMAGE_EAGER", False):
+        process_recipe_image(recipe_id)
+        return
+
+    transaction.on_commit(lambda: get_worker().submit(recipe_id))
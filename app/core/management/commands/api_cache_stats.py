@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipe.cache import get_stats
+
+
+class Command(BaseCommand):
+    """Django command to show the API list cache hit and miss counters
+
+    """
+
+    help = "Show API list cache hit and miss counters"
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        total = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / total if total else 0.0
+
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} "
+            f"hit_ratio={ratio:.2%}")
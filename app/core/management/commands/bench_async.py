@@ -0,0 +1,215 @@
+import asyncio
+import io
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core import aiodb
+from core.models import Ingredient, Recipe, RecipeIngredient, RecipeTag, Tag
+
+BENCH_EMAIL = "bench-async@example.com"
+
+
+class Command(BaseCommand):
+    """Django command to load test the sync and async recipe list
+
+    Requests are issued in-process by concurrent clients, so the numbers
+    cover the application and database but no HTTP server or network:
+
+    - wsgi: the sync list on the WSGI handler, with a fixed number of
+      worker threads as a threaded WSGI server would have;
+    - asgi-sync: the sync list on the ASGI handler, where the view runs on
+      Django's single sync thread;
+    - asgi-async: the async list on the ASGI handler.
+
+    Every request carries a unique query param so the sync list's response
+    cache never hits. The data is committed, since the async views read it
+    through their own connections, and deleted afterwards.
+    """
+
+    help = "Compare requests/sec and latency of the WSGI and ASGI list"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument(
+            "--threads", type=int, default=8,
+            help="Worker threads of the simulated WSGI server")
+        parser.add_argument("--page-size", type=int, default=20)
+
+    def handle(self, *args, **options):
+        get_user_model().objects.filter(email=BENCH_EMAIL).delete()
+        user = get_user_model().objects.create_user(email=BENCH_EMAIL)
+        try:
+            self._seed(user, options["recipes"])
+            token = Token.objects.create(user=user).key
+
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                self._run(token, options)
+        finally:
+            user.delete()
+
+    def _run(self, token, options):
+        sync_url = reverse("recipe:recipe-list")
+        async_url = reverse("recipe:recipe-list-async")
+        auth = f"Token {token}"
+        query = f"page_size={options['page_size']}"
+
+        wsgi = get_wsgi_application()
+        asgi = get_asgi_application()
+        executor = ThreadPoolExecutor(max_workers=options["threads"])
+
+        async def wsgi_request(i):
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, _call_wsgi, wsgi, sync_url, f"{query}&_={i}", auth)
+
+        modes = (
+            ("wsgi", wsgi_request),
+            ("asgi-sync", lambda i: _call_asgi(
+                asgi, sync_url, f"{query}&_={i}", auth)),
+            ("asgi-async", lambda i: _call_asgi(
+                asgi, async_url, f"{query}&_={i}", auth)),
+        )
+        try:
+            for mode, request in modes:
+                stats = asyncio.run(self._load(
+                    request, options["requests"], options["concurrency"]))
+                self.stdout.write(
+                    f"mode={mode:<10} requests/s={stats['rate']:8.1f} "
+                    f"p50={stats['p50']:8.1f}ms p99={stats['p99']:8.1f}ms "
+                    f"errors={stats['errors']}")
+        finally:
+            executor.shutdown()
+
+    async def _load(self, request, total, concurrency):
+        """Issue total requests from concurrent clients
+
+        :param request: coroutine function taking a request number and
+            returning the status code
+        :param total:
+        :param concurrency:
+        :return: dict of rate, p50, p99 and errors
+        """
+        # Warm up connections, caches and pools first.
+        await asyncio.gather(*(request(-i) for i in range(concurrency)))
+
+        timings, errors, counter = [], [0], iter(range(total))
+
+        async def client():
+            for i in counter:
+                start = time.perf_counter()
+                status = await request(i)
+                timings.append((time.perf_counter() - start) * 1000)
+                if status != 200:
+                    errors[0] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        aiodb.close_pools()
+
+        percentiles = statistics.quantiles(timings, n=100)
+        return {
+            "rate": total / elapsed,
+            "p50": statistics.median(timings),
+            "p99": percentiles[98],
+            "errors": errors[0],
+        }
+
+    @staticmethod
+    def _seed(user, count):
+        """Create recipes with two tags and three ingredients each
+
+        :param user:
+        :param count:
+        :return:
+        """
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f"Tag {i}") for i in range(20))
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f"Ingredient {i}") for i in range(50))
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=user, title=f"Recipe {i}", time_minutes=i % 90,
+                   price=i % 100) for i in range(count))
+
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tags[(i + j) % len(tags)])
+            for i, recipe in enumerate(recipes) for j in range(2))
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredients[(i + j) % len(ingredients)])
+            for i, recipe in enumerate(recipes) for j in range(3))
+
+
+def _call_wsgi(app, path, query, auth):
+    """Call a WSGI application, returning the status code
+
+    :param app:
+    :param path:
+    :param query:
+    :param auth:
+    :return:
+    """
+    environ = {
+        "REQUEST_METHOD": "GET", "SCRIPT_NAME": "", "PATH_INFO": path,
+        "QUERY_STRING": query, "SERVER_NAME": "testserver",
+        "SERVER_PORT": "80", "HTTP_HOST": "testserver",
+        "HTTP_AUTHORIZATION": auth, "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http", "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr, "wsgi.multithread": True,
+        "wsgi.multiprocess": False, "wsgi.run_once": False,
+    }
+    status = []
+
+    def start_response(value, headers, exc_info=None):
+        status.append(int(value.split()[0]))
+
+    result = app(environ, start_response)
+    try:
+        b"".join(result)
+    finally:
+        result.close()
+
+    return status[0]
+
+
+async def _call_asgi(app, path, query, auth):
+    """Call an ASGI application, returning the status code
+
+    :param app:
+    :param path:
+    :param query:
+    :param auth:
+    :return:
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path,
+        "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+        "headers": [(b"host", b"testserver"),
+                    (b"authorization", auth.encode())],
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
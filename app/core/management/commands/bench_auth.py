@@ -0,0 +1,66 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from user import authentication
+
+
+class Command(BaseCommand):
+    """Django command to benchmark token authentication overhead
+
+    Compares DRF's TokenAuthentication with the cached authentication when
+    cold (nothing cached), warm in the shared cache only and warm in the
+    local LRU. The user and token are rolled back afterwards.
+    """
+
+    help = "Benchmark cold and warm token authentication overhead"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        shared = caches[authentication.CACHE_ALIAS]
+
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                email="bench-auth@example.com")
+            token = Token.objects.create(user=user)
+            request = APIRequestFactory().get(
+                "/", HTTP_AUTHORIZATION=f"Token {token.key}")
+            cached = authentication.CachedTokenAuthentication()
+
+            def cold():
+                authentication.local_cache.clear()
+                shared.delete(authentication.CACHE_PREFIX + token.key)
+
+            scenarios = (
+                ("TokenAuthentication", TokenAuthentication(), None),
+                ("cached (cold)", cached, cold),
+                ("cached (shared)", cached, authentication.local_cache.clear),
+                ("cached (local)", cached, None),
+            )
+            for name, backend, reset in scenarios:
+                backend.authenticate(request)
+                timings = []
+                for _ in range(repeat):
+                    if reset:
+                        reset()
+                    start = time.perf_counter()
+                    backend.authenticate(request)
+                    timings.append((time.perf_counter() - start) * 1e6)
+
+                self.stdout.write(
+                    f"{name:<20} median={statistics.median(timings):8.1f}us"
+                    f" mean={statistics.mean(timings):8.1f}us")
+
+            transaction.set_rollback(True)
+
+        authentication.invalidate_token(token.key)
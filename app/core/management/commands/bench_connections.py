@@ -0,0 +1,96 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.backends.postgresql.base import (get_connection_stats,
+                                           reset_connection_stats)
+from core.management.commands.bench_async import _call_wsgi
+from core.models import Tag
+
+BENCH_EMAIL = "bench-connections@example.com"
+
+
+class Command(BaseCommand):
+    """Django command to measure what persistent connections save
+
+    The tag list is requested through the WSGI handler by a fixed number of
+    worker threads, once opening a connection per request (CONN_MAX_AGE=0)
+    and once keeping connections open between requests. For each, the
+    number of connections opened and the time spent opening them is
+    reported next to the request latency.
+    """
+
+    help = "Compare connection setup time with and without persistence"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument(
+            "--max-age", type=int, default=60,
+            help="CONN_MAX_AGE of the persistent run")
+
+    def handle(self, *args, **options):
+        get_user_model().objects.filter(email=BENCH_EMAIL).delete()
+        user = get_user_model().objects.create_user(email=BENCH_EMAIL)
+        try:
+            Tag.objects.bulk_create(
+                Tag(user=user, name=f"Tag {i}") for i in range(20))
+            token = Token.objects.create(user=user).key
+
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                for mode, max_age in (("per-request", 0),
+                                      ("persistent", options["max_age"])):
+                    stats = self._run(token, max_age, options)
+                    self.stdout.write(
+                        f"mode={mode:<11} connects={stats['connects']:5d} "
+                        f"setup={stats['setup']:8.1f}ms "
+                        f"setup/connect={stats['per_connect']:6.2f}ms "
+                        f"p50={stats['p50']:6.2f}ms")
+        finally:
+            user.delete()
+
+    @staticmethod
+    def _run(token, max_age, options):
+        """Issue the requests with the given CONN_MAX_AGE
+
+        :param token:
+        :param max_age:
+        :param options:
+        :return: dict of connects, setup (ms), per_connect (ms) and p50
+        """
+        url = reverse("recipe:tag-list")
+        auth = f"Token {token}"
+        wsgi = get_wsgi_application()
+        settings_dict = connections.databases[DEFAULT_DB_ALIAS]
+        original = settings_dict["CONN_MAX_AGE"]
+
+        def request(i):
+            start = time.perf_counter()
+            _call_wsgi(wsgi, url, f"_={i}", auth)
+            return (time.perf_counter() - start) * 1000
+
+        settings_dict["CONN_MAX_AGE"] = max_age
+        reset_connection_stats()
+        # New threads, so no connection is carried over from another run.
+        executor = ThreadPoolExecutor(max_workers=options["threads"])
+        try:
+            timings = list(executor.map(request, range(options["requests"])))
+        finally:
+            executor.shutdown()
+            settings_dict["CONN_MAX_AGE"] = original
+
+        stats = get_connection_stats()
+        return {
+            "connects": stats["connects"],
+            "setup": stats["seconds"] * 1000,
+            "per_connect": stats["seconds"] * 1000 / max(stats["connects"], 1),
+            "p50": statistics.median(timings),
+        }
@@ -0,0 +1,116 @@
+import statistics
+import time
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Django command to benchmark recipe image uploads and variant sizes
+
+    Uploads run inside a transaction that is rolled back, so background jobs
+    are never queued; the deferred mode therefore measures the request cost
+    alone, the eager mode adds rendering the variants inline, and the
+    duplicate mode re-uploads content that is already stored. Files written
+    to the media storage are deleted afterwards.
+    """
+
+    help = "Benchmark image upload latency and bytes written and served"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--width", type=int, default=3000)
+        parser.add_argument("--height", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        size, repeat = (options["width"], options["height"]), options["repeat"]
+        self.stored = set()
+
+        with transaction.atomic(), override_settings(
+                ALLOWED_HOSTS=["testserver"]):
+            user = get_user_model().objects.create_user(
+                email="bench-images@example.com")
+            recipe = Recipe.objects.create(
+                user=user, title="Bench", time_minutes=5, price=5.00)
+            client = APIClient()
+            client.force_authenticate(user)
+            url = reverse("recipe:recipe-upload-image", args=[recipe.pk])
+
+            duplicate = self._sample_image(size)
+            modes = (
+                ("deferred", False,
+                 [self._sample_image(size) for _ in range(repeat)]),
+                ("eager", True,
+                 [self._sample_image(size) for _ in range(repeat - 1)]
+                 + [duplicate]),
+                ("duplicate", True, [duplicate] * repeat),
+            )
+            for mode, eager, contents in modes:
+                with override_settings(RECIPE_IMAGE_EAGER=eager):
+                    timings, written = self._time_uploads(
+                        client, url, recipe, contents)
+                self.stdout.write(
+                    f"upload mode={mode:<9} "
+                    f"median={statistics.median(timings):.2f}ms "
+                    f"max={max(timings):.2f}ms "
+                    f"written/upload={written // len(contents):>9}")
+
+            recipe.refresh_from_db()
+            self.stdout.write(
+                f"bytes original={recipe.image.size:>9}")
+            for variant, path in recipe.image_variants.items():
+                size = default_storage.size(path)
+                self.stdout.write(
+                    f"bytes {variant:<8}={size:>9} "
+                    f"({size / recipe.image.size:.2%} of original)")
+
+            for path in self.stored:
+                default_storage.delete(path)
+            transaction.set_rollback(True)
+
+    def _time_uploads(self, client, url, recipe, contents):
+        """Upload each content, returning timings and bytes newly stored
+
+        :param client:
+        :param url:
+        :param recipe:
+        :param contents:
+        :return: (timings in milliseconds, bytes written)
+        """
+        timings, written = [], 0
+        for content in contents:
+            upload = SimpleUploadedFile(
+                "bench.jpg", content, content_type="image/jpeg")
+            start = time.perf_counter()
+            client.post(url, {"image": upload}, format="multipart")
+            timings.append((time.perf_counter() - start) * 1000)
+
+            recipe.refresh_from_db()
+            for path in [recipe.image.name, *recipe.image_variants.values()]:
+                if path not in self.stored:
+                    self.stored.add(path)
+                    written += default_storage.size(path)
+
+        return timings, written
+
+    @staticmethod
+    def _sample_image(size):
+        """Return a noisy JPEG that compresses like a photo
+
+        :param size:
+        :return:
+        """
+        image = Image.effect_noise(size, 64).convert("RGB")
+        out = BytesIO()
+        image.save(out, format="JPEG", quality=90)
+        return out.getvalue()
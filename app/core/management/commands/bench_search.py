@@ -0,0 +1,89 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Recipe
+from core.search import search_recipes, update_search_vectors
+
+WORDS = (
+    "roasted", "grilled", "spicy", "creamy", "garlic", "lemon", "chicken",
+    "beef", "tofu", "mushroom", "pasta", "rice", "curry", "salad", "soup",
+    "pie", "tart", "bread", "noodles", "stew", "honey", "ginger", "basil",
+)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark recipe search as the table grows
+
+    All rows are created inside a transaction that is rolled back.
+    """
+
+    help = "Benchmark full-text recipe search at increasing table sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--matches", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                email="bench-search@example.com")
+            rows = 0
+            for size in sorted(options["sizes"]):
+                self._seed(user, size - rows, options["matches"])
+                rows = size
+                timings = self._time_search(user, options["repeat"])
+                self.stdout.write(
+                    f"rows={size:>9} median={statistics.median(timings):.2f}ms"
+                    f" p95={self._p95(timings):.2f}ms")
+            transaction.set_rollback(True)
+
+    def _seed(self, user, count, matches):
+        """Create recipes with random titles plus a few that match
+
+        :param user:
+        :param count:
+        :param matches:
+        :return:
+        """
+        recipes = [
+            Recipe(user=user, time_minutes=10, price=5.00,
+                   title=" ".join(random.sample(WORDS, 3)))
+            for _ in range(count - matches)
+        ] + [
+            Recipe(user=user, time_minutes=10, price=5.00,
+                   title="Saffron risotto")
+            for _ in range(matches)
+        ]
+        created = Recipe.objects.bulk_create(recipes, batch_size=5000)
+        update_search_vectors(recipe.pk for recipe in created)
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE core_recipe")
+
+    def _time_search(self, user, repeat):
+        """Return the search query timings in milliseconds
+
+        :param user:
+        :param repeat:
+        :return:
+        """
+        timings = []
+        for _ in range(repeat):
+            queryset = search_recipes(
+                Recipe.objects.filter(user=user), "saffron")[:100]
+            start = time.perf_counter()
+            list(queryset)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return timings
+
+    @staticmethod
+    def _p95(timings):
+        return sorted(timings)[int(len(timings) * 0.95) - 1]
@@ -0,0 +1,134 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Ingredient, Recipe, RecipeIngredient, RecipeTag, Tag
+from recipe.compiled import get_compiled
+from recipe.serializers import IngredientSerializer, RecipeSerializer, \
+    TagSerializer
+
+
+class Command(BaseCommand):
+    """Django command comparing DRF and compiled list serialization
+
+    Each timing covers fetching the rows, serializing and rendering JSON.
+    All rows are created inside a transaction that is rolled back.
+    """
+
+    help = "Benchmark compiled list serializers against DRF"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int,
+                            default=[1000, 10000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                email="bench-serializers@example.com")
+            rows = 0
+            for size in sorted(options["sizes"]):
+                self._seed(user, size - rows, rows)
+                rows = size
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+
+                for name, serializer_class, queryset in (
+                        ("recipes", RecipeSerializer, self._recipes(user)),
+                        ("tags", TagSerializer,
+                         Tag.objects.filter(user=user).order_by("-name")),
+                        ("ingredients", IngredientSerializer,
+                         Ingredient.objects.filter(
+                             user=user).order_by("-name"))):
+                    drf = self._time(
+                        options["repeat"], self._drf, serializer_class,
+                        queryset)
+                    compiled = self._time(
+                        options["repeat"], self._compiled, serializer_class,
+                        queryset)
+                    self.stdout.write(
+                        f"rows={size:>7} {name:<12} drf={drf:8.1f}ms "
+                        f"compiled={compiled:8.1f}ms "
+                        f"speedup={drf / compiled:4.1f}x")
+            transaction.set_rollback(True)
+
+    def _seed(self, user, count, offset):
+        """Create recipes, tags and ingredients with 3 links each
+
+        :param user:
+        :param count:
+        :param offset:
+        :return:
+        """
+        Tag.objects.bulk_create(
+            Tag(user=user, name=f"Tag {offset + i}") for i in range(count))
+        Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f"Ingredient {offset + i}")
+            for i in range(count))
+        Recipe.objects.bulk_create(
+            (Recipe(user=user, title=f"Recipe {offset + i}",
+                    time_minutes=i % 120, price=i % 100 + 0.5,
+                    link="https://example.com")
+             for i in range(count)), batch_size=5000)
+
+        tags = list(Tag.objects.filter(user=user).values_list(
+            "pk", flat=True))
+        ingredients = list(Ingredient.objects.filter(
+            user=user).values_list("pk", flat=True))
+        recipes = Recipe.objects.filter(user=user).order_by(
+            "-pk").values_list("pk", flat=True)[:count]
+        links = [(pk, random.sample(tags, 3), random.sample(ingredients, 3))
+                 for pk in recipes]
+        RecipeTag.objects.bulk_create(
+            (RecipeTag(recipe_id=pk, tag_id=tag)
+             for pk, tag_ids, _ in links for tag in tag_ids),
+            batch_size=5000)
+        RecipeIngredient.objects.bulk_create(
+            (RecipeIngredient(recipe_id=pk, ingredient_id=ingredient)
+             for pk, _, ingredient_ids in links
+             for ingredient in ingredient_ids),
+            batch_size=5000)
+
+    @staticmethod
+    def _recipes(user):
+        return Recipe.objects.filter(user=user).order_by(
+            "-title").prefetch_related(
+            Prefetch("ingredients",
+                     queryset=Ingredient.objects.only("id").order_by("id")),
+            Prefetch("tags", queryset=Tag.objects.only("id").order_by("id")),
+        )
+
+    @staticmethod
+    def _drf(serializer_class, queryset):
+        data = serializer_class(queryset.all(), many=True).data
+        return JSONRenderer().render(data)
+
+    @staticmethod
+    def _compiled(serializer_class, queryset):
+        compiled = get_compiled(serializer_class)
+        data = compiled.to_representation(
+            compiled.values(queryset.all()), {})
+        return JSONRenderer().render(data)
+
+    @staticmethod
+    def _time(repeat, fn, *args):
+        """Return the median run time of fn(*args) in milliseconds
+
+        :param repeat:
+        :param fn:
+        :param args:
+        :return:
+        """
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(*args)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return statistics.median(timings)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Recipe
+from recipe.export import EXPORT_FORMATS, render_export
+
+
+class Command(BaseCommand):
+    """Django command to export recipes as NDJSON or CSV
+
+    Rows are streamed from a server-side cursor and written as they are
+    rendered, so exporting the whole table uses constant memory.
+    """
+
+    help = "Export recipes with their tag and ingredient names"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=list(EXPORT_FORMATS), default="ndjson")
+        parser.add_argument(
+            "--user", help="Only export recipes of the user with this email")
+        parser.add_argument(
+            "--output", help="File to write to instead of stdout")
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.order_by("id")
+        if options["user"]:
+            queryset = queryset.filter(user__email=options["user"])
+            if not queryset.exists():
+                raise CommandError(f"No recipes for {options['user']}")
+
+        chunks = render_export(queryset, options["format"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8",
+                      newline="") as out:
+                out.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
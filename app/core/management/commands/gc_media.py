@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from core.media_gc import collect_orphans_locked
+
+
+class Command(BaseCommand):
+    """Django command to delete recipe media no longer referenced
+
+    """
+
+    help = "Delete orphaned recipe images and variants in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report orphans without deleting them")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--min-age", type=int, default=3600,
+            help="Only delete files unmodified for this many seconds")
+
+    def handle(self, *args, **options):
+        stats = collect_orphans_locked(
+            batch_size=options["batch_size"],
+            min_age=options["min_age"],
+            dry_run=options["dry_run"],
+            report=self._report,
+        )
+        if stats is None:
+            self.stderr.write("Another media GC is running")
+            return
+
+        verb = "would delete" if options["dry_run"] else "deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: scanned={stats['scanned']} orphans={stats['orphans']} "
+            f"{verb} {stats['bytes']} bytes in {stats['seconds']:.1f}s"))
+
+    def _report(self, stats):
+        rate = stats["scanned"] / stats["seconds"] if stats["seconds"] else 0
+        self.stdout.write(
+            f"scanned={stats['scanned']} orphans={stats['orphans']} "
+            f"deleted={stats['deleted']} bytes={stats['bytes']} "
+            f"files/s={rate:.0f}")
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from core.images import process_recipe_image
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Django command to render missing recipe image variants
+
+    Covers uploads whose background job was dropped or failed, and lets
+    every variant be regenerated after the variant sizes change.
+    """
+
+    help = "Render resized variants for recipe images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Regenerate variants for every recipe with an image")
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.exclude(image="").exclude(image=None)
+        if not options["all"]:
+            queryset = queryset.filter(image_variants={})
+
+        processed = 0
+        blob_ids = set()
+        for recipe_id, blob_id in queryset.values_list(
+                "pk", "image_blob_id").iterator():
+            # A shared image is rendered once for all its recipes.
+            if blob_id is not None:
+                if blob_id in blob_ids:
+                    continue
+                blob_ids.add(blob_id)
+
+            if process_recipe_image(
+                    recipe_id, force=options["all"]) is not None:
+                processed += 1
+
+        self.stdout.write(f"processed={processed}")
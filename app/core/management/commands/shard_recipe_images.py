@@ -0,0 +1,129 @@
+import json
+import os
+import posixpath
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from psycopg2.extras import execute_values
+
+from core.models import RECIPE_IMAGE_DIR, Recipe, sharded_image_path
+
+FLAT_IMAGE_RE = rf"^{RECIPE_IMAGE_DIR}/[^/]+$"
+
+# Only rows still pointing at the moved file are rewritten, so an image
+# replaced while the batch was being moved is left alone. updated_at moves
+# the list and detail validators on, so clients drop the old paths.
+UPDATE_SQL = """
+UPDATE core_recipe AS r
+SET image = v.new_image, image_variants = v.variants::jsonb,
+    updated_at = now()
+FROM (VALUES %s) AS v (id, old_image, new_image, variants)
+WHERE r.id = v.id AND r.image = v.old_image
+"""
+
+
+def move_file(old, new):
+    """Move a stored file, tolerating a move interrupted after the file
+
+    The moved file counts as just modified: until its recipe points at the
+    new path, only gc_media's min_age keeps it from being taken for an
+    orphan.
+
+    :param old:
+    :param new:
+    :return: False if neither path exists
+    """
+    if not default_storage.exists(old):
+        return default_storage.exists(new)
+
+    try:
+        old_path = default_storage.path(old)
+        new_path = default_storage.path(new)
+    except NotImplementedError:
+        with default_storage.open(old) as f:
+            default_storage.save(new, f)
+        default_storage.delete(old)
+        return True
+
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    os.replace(old_path, new_path)
+    os.utime(new_path)
+    return True
+
+
+class Command(BaseCommand):
+    """Django command to move recipe images into the sharded layout
+
+    Recipes are processed in primary key order in batches: the files of a
+    batch are moved, then their paths are rewritten in one UPDATE. Only
+    recipes still in the flat layout are selected, so the command can be
+    stopped at any time and re-run to resume; files moved by an interrupted
+    batch are picked up from their new location.
+    """
+
+    help = "Move recipe images from uploads/recipe/ into hashed subdirectories"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--limit", type=int, default=None,
+            help="Stop after this many recipes")
+
+    def handle(self, *args, **options):
+        moved = missing = 0
+        last_pk = 0
+        while options["limit"] is None or moved + missing < options["limit"]:
+            size = options["batch_size"]
+            if options["limit"] is not None:
+                size = min(size, options["limit"] - moved - missing)
+
+            batch = list(
+                Recipe.objects.filter(
+                    pk__gt=last_pk, image__regex=FLAT_IMAGE_RE)
+                .order_by("pk").values_list("pk", "image", "image_variants")
+                [:size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+
+            rows = []
+            for pk, image, variants in batch:
+                row = self._move(pk, image, variants)
+                if row is None:
+                    missing += 1
+                else:
+                    rows.append(row)
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                execute_values(cursor, UPDATE_SQL, rows)
+            moved += len(rows)
+
+            self.stdout.write(f"moved={moved} missing={missing} "
+                              f"last_id={last_pk}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: moved={moved} missing={missing}"))
+
+    @staticmethod
+    def _move(pk, image, variants):
+        """Move a recipe image and its variants to their sharded directory
+
+        :param pk:
+        :param image:
+        :param variants:
+        :return: the row for UPDATE_SQL, or None if the image is missing
+        """
+        new_image = sharded_image_path(os.path.basename(image))
+        if not move_file(image, new_image):
+            return None
+
+        # Variants keep their file names, which start with the image's.
+        directory = posixpath.dirname(new_image)
+        new_variants = {}
+        for variant, path in variants.items():
+            new_path = posixpath.join(directory, posixpath.basename(path))
+            if move_file(path, new_path):
+                new_variants[variant] = new_path
+
+        return pk, image, new_image, json.dumps(new_variants)
@@ -2,23 +2,57 @@ import time
 
 from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available
 
+    Opens a real connection, retrying with exponential backoff until it
+    succeeds or the timeout passes, and reports how long the successful
+    connection took to set up.
     """
 
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--timeout", type=float, default=60,
+            help="Seconds to keep trying before failing")
+        parser.add_argument(
+            "--delay", type=float, default=0.5,
+            help="Seconds before the first retry, doubled after each")
+        parser.add_argument(
+            "--max-delay", type=float, default=5,
+            help="Longest wait between retries")
+
     def handle(self, *args, **options):
         self.stdout.write("Waiting for database...")
 
-        db_conn = None
-        while not db_conn:
+        connection = connections[options["database"]]
+        deadline = time.monotonic() + options["timeout"]
+        delay = options["delay"]
+        attempts = 0
+
+        while True:
+            attempts += 1
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write("Database unavailable... waiting...")
-                time.sleep(1)
+                connection.ensure_connection()
+                break
+            except OperationalError as exc:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"Database unavailable after {attempts} attempts: "
+                        f"{exc}")
+
+                wait = min(delay, options["max_delay"], remaining)
+                self.stdout.write(
+                    f"Database unavailable, retrying in {wait:.1f}s...")
+                time.sleep(wait)
+                delay *= 2
 
-        self.stdout.write(self.style.SUCCESS("Database ready!"))
+        setup = getattr(connection, "connect_seconds", None)
+        timing = f" (connected in {setup * 1000:.1f}ms)" \
+            if setup is not None else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"Database ready after {attempts} attempt(s){timing}!"))
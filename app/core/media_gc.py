@@ -0,0 +1,234 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from django.db.transaction import TransactionManagementError
+from django.utils import timezone
+
+from core.models import RECIPE_IMAGE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Every stored path still referenced by a recipe or an image blob, in the
+# same (byte) order as the storage walk.
+REFERENCED_PATHS_SQL = """
+SELECT path FROM (
+    SELECT image AS path FROM core_recipe WHERE image <> ''
+    UNION ALL
+    SELECT v.value FROM core_recipe, jsonb_each_text(image_variants) v
+    UNION ALL
+    SELECT image FROM core_imageblob
+    UNION ALL
+    SELECT v.value FROM core_imageblob, jsonb_each_text(variants) v
+) refs
+ORDER BY path COLLATE "C"
+"""
+
+RECHECK_SQL = """
+SELECT image FROM core_recipe WHERE image = ANY(%(paths)s)
+UNION
+SELECT v.value FROM core_recipe, jsonb_each_text(image_variants) v
+WHERE v.value = ANY(%(paths)s)
+UNION
+SELECT image FROM core_imageblob WHERE image = ANY(%(paths)s)
+UNION
+SELECT v.value FROM core_imageblob, jsonb_each_text(variants) v
+WHERE v.value = ANY(%(paths)s)
+"""
+
+# Held by whichever process is collecting, so periodic runs in several
+# workers never overlap.
+ADVISORY_LOCK_ID = 7301018
+
+
+def walk_storage(directory):
+    """Yield every file path below directory in byte order
+
+    Directories sort as if their name ended with "/", so the paths come
+    out in the same order as a plain sort of the full path strings.
+
+    :param directory:
+    :return:
+    """
+    dirs, files = default_storage.listdir(directory)
+    entries = [(name + "/", True) for name in dirs] + \
+        [(name, False) for name in files]
+
+    for key, is_dir in sorted(entries):
+        path = f"{directory}/{key.rstrip('/')}"
+        if is_dir:
+            yield from walk_storage(path)
+        else:
+            yield path
+
+
+def _behind_transaction_pooler():
+    return getattr(settings, "DB_POOLER", "") == "transaction"
+
+
+def referenced_paths():
+    """Yield the referenced paths from a server-side cursor
+
+    Behind a transaction-level pooler the cursor cannot outlive a
+    transaction, so it must be read inside one, as collect_orphans_locked
+    does; Django then declares it without HOLD.
+
+    :return:
+    """
+    if _behind_transaction_pooler() and not connection.in_atomic_block:
+        raise TransactionManagementError(
+            "Referenced paths must be read in a transaction behind a "
+            "transaction pooler.")
+
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(REFERENCED_PATHS_SQL)
+        while True:
+            rows = cursor.fetchmany(2000)
+            if not rows:
+                return
+            for row in rows:
+                yield row[0]
+
+
+def find_orphans(directory=RECIPE_IMAGE_DIR, min_age=3600, stats=None):
+    """Yield stored files no recipe or image blob refers to
+
+    The sorted storage walk is merged with the sorted referenced paths, so
+    memory use does not depend on the number of files. Files younger than
+    min_age seconds are skipped, which covers uploads still in progress.
+
+    :param directory:
+    :param min_age:
+    :param stats: optional dict whose "scanned" count is updated
+    :return:
+    """
+    if not default_storage.exists(directory):
+        return
+
+    cutoff = timezone.now() - timedelta(seconds=min_age)
+    refs = referenced_paths()
+    ref = next(refs, None)
+
+    for path in walk_storage(directory):
+        if stats is not None:
+            stats["scanned"] += 1
+        while ref is not None and ref < path:
+            ref = next(refs, None)
+        if ref == path:
+            continue
+        if default_storage.get_modified_time(path) > cutoff:
+            continue
+
+        yield path
+
+
+def _recheck(paths):
+    """Return the paths that became referenced since they were streamed
+
+    :param paths:
+    :return:
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(RECHECK_SQL, {"paths": paths})
+        return {row[0] for row in cursor.fetchall()}
+
+
+def collect_orphans(batch_size=500, min_age=3600, dry_run=False,
+                    report=None):
+    """Delete orphaned recipe media in batches
+
+    Each batch is checked against the database again right before it is
+    deleted.
+
+    :param batch_size:
+    :param min_age: seconds a file must be unmodified before it is deleted
+    :param dry_run: only count what would be deleted
+    :param report: optional callable receiving the stats after each batch
+    :return: dict of scanned, orphans, deleted, bytes and seconds
+    """
+    stats = {"scanned": 0, "orphans": 0, "deleted": 0, "bytes": 0,
+             "seconds": 0.0}
+    start = time.monotonic()
+
+    def flush(batch):
+        if not dry_run:
+            batch = [path for path in batch if path not in _recheck(batch)]
+        for path in batch:
+            stats["bytes"] += default_storage.size(path)
+            if not dry_run:
+                default_storage.delete(path)
+                stats["deleted"] += 1
+        stats["seconds"] = time.monotonic() - start
+        if report is not None:
+            report(stats)
+
+    batch = []
+    for path in find_orphans(min_age=min_age, stats=stats):
+        stats["orphans"] += 1
+        batch.append(path)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    flush(batch)
+
+    return stats
+
+
+def collect_orphans_locked(**kwargs):
+    """Run collect_orphans unless another process is already running it
+
+    Behind a transaction-level pooler a session lock could stay behind on
+    whichever server connection took it, so the run holds a transaction
+    lock instead.
+
+    :param kwargs:
+    :return: the stats, or None if the lock was held elsewhere
+    """
+    if _behind_transaction_pooler():
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_try_advisory_xact_lock(%s)", [ADVISORY_LOCK_ID])
+            if not cursor.fetchone()[0]:
+                return None
+            return collect_orphans(**kwargs)
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [ADVISORY_LOCK_ID])
+        if not cursor.fetchone()[0]:
+            return None
+
+    try:
+        return collect_orphans(**kwargs)
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_unlock(%s)", [ADVISORY_LOCK_ID])
+
+
+def start_periodic_gc(interval, **kwargs):
+    """Start a daemon thread collecting orphaned media every interval
+
+    :param interval: seconds between runs
+    :param kwargs: passed to collect_orphans
+    :return: the thread
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            close_old_connections()
+            try:
+                stats = collect_orphans_locked(**kwargs)
+                if stats is not None:
+                    logger.info("Media GC: %s", stats)
+            except Exception:
+                logger.exception("Media GC failed")
+            finally:
+                close_old_connections()
+
+    thread = threading.Thread(target=run, name="media-gc", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import random
+import time
+
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework import exceptions
+from rest_framework.permissions import SAFE_METHODS
+
+from core import routers, timing
+from user.authentication import CachedTokenAuthentication
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """Send the reads of safe API requests to a read replica
+
+    Safe requests made with a token to the namespaces listed in
+    DATABASE_REPLICAS["NAMESPACES"] read from a replica, unless their user
+    is pinned to the primary: every unsafe request pins its user for
+    PIN_SECONDS, so users always read their own writes.
+    """
+
+    def process_request(self, request):
+        routers.set_read_alias(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Pick the replica for a safe request of an unpinned user
+
+        :param request:
+        :param view_func:
+        :param view_args:
+        :param view_kwargs:
+        :return:
+        """
+        if not routers.get_replica_aliases() or \
+                request.method not in SAFE_METHODS or \
+                request.resolver_match.namespace not in \
+                routers.get_routed_namespaces():
+            return None
+
+        user_id = self._get_user_id(request)
+        if user_id is not None and not routers.is_pinned(user_id):
+            routers.set_read_alias(routers.choose_replica())
+        return None
+
+    def process_response(self, request, response):
+        """Pin the user of an unsafe request to the primary
+
+        :param request:
+        :param response:
+        :return:
+        """
+        routers.set_read_alias(None)
+
+        # DRF sets the user it authenticated on the Django request too.
+        user = getattr(request, "user", None)
+        if request.method not in SAFE_METHODS and user is not None and \
+                user.is_authenticated:
+            routers.pin_user(user.pk)
+        return response
+
+    @staticmethod
+    def _get_user_id(request):
+        """Return the id of the token's user, or None
+
+        Uses the token cache the view authenticates with next, so it costs
+        no extra query.
+
+        :param request:
+        :return:
+        """
+        authentication = CachedTokenAuthentication()
+        try:
+            with timing.measure("auth"):
+                key = authentication.get_token_key(request)
+                if key is None:
+                    return None
+                user, _ = authentication.authenticate_credentials(key)
+        except exceptions.AuthenticationFailed:
+            return None
+
+        return user.pk
+
+
+class ServerTimingMiddleware:
+    """Report the query count and time spent per request
+
+    A SAMPLE_RATE share of the requests to the namespaces listed in
+    SERVER_TIMING["NAMESPACES"] is timed: the queries on every database
+    through the execute wrapper core.signals installs on each connection,
+    and the auth and serializer steps of the views. The timings are sent in
+    a Server-Timing header and logged as one record per request, with the
+    numbers in its "timing" attribute. Requests that are not sampled only
+    cost a random number.
+
+    Runs natively in both modes, so async views under ASGI are not moved
+    onto Django's single sync thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Lets the handler await the instance, as with MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        start = self._start(request)
+        if start is None:
+            return self.get_response(request)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.stop_timing()
+        return self._finish(request, response, start)
+
+    async def __acall__(self, request):
+        start = self._start(request)
+        if start is None:
+            return await self.get_response(request)
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.stop_timing()
+        return self._finish(request, response, start)
+
+    @staticmethod
+    def _start(request):
+        """Start timing a sampled request
+
+        :param request:
+        :return: start time, or None if the request is not sampled
+        """
+        rate = timing.get_sample_rate()
+        if not rate or random.random() >= rate:
+            return None
+
+        request.timings = timing.start_timing()
+        return time.perf_counter()
+
+    def _finish(self, request, response, start):
+        """Report a timed request that reached a timed namespace
+
+        :param request:
+        :param response:
+        :param start:
+        :return:
+        """
+        # Requests that never reached a view (e.g. 404s) are not reported.
+        match = request.resolver_match
+        if match is not None and \
+                match.namespace in timing.get_timed_namespaces():
+            self._report(request, response, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _report(request, response, total):
+        """Add the Server-Timing header and log the request's timings
+
+        :param request:
+        :param response:
+        :param total: seconds spent on the request
+        :return:
+        """
+        timings = request.timings
+        response["Server-Timing"] = timings.as_header(total)
+
+        record = {
+            "method": request.method,
+            "view": request.resolver_match.view_name,
+            "status": response.status_code,
+            **timings.as_dict(total),
+        }
+        logger.info(
+            " ".join(f"{name}=%s" for name in record), *record.values(),
+            extra={"timing": record})
@@ -0,0 +1,44 @@
+# Generated by Django 3.1.6 on 2026-10-17 13:05
+
+from django.db import migrations
+
+# Merge rows whose names only differ by case into the oldest one, moving
+# their recipe links over, then enforce case-insensitive uniqueness. Django
+# 3.1 cannot declare expression constraints on the model, so the index only
+# lives in the database.
+UNIQUE_NAME_SQL = """
+CREATE TEMPORARY TABLE {table}_merge ON COMMIT DROP AS
+    SELECT id, keep FROM (
+        SELECT id, min(id) OVER (
+            PARTITION BY user_id, lower(name)) AS keep
+        FROM core_{table}
+    ) ids WHERE id <> keep;
+INSERT INTO core_recipe_{links} (recipe_id, {table}_id)
+    SELECT l.recipe_id, m.keep FROM core_recipe_{links} l
+    JOIN {table}_merge m ON l.{table}_id = m.id
+    ON CONFLICT DO NOTHING;
+DELETE FROM core_recipe_{links}
+    WHERE {table}_id IN (SELECT id FROM {table}_merge);
+DELETE FROM core_{table} WHERE id IN (SELECT id FROM {table}_merge);
+SET CONSTRAINTS ALL IMMEDIATE;
+CREATE UNIQUE INDEX core_{table}_user_lower_name_uniq
+    ON core_{table} (user_id, lower(name));
+"""
+
+DROP_UNIQUE_NAME_SQL = "DROP INDEX core_{table}_user_lower_name_uniq;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            UNIQUE_NAME_SQL.format(table='tag', links='tags'),
+            DROP_UNIQUE_NAME_SQL.format(table='tag')),
+        migrations.RunSQL(
+            UNIQUE_NAME_SQL.format(table='ingredient', links='ingredients'),
+            DROP_UNIQUE_NAME_SQL.format(table='ingredient')),
+    ]
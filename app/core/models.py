@@ -1,12 +1,32 @@
+import hashlib
+import json
 import uuid
 import os
 
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 from django.conf import settings
 
 
+RECIPE_IMAGE_DIR = 'uploads/recipe'
+
+
+def sharded_image_path(filename):
+    """Return the path of a recipe image in the two-level sharded layout
+
+    The directories come from a hash of the file name, e.g.
+    ``uploads/recipe/3f/a2/<name>``, which keeps every directory small.
+
+    :param filename:
+    :return:
+    """
+    digest = hashlib.md5(filename.encode()).hexdigest()
+    return os.path.join(RECIPE_IMAGE_DIR, digest[:2], digest[2:4], filename)
+
+
 def recipe_image_file_path(instance, filename):
     """Generate file path for new recipe image
 
@@ -16,7 +36,7 @@ def recipe_image_file_path(instance, filename):
     """
     ext = filename.split('.')[-1]
     result = f"{uuid.uuid4()}.{ext}"
-    return os.path.join('uploads/recipe', result)
+    return sharded_image_path(result)
 
 
 class UserManager(BaseUserManager):
@@ -72,15 +92,83 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "email"
 
 
+class RecipeAttrManager(models.Manager):
+    """Manager for per-user named recipe attributes (tags, ingredients)
+
+    """
+
+    # Names are matched with the database's lower(), as the unique index
+    # is: Python's str.lower() disagrees with it on some non-ASCII names.
+    UPSERT_SQL = """
+        WITH input (name, position) AS (
+            SELECT * FROM unnest(%(names)s::text[]) WITH ORDINALITY
+        ),
+        inserted AS (
+            INSERT INTO {table} (user_id, name, updated_at)
+            SELECT %(user_id)s, name, now() FROM input ORDER BY position
+            ON CONFLICT (user_id, lower(name)) DO NOTHING
+            RETURNING id, name
+        )
+        SELECT i.name, r.id, r.name FROM input i JOIN inserted r
+            ON lower(r.name) = lower(i.name)
+        UNION ALL
+        SELECT i.name, t.id, t.name FROM input i JOIN {table} t
+            ON lower(t.name) = lower(i.name)
+        WHERE t.user_id = %(user_id)s
+    """
+
+    def bulk_get_or_create(self, user, names):
+        """Return {name: (id, stored name)} creating missing names
+
+        Existing and new rows are resolved with a single
+        INSERT ... ON CONFLICT DO NOTHING round trip; names match case
+        insensitively, and the first of several matching new names is
+        stored. A row inserted concurrently by another transaction is
+        invisible to that statement, so it is looked up once more.
+
+        :param user:
+        :param names:
+        :return:
+        """
+        wanted = list(dict.fromkeys(names))
+
+        sql = self.UPSERT_SQL.format(
+            table=connection.ops.quote_name(self.model._meta.db_table))
+        found = {}
+        for _ in range(2):
+            pending = [name for name in wanted if name not in found]
+            if not pending:
+                break
+
+            with connection.cursor() as cursor:
+                cursor.execute(sql, {"names": pending, "user_id": user.pk})
+                for name, pk, stored in cursor.fetchall():
+                    found[name] = (pk, stored)
+
+        return found
+
+
 class Tag(models.Model):
     """Tag to be used for a recipe
 
+    Names are unique per user, ignoring case, through the
+    (user_id, lower(name)) unique index added in migration 0009.
     """
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    objects = RecipeAttrManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-name', '-id'],
+                         name='core_tag_user_name_idx'),
+            models.Index(fields=['user', 'updated_at'],
+                         name='core_tag_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -89,17 +177,109 @@ class Tag(models.Model):
 class Ingredient(models.Model):
     """Ingredient to be used in a recipe
 
+    Names are unique per user, ignoring case, through the
+    (user_id, lower(name)) unique index added in migration 0009.
     """
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    objects = RecipeAttrManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-name', '-id'],
+                         name='core_ingr_user_name_idx'),
+            models.Index(fields=['user', 'updated_at'],
+                         name='core_ingr_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class ImageBlobManager(models.Manager):
+    """Manager keeping the reference counts of shared image files
+
+    """
+
+    ACQUIRE_SQL = """
+        INSERT INTO core_imageblob
+            (sha256, image, size, variants, ref_count, created_at)
+        VALUES (%(sha256)s, %(image)s, %(size)s, '{}', 1, now())
+        ON CONFLICT (sha256)
+            DO UPDATE SET ref_count = core_imageblob.ref_count + 1
+        RETURNING id, image, variants, xmax = 0
+    """
+
+    RELEASE_SQL = """
+        UPDATE core_imageblob SET ref_count = ref_count - 1
+        WHERE id = %s RETURNING ref_count
+    """
+
+    DELETE_UNUSED_SQL = """
+        DELETE FROM core_imageblob WHERE id = %s AND ref_count <= 0
+        RETURNING image, variants
+    """
+
+    def acquire(self, sha256, image, size):
+        """Add a reference to the blob with the given hash, creating it
+
+        The upsert locks the blob row until the transaction ends, so a
+        concurrent upload of the same content waits for the file to be
+        stored.
+
+        :param sha256: hex digest of the content
+        :param image: storage path to use if the blob is new
+        :param size:
+        :return: (id, image, variants, created)
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(self.ACQUIRE_SQL, {
+                "sha256": sha256, "image": image, "size": size})
+            blob_id, image, variants, created = cursor.fetchone()
+
+        return blob_id, image, json.loads(variants), created
+
+    def release(self, blob_id):
+        """Drop a reference to a blob, deleting the row when none are left
+
+        :param blob_id:
+        :return: (image, variants) of the deleted blob, or None
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(self.RELEASE_SQL, [blob_id])
+            row = cursor.fetchone()
+            if row is None or row[0] > 0:
+                return None
+
+            cursor.execute(self.DELETE_UNUSED_SQL, [blob_id])
+            row = cursor.fetchone()
+
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+
+class ImageBlob(models.Model):
+    """Image file shared by every recipe uploading the same content
+
+    Files are named by the SHA-256 of their content and carry the variants
+    rendered from them, so identical uploads are stored and resized once.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    image = models.ImageField()
+    size = models.BigIntegerField()
+    variants = models.JSONField(default=dict, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ImageBlobManager()
+
+    def __str__(self):
+        return self.sha256
+
+
 class Recipe(models.Model):
     """Recipe representation
 
@@ -112,9 +292,80 @@ class Recipe(models.Model):
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
-    ingredients = models.ManyToManyField('Ingredient')
-    tags = models.ManyToManyField('Tag')
+    ingredients = models.ManyToManyField(
+        'Ingredient', through='RecipeIngredient')
+    tags = models.ManyToManyField('Tag', through='RecipeTag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    image_blob = models.ForeignKey(
+        'ImageBlob', null=True, blank=True, editable=False,
+        on_delete=models.SET_NULL)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-title', '-id'],
+                         name='core_recipe_user_title_idx'),
+            models.Index(fields=['user', 'updated_at'],
+                         name='core_recipe_user_updated_idx'),
+            GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeIngredient(models.Model):
+    """Link between a recipe and one of its ingredients
+
+    Mirrors the auto-created through table so it can carry an index for
+    looking up recipes by ingredient.
+    """
+    recipe = models.ForeignKey('Recipe', on_delete=models.CASCADE)
+    ingredient = models.ForeignKey(
+        'Ingredient', on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        db_table = 'core_recipe_ingredients'
+        unique_together = [('recipe', 'ingredient')]
+        indexes = [
+            models.Index(fields=['ingredient', 'recipe'],
+                         name='core_ringr_ingr_recipe_idx'),
+        ]
+
+
+class RecipeTag(models.Model):
+    """Link between a recipe and one of its tags
+
+    Mirrors the auto-created through table so it can carry an index for
+    looking up recipes by tag.
+    """
+    recipe = models.ForeignKey('Recipe', on_delete=models.CASCADE)
+    tag = models.ForeignKey('Tag', on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        db_table = 'core_recipe_tags'
+        unique_together = [('recipe', 'tag')]
+        indexes = [
+            models.Index(fields=['tag', 'recipe'],
+                         name='core_rtags_tag_recipe_idx'),
+        ]
+
+
+class ImportCheckpoint(models.Model):
+    """Progress of a bulk recipe import, for resuming it
+
+    Updated in the same transaction as each imported batch, so the
+    position never runs ahead of or behind the rows actually stored. The
+    fingerprint identifies the input the position refers to.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    fingerprint = models.CharField(max_length=64, blank=True)
+    position = models.BigIntegerField(default=0)
+    imported = models.BigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
@@ -0,0 +1,209 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = "api"
+PIN_PREFIX = "db:pin:"
+# Cache backends every worker process has its own copy of.
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Seconds the replica is behind the primary. A replica that has replayed
+# everything it received is caught up even if the primary has been idle
+# since its last transaction.
+LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery()
+        OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+END
+"""
+
+# Database the current request reads from, if not the default one.
+_read_alias = contextvars.ContextVar("read_alias", default=None)
+
+# {alias: (checked until, usable)} of this process' replica checks.
+_health = {}
+_health_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, "DATABASE_REPLICAS", {}).get(name, default)
+
+
+def get_replica_aliases():
+    """Return the aliases of the configured read replicas
+
+    :return:
+    """
+    return _setting("ALIASES", ())
+
+
+def get_routed_namespaces():
+    """Return the URL namespaces whose safe requests may read from replicas
+
+    :return:
+    """
+    return _setting("NAMESPACES", ())
+
+
+def set_read_alias(alias):
+    """Route the current request's reads to a database
+
+    :param alias: replica alias, or None for the default routing
+    :return:
+    """
+    _read_alias.set(alias)
+
+
+def get_read_alias():
+    """Return the database the current request reads from, or None
+
+    :return:
+    """
+    return _read_alias.get()
+
+
+def pin_user(user_id):
+    """Keep a user's reads on the primary for PIN_SECONDS
+
+    Called after their writes, so they read them back even from a replica
+    that has not replayed them yet.
+
+    :param user_id:
+    :return:
+    """
+    seconds = _setting("PIN_SECONDS", 5)
+    if seconds:
+        caches[CACHE_ALIAS].set(f"{PIN_PREFIX}{user_id}", True, seconds)
+
+
+def is_pinned(user_id):
+    """Return whether a user's reads must stay on the primary
+
+    :param user_id:
+    :return:
+    """
+    return caches[CACHE_ALIAS].get(f"{PIN_PREFIX}{user_id}") is not None
+
+
+def check_pin_cache(app_configs, **kwargs):
+    """System check: pins must be visible to every worker process
+
+    A user pinned by the worker that handled their write would otherwise
+    read from a lagging replica on any other worker.
+
+    :param app_configs:
+    :param kwargs:
+    :return: list of errors
+    """
+    if not get_replica_aliases() or not _setting("PIN_SECONDS", 5):
+        return []
+
+    backend = settings.CACHES.get(CACHE_ALIAS, {}).get("BACKEND")
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+
+    return [checks.Error(
+        f"Read replicas need a shared {CACHE_ALIAS!r} cache to pin users "
+        f"to the primary, not {backend}.",
+        hint="Set API_CACHE_BACKEND and API_CACHE_LOCATION to a cache "
+             "shared by all workers, such as Memcached or Redis.",
+        id="core.E001",
+    )]
+
+
+def replica_lag(alias):
+    """Return how many seconds a replica is behind, or None if unknown
+
+    :param alias:
+    :return:
+    """
+    with connections[alias].cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        lag = cursor.fetchone()[0]
+
+    return None if lag is None else float(lag)
+
+
+def _is_usable(alias):
+    """Return whether a replica is reachable and lags at most MAX_LAG
+
+    The answer is kept for CHECK_INTERVAL seconds, or RETRY_INTERVAL after
+    the replica could not be reached.
+
+    :param alias:
+    :return:
+    """
+    now = time.monotonic()
+    with _health_lock:
+        entry = _health.get(alias)
+    if entry is not None and now < entry[0]:
+        return entry[1]
+
+    try:
+        lag = replica_lag(alias)
+    except DatabaseError as exc:
+        logger.warning("Replica %s unavailable: %s", alias, exc)
+        usable, interval = False, _setting("RETRY_INTERVAL", 10)
+    else:
+        usable = lag is not None and lag <= _setting("MAX_LAG", 2)
+        interval = _setting("CHECK_INTERVAL", 1)
+        if not usable:
+            logger.warning("Replica %s lagging by %ss", alias, lag)
+
+    with _health_lock:
+        _health[alias] = (now + interval, usable)
+    return usable
+
+
+def choose_replica():
+    """Return a random usable replica, or the default database if none is
+
+    :return:
+    """
+    aliases = list(get_replica_aliases())
+    random.shuffle(aliases)
+    for alias in aliases:
+        if _is_usable(alias):
+            return alias
+
+    return DEFAULT_DB_ALIAS
+
+
+def reset_replica_health():
+    """Forget the replica checks, so the next requests check again
+
+    :return:
+    """
+    with _health_lock:
+        _health.clear()
+
+
+class ReplicaRouter:
+    """Route reads to the replica chosen for the request
+
+    Writes always go to the default database, even for instances read from
+    a replica. Replicas hold the same data, so relations across them are
+    allowed.
+    """
+
+    def db_for_read(self, model, **hints):
+        return get_read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
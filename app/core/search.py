@@ -0,0 +1,71 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+    SearchVector
+from django.db.models import DecimalField, F, OuterRef, Subquery
+from django.db.models.functions import Cast, Now
+
+SEARCH_CONFIG = "english"
+
+
+def _related_names(through, field):
+    """Return a subquery aggregating the related names for a recipe
+
+    :param through:
+    :param field:
+    :return:
+    """
+    return Subquery(
+        through.objects.filter(recipe=OuterRef("pk")).order_by().values(
+            "recipe").annotate(
+            names=StringAgg(f"{field}__name", " ")).values("names")
+    )
+
+
+def update_search_vectors(recipe_ids, touch=False):
+    """Recompute the search vector of the given recipes in one query
+
+    Titles are weighted above tag and ingredient names.
+
+    :param recipe_ids:
+    :param touch: also bump updated_at, for changes made outside the row
+    :return:
+    """
+    from core.models import Recipe, RecipeTag, RecipeIngredient
+
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return 0
+
+    vector = (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG) +
+        SearchVector(_related_names(RecipeTag, "tag"),
+                     weight="B", config=SEARCH_CONFIG) +
+        SearchVector(_related_names(RecipeIngredient, "ingredient"),
+                     weight="B", config=SEARCH_CONFIG)
+    )
+
+    fields = {"search_vector": vector}
+    if touch:
+        fields["updated_at"] = Now()
+
+    return Recipe.objects.filter(pk__in=recipe_ids).update(**fields)
+
+
+def search_recipes(queryset, text):
+    """Filter recipes matching the search text, best matches first
+
+    Matching uses the GIN-indexed search vector rather than scanning the
+    title and related names. The rank is a float4, cast to a fixed-scale
+    numeric so keyset cursors carry it exactly and match it again.
+
+    :param queryset:
+    :param text:
+    :return:
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG)
+
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=Cast(
+            SearchRank(F("search_vector"), query),
+            DecimalField(max_digits=12, decimal_places=6))
+    ).order_by("-search_rank", "-title")
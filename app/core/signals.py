@@ -0,0 +1,127 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_delete
+from django.dispatch import receiver
+
+from core.images import release_blob
+from core.models import Recipe, Tag, Ingredient
+from core.search import update_search_vectors
+from core.timing import time_queries
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """Time the queries of sampled requests on every connection
+
+    The wrapper only reads a context variable for other requests. It is
+    installed once per connection rather than per request, since under ASGI
+    the views may query from another thread than the middleware runs on.
+
+    :param sender:
+    :param connection:
+    :param kwargs:
+    :return:
+    """
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, raw=False, **kwargs):
+    """Keep the search vector in sync with the recipe title
+
+    :param sender:
+    :param instance:
+    :param raw:
+    :param kwargs:
+    :return:
+    """
+    if not raw:
+        update_search_vectors([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Release the shared image of a deleted recipe
+
+    :param sender:
+    :param instance:
+    :param kwargs:
+    :return:
+    """
+    if instance.image_blob_id is not None:
+        release_blob(instance.image_blob_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, model,
+                             pk_set, **kwargs):
+    """Keep the search vector and updated_at in sync with M2M changes
+
+    :param sender:
+    :param instance:
+    :param action:
+    :param reverse:
+    :param model:
+    :param pk_set:
+    :param kwargs:
+    :return:
+    """
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            update_search_vectors([instance.pk], touch=True)
+    elif action == "pre_clear":
+        instance._search_recipe_ids = list(
+            instance.recipe_set.values_list("pk", flat=True))
+    elif action == "post_clear":
+        update_search_vectors(
+            getattr(instance, "_search_recipe_ids", []), touch=True)
+    elif action in ("post_add", "post_remove"):
+        update_search_vectors(pk_set, touch=True)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_saved(sender, instance, created=False, raw=False,
+                      **kwargs):
+    """Reindex the recipes using a renamed tag or ingredient
+
+    :param sender:
+    :param instance:
+    :param created:
+    :param raw:
+    :param kwargs:
+    :return:
+    """
+    if not created and not raw:
+        update_search_vectors(
+            instance.recipe_set.values_list("pk", flat=True), touch=True)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    """Remember the recipes using a tag or ingredient before it goes
+
+    :param sender:
+    :param instance:
+    :param kwargs:
+    :return:
+    """
+    instance._search_recipe_ids = list(
+        instance.recipe_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    """Reindex the recipes that used a deleted tag or ingredient
+
+    :param sender:
+    :param instance:
+    :param kwargs:
+    :return:
+    """
+    update_search_vectors(
+        getattr(instance, "_search_recipe_ids", []), touch=True)
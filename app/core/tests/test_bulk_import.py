@@ -0,0 +1,232 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core import bulk_import
+from core.models import ImportCheckpoint, Ingredient, Recipe, Tag
+from core.search import search_recipes
+
+
+def ndjson(*rows):
+    """Return a stream of NDJSON rows
+
+    :param rows:
+    :return:
+    """
+    return StringIO("".join(json.dumps(row) + "\n" for row in rows))
+
+
+class BulkImportTests(TestCase):
+    """Tests for the COPY based recipe import
+
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "test@travelperk.com", "password123")
+        self.other = get_user_model().objects.create_user(
+            "other@travelperk.com", "password123")
+        self.vegan = Tag.objects.create(user=self.user, name="Vegan")
+
+    def recipe(self, title, **fields):
+        return dict({"title": title, "time_minutes": 10, "price": "4.50",
+                     "tags": [], "ingredients": []}, **fields)
+
+    def test_import_ndjson(self):
+        """Test recipes and their links are stored
+
+        """
+        stats = bulk_import.import_recipes(ndjson(
+            self.recipe("Curry", tags=["vegan", "Spicy"],
+                        ingredients=["Salt", "Pepper", "salt"],
+                        link="https://example.com/curry"),
+            self.recipe("Cake", user="other@travelperk.com", tags=["Sweet"]),
+        ), "ndjson", "test", user=self.user)
+
+        self.assertEqual(2, stats["imported"])
+        curry = Recipe.objects.get(title="Curry")
+        self.assertEqual(self.user, curry.user)
+        self.assertEqual(Decimal("4.50"), curry.price)
+        self.assertEqual("https://example.com/curry", curry.link)
+        self.assertEqual(["Spicy", "Vegan"],
+                         sorted(curry.tags.values_list("name", flat=True)))
+        self.assertEqual(["Pepper", "Salt"], sorted(
+            curry.ingredients.values_list("name", flat=True)))
+        self.assertIn(self.vegan, curry.tags.all())
+        self.assertEqual(1, Ingredient.objects.filter(name="Salt").count())
+
+        cake = Recipe.objects.get(title="Cake")
+        self.assertEqual(self.other, cake.user)
+        self.assertEqual(self.other, cake.tags.get().user)
+        self.assertEqual([curry], list(search_recipes(
+            Recipe.objects.all(), "pepper")))
+
+    def test_non_ascii_names_resolved(self):
+        """Test names Python lowercases unlike the database are resolved
+
+        """
+        city = Tag.objects.create(user=self.user, name="istanbul")
+
+        stats = bulk_import.import_recipes(ndjson(
+            self.recipe("Kebab", tags=["İstanbul"], ingredients=["ΟΔΟΣ"]),
+            self.recipe("Pide", ingredients=["οδοσ"]),
+        ), "ndjson", "test", user=self.user)
+
+        self.assertEqual(2, stats["imported"])
+        self.assertEqual([city], list(
+            Recipe.objects.get(title="Kebab").tags.all()))
+        self.assertEqual(1, Ingredient.objects.count())
+
+    def test_import_csv(self):
+        """Test the CSV layout written by the export is read
+
+        """
+        stream = StringIO(
+            "title,time_minutes,price,link,tags,ingredients\n"
+            "\"Crème, brûlée\",5,10,,Vegan|Sweet,Sugar\n")
+
+        stats = bulk_import.import_recipes(
+            stream, "csv", "test", user=self.user)
+
+        self.assertEqual(1, stats["imported"])
+        recipe = Recipe.objects.get()
+        self.assertEqual("Crème, brûlée", recipe.title)
+        self.assertEqual(2, recipe.tags.count())
+
+    def test_invalid_rows_skipped(self):
+        """Test invalid rows are reported without stopping the import
+
+        """
+        stream = StringIO(
+            json.dumps(self.recipe("Curry")) + "\n"
+            "not json\n" +
+            json.dumps(self.recipe("", price="1")) + "\n" +
+            json.dumps(self.recipe("Pricey", price="1000")) + "\n" +
+            json.dumps(self.recipe("Nobody", user="x@example.com")) + "\n" +
+            json.dumps(self.recipe("Slow", time_minutes=2 ** 31)) + "\n"
+        )
+
+        stats = bulk_import.import_recipes(
+            stream, "ndjson", "test", user=self.user)
+
+        self.assertEqual(1, stats["imported"])
+        self.assertEqual(5, stats["skipped"])
+        self.assertEqual([2, 3, 4, 5, 6],
+                         [row for row, _ in stats["errors"]])
+        self.assertEqual(["Curry"], [r.title for r in Recipe.objects.all()])
+
+    def test_resume_from_checkpoint(self):
+        """Test an interrupted import skips the rows already stored
+
+        """
+        rows = [self.recipe(f"Recipe {i}") for i in range(5)]
+        original = bulk_import.import_batch
+        calls = []
+
+        def fail_on_second_batch(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("interrupted")
+            return original(*args, **kwargs)
+
+        with mock.patch("core.bulk_import.import_batch",
+                        side_effect=fail_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                bulk_import.import_recipes(
+                    ndjson(*rows), "ndjson", "test", user=self.user,
+                    batch_size=2)
+
+        self.assertEqual(2, ImportCheckpoint.objects.get(
+            name="test").position)
+        self.assertEqual(2, Recipe.objects.count())
+
+        stats = bulk_import.import_recipes(
+            ndjson(*rows), "ndjson", "test", user=self.user, batch_size=2)
+
+        self.assertEqual(2, stats["resumed_at"])
+        self.assertEqual(3, stats["imported"])
+        self.assertEqual([f"Recipe {i}" for i in range(5)], sorted(
+            Recipe.objects.values_list("title", flat=True)))
+
+    def test_restart_ignores_checkpoint(self):
+        """Test restarting imports every row again
+
+        """
+        rows = [self.recipe("Curry")]
+        bulk_import.import_recipes(
+            ndjson(*rows), "ndjson", "test", user=self.user)
+
+        stats = bulk_import.import_recipes(
+            ndjson(*rows), "ndjson", "test", user=self.user, restart=True)
+
+        self.assertEqual(1, stats["imported"])
+        self.assertEqual(2, Recipe.objects.count())
+
+    def test_completed_import_refused(self):
+        """Test a completed import is not run again without restart
+
+        """
+        rows = [self.recipe("Curry")]
+        bulk_import.import_recipes(
+            ndjson(*rows), "ndjson", "test", user=self.user)
+        self.assertTrue(ImportCheckpoint.objects.get(name="test").completed)
+
+        with self.assertRaises(bulk_import.CheckpointError):
+            bulk_import.import_recipes(
+                ndjson(*rows), "ndjson", "test", user=self.user)
+
+        self.assertEqual(1, Recipe.objects.count())
+
+    def test_changed_input_refused(self):
+        """Test an interrupted import does not resume on another input
+
+        """
+        ImportCheckpoint.objects.create(
+            name="test", fingerprint="10:1", position=1)
+
+        with self.assertRaises(bulk_import.CheckpointError):
+            bulk_import.import_recipes(
+                ndjson(self.recipe("Curry")), "ndjson", "test",
+                user=self.user, fingerprint="12:2")
+
+        stats = bulk_import.import_recipes(
+            ndjson(self.recipe("Curry")), "ndjson", "test", user=self.user,
+            fingerprint="12:2", restart=True)
+
+        self.assertEqual(1, stats["imported"])
+        self.assertEqual(
+            "12:2", ImportCheckpoint.objects.get(name="test").fingerprint)
+
+    def test_import_command(self):
+        """Test the command imports a file and reports throughput
+
+        """
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "recipes.ndjson")
+            with open(path, "w") as f:
+                f.write(ndjson(self.recipe("Curry")).getvalue())
+
+            call_command("import_recipes", path, "--user", self.user.email,
+                         stdout=out, stderr=StringIO())
+            with self.assertRaises(CommandError):
+                call_command("import_recipes", path, "--user",
+                             self.user.email, stdout=StringIO(),
+                             stderr=StringIO())
+            self.assertEqual(1, Recipe.objects.count())
+
+            call_command("import_recipes", path, "--user", self.user.email,
+                         "--restart", stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(2, Recipe.objects.count())
+        self.assertIn("imported=1", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        self.assertEqual(os.path.abspath(path),
+                         ImportCheckpoint.objects.get().name)
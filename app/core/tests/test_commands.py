@@ -1,9 +1,14 @@
+from io import StringIO
 from unittest.mock import patch
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+ENSURE_CONNECTION = "core.backends.postgresql.base.DatabaseWrapper." \
+                    "ensure_connection"
+
 
 class CommandTests(TestCase):
     """None
@@ -15,10 +20,9 @@ class CommandTests(TestCase):
 
         :return:
         """
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.return_value = True
-            call_command("wait_for_db")
-            self.assertEquals(1, gi.call_count)
+        with patch(ENSURE_CONNECTION) as ec:
+            call_command("wait_for_db", stdout=StringIO())
+            self.assertEqual(1, ec.call_count)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
@@ -26,7 +30,36 @@ class CommandTests(TestCase):
 
         :return:
         """
-        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command("wait_for_db")
-            self.assertEquals(6, gi.call_count)
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command("wait_for_db", "--delay", "1", "--max-delay", "4",
+                         stdout=StringIO())
+            self.assertEqual(6, ec.call_count)
+
+        self.assertEqual([1, 2, 4, 4, 4],
+                         [args[0] for args, _ in ts.call_args_list])
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test waiting for DB gives up after the timeout
+
+        :return:
+        """
+        with patch(ENSURE_CONNECTION) as ec:
+            ec.side_effect = OperationalError("refused")
+            with self.assertRaises(CommandError):
+                call_command("wait_for_db", "--timeout", "0",
+                             stdout=StringIO())
+
+        ts.assert_not_called()
+
+    def test_wait_for_db_connects(self):
+        """Test waiting for DB opens a real connection
+
+        :return:
+        """
+        out = StringIO()
+        call_command("wait_for_db", stdout=out)
+
+        self.assertIn("Database ready", out.getvalue())
+        self.assertIn("connected in", out.getvalue())
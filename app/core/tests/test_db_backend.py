@@ -0,0 +1,84 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+
+from core.backends.postgresql import base
+
+
+class DatabaseBackendTests(TestCase):
+    """Tests for the health-checked, timed PostgreSQL backend
+
+    Each test uses its own connection, outside the test transaction.
+    """
+
+    def setUp(self) -> None:
+        self.wrapper = connection.copy()
+        self.wrapper.settings_dict["CONN_HEALTH_CHECKS"] = True
+
+    def tearDown(self) -> None:
+        self.wrapper.close()
+
+    def test_connection_setup_is_timed(self):
+        """Test new connections are counted with their setup time
+
+        """
+        base.reset_connection_stats()
+        self.wrapper.ensure_connection()
+
+        stats = base.get_connection_stats()
+        self.assertEqual(1, stats["connects"])
+        self.assertGreater(stats["seconds"], 0)
+        self.assertEqual(stats["seconds"], self.wrapper.connect_seconds)
+
+    def test_health_check_once_per_request(self):
+        """Test a kept connection is checked once before its next use
+
+        """
+        self.wrapper.ensure_connection()
+        self.wrapper.close_if_unusable_or_obsolete()
+
+        with patch.object(self.wrapper, "is_usable",
+                          return_value=True) as is_usable:
+            self.wrapper.ensure_connection()
+            self.wrapper.ensure_connection()
+
+        self.assertEqual(1, is_usable.call_count)
+
+    def test_new_connection_not_checked(self):
+        """Test a connection opened during the request is not checked
+
+        """
+        with patch.object(self.wrapper, "is_usable") as is_usable:
+            self.wrapper.ensure_connection()
+            self.wrapper.ensure_connection()
+
+        is_usable.assert_not_called()
+
+    def test_failed_health_check_reconnects(self):
+        """Test a dead connection is replaced before it is used
+
+        """
+        self.wrapper.ensure_connection()
+        dead = self.wrapper.connection
+        self.wrapper.close_if_unusable_or_obsolete()
+
+        with patch.object(self.wrapper, "is_usable", return_value=False):
+            self.wrapper.ensure_connection()
+
+        self.assertIsNotNone(self.wrapper.connection)
+        self.assertIsNot(dead, self.wrapper.connection)
+        self.assertTrue(dead.closed)
+
+    def test_health_checks_disabled(self):
+        """Test connections are not checked without CONN_HEALTH_CHECKS
+
+        """
+        self.wrapper.settings_dict["CONN_HEALTH_CHECKS"] = False
+        self.wrapper.ensure_connection()
+        self.wrapper.close_if_unusable_or_obsolete()
+
+        with patch.object(self.wrapper, "is_usable") as is_usable:
+            self.wrapper.ensure_connection()
+
+        is_usable.assert_not_called()
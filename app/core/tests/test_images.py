@@ -0,0 +1,293 @@
+import hashlib
+import threading
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase
+from PIL import Image
+
+from core import images
+from core.models import ImageBlob, Recipe
+
+
+def sample_image(width=1200, height=800):
+    """Return the bytes of a JPEG of the given size
+
+    :param width:
+    :param height:
+    :return:
+    """
+    out = BytesIO()
+    Image.new("RGB", (width, height), "orange").save(out, format="JPEG")
+    return out.getvalue()
+
+
+class ImageProcessingTests(TestCase):
+    """Tests for rendering recipe image variants
+
+    """
+
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(
+            "test@travelperk.com", "password123")
+        self.recipe = Recipe.objects.create(
+            user=user, title="Curry", time_minutes=5, price=5.00)
+        self.recipe.image.save(
+            "curry.jpg", ContentFile(sample_image()), save=True)
+        self.image_name = self.recipe.image.name
+
+    def tearDown(self) -> None:
+        self.recipe.refresh_from_db()
+        for path in self.recipe.image_variants.values():
+            default_storage.delete(path)
+        default_storage.delete(self.image_name)
+
+    def test_process_creates_bounded_variants(self):
+        """Test every variant is written and fits its bounding box
+
+        :return:
+        """
+        paths = images.process_recipe_image(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(paths, self.recipe.image_variants)
+        self.assertEqual(
+            set(images.get_variants()), set(self.recipe.image_variants))
+        for variant, size in images.get_variants().items():
+            with default_storage.open(paths[variant]) as f:
+                width, height = Image.open(f).size
+            self.assertLessEqual(width, size[0])
+            self.assertLessEqual(height, size[1])
+            self.assertEqual(1.5, round(width / height, 1))
+
+    def test_process_skips_replaced_image(self):
+        """Test variants are discarded if the image changed meanwhile
+
+        :return:
+        """
+        store = images._store_variants
+        stored = []
+
+        def store_then_replace(name):
+            paths = store(name)
+            stored.extend(paths.values())
+            Recipe.objects.filter(pk=self.recipe.id).update(image="new.jpg")
+            return paths
+
+        with patch("core.images._store_variants", store_then_replace):
+            self.assertIsNone(images.process_recipe_image(self.recipe.id))
+
+        self.assertEqual({}, Recipe.objects.get(
+            pk=self.recipe.id).image_variants)
+        self.assertTrue(stored)
+        for path in stored:
+            self.assertFalse(default_storage.exists(path))
+
+    def test_rendering_changes_variant_paths(self):
+        """Test variants rendered differently are stored under new names
+
+        :return:
+        """
+        paths = images.process_recipe_image(self.recipe.id)
+        self.assertEqual(paths, images._store_variants(self.image_name))
+
+        with patch("core.images.render_variants",
+                   return_value={"thumb": b"other"}):
+            new_paths = images._store_variants(self.image_name)
+
+        self.addCleanup(default_storage.delete, new_paths["thumb"])
+        self.assertNotEqual(paths["thumb"], new_paths["thumb"])
+        self.assertTrue(default_storage.exists(paths["thumb"]))
+        with default_storage.open(new_paths["thumb"]) as f:
+            self.assertEqual(b"other", f.read())
+
+
+class ImageBlobTests(TestCase):
+    """Tests for sharing stored images between recipes
+
+    """
+
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(
+            "test@travelperk.com", "password123")
+        self.recipes = [
+            Recipe.objects.create(
+                user=user, title=f"Recipe {i}", time_minutes=5, price=5.00)
+            for i in range(2)
+        ]
+        self.content = sample_image(300, 200)
+        self.paths = set()
+
+    def tearDown(self) -> None:
+        for blob in ImageBlob.objects.all():
+            self.paths.update(blob.variants.values())
+        for path in self.paths:
+            default_storage.delete(path)
+
+    def attach(self, recipe, content=None):
+        created = images.attach_image(
+            recipe, ContentFile(content or self.content, name="image.jpg"))
+        self.paths.add(recipe.image.name)
+        return created
+
+    def test_identical_uploads_share_one_file(self):
+        """Test the same content is stored once for several recipes
+
+        :return:
+        """
+        self.assertTrue(self.attach(self.recipes[0]))
+        self.assertFalse(self.attach(self.recipes[1]))
+
+        blob = ImageBlob.objects.get()
+        self.assertEqual(2, blob.ref_count)
+        self.assertEqual(
+            hashlib.sha256(self.content).hexdigest(), blob.sha256)
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+            self.assertEqual(blob.image.name, recipe.image.name)
+            self.assertEqual(blob.id, recipe.image_blob_id)
+
+    def test_variants_rendered_once(self):
+        """Test a duplicate upload reuses the variants of the content
+
+        :return:
+        """
+        self.attach(self.recipes[0])
+        paths = images.process_recipe_image(self.recipes[0].id)
+
+        with patch("core.images.render_variants") as render:
+            self.attach(self.recipes[1])
+
+        render.assert_not_called()
+        self.recipes[1].refresh_from_db()
+        self.assertEqual(paths, self.recipes[1].image_variants)
+
+    def test_processing_updates_every_recipe(self):
+        """Test rendering a blob's variants updates all recipes using it
+
+        :return:
+        """
+        for recipe in self.recipes:
+            self.attach(recipe)
+
+        paths = images.process_recipe_image(self.recipes[0].id)
+
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+            self.assertEqual(paths, recipe.image_variants)
+
+    def test_force_renders_blob_again(self):
+        """Test forced processing renders a blob's variants again
+
+        :return:
+        """
+        for recipe in self.recipes:
+            self.attach(recipe)
+        self.paths.update(
+            images.process_recipe_image(self.recipes[0].id).values())
+
+        new_paths = {"thumb": "uploads/recipe/new_thumb.jpg"}
+        with patch("core.images._store_variants",
+                   return_value=new_paths) as store:
+            self.assertEqual(
+                new_paths,
+                images.process_recipe_image(self.recipes[0].id, force=True))
+
+        store.assert_called_once_with(self.recipes[0].image.name)
+        self.assertEqual(new_paths, ImageBlob.objects.get().variants)
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+            self.assertEqual(new_paths, recipe.image_variants)
+
+    def test_command_all_renders_each_blob_once(self):
+        """Test process_recipe_images --all renders shared images again
+
+        :return:
+        """
+        for recipe in self.recipes:
+            self.attach(recipe)
+        self.paths.update(
+            images.process_recipe_image(self.recipes[0].id).values())
+
+        with patch("core.images._store_variants",
+                   return_value={}) as store:
+            call_command("process_recipe_images", all=True, stdout=StringIO())
+
+        store.assert_called_once_with(self.recipes[0].image.name)
+
+    def test_replacing_image_releases_blob(self):
+        """Test the previous blob loses a reference and goes when unused
+
+        :return:
+        """
+        for recipe in self.recipes:
+            self.attach(recipe)
+        old_blob = ImageBlob.objects.get()
+
+        self.attach(self.recipes[0], sample_image(200, 200))
+        old_blob.refresh_from_db()
+        self.assertEqual(1, old_blob.ref_count)
+
+        self.attach(self.recipes[1], sample_image(200, 200))
+        self.assertFalse(ImageBlob.objects.filter(pk=old_blob.pk).exists())
+        self.assertEqual(2, ImageBlob.objects.get().ref_count)
+
+    def test_deleting_recipe_releases_blob(self):
+        """Test deleting the last recipe using a blob deletes the blob
+
+        :return:
+        """
+        self.attach(self.recipes[0])
+        self.recipes[0].delete()
+
+        self.assertFalse(ImageBlob.objects.exists())
+
+
+class ImageWorkerTests(TestCase):
+    """Tests for the background image worker
+
+    """
+
+    def test_worker_runs_jobs(self):
+        """Test submitted jobs run on the worker threads
+
+        :return:
+        """
+        done = []
+        worker = images.ImageWorker(
+            lambda value: done.append((value, threading.current_thread())),
+            workers=1, queue_size=10)
+
+        self.assertTrue(worker.submit(1))
+        self.assertTrue(worker.submit(2))
+        worker.join()
+
+        self.assertEqual([1, 2], [value for value, _ in done])
+        self.assertNotEqual(threading.current_thread(), done[0][1])
+
+    def test_worker_rejects_when_full(self):
+        """Test jobs beyond the queue size are dropped
+
+        :return:
+        """
+        started, release = threading.Event(), threading.Event()
+
+        def job(value):
+            started.set()
+            release.wait()
+
+        worker = images.ImageWorker(job, workers=1, queue_size=1)
+
+        worker.submit(1)
+        started.wait()
+        worker.submit(2)
+
+        with self.assertLogs("core.images", "WARNING"):
+            self.assertFalse(worker.submit(3))
+
+        release.set()
+        worker.join()
@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from core import models
+
+
+class IndexUsageTests(TestCase):
+    """Test the planner uses the access pattern indexes
+
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            get_user_model().objects.create_user(
+                email=f"user{i}@travelperk.com", password="password123")
+            for i in range(20)
+        ]
+        for user in cls.users:
+            models.Tag.objects.bulk_create([
+                models.Tag(user=user, name=f"Tag {i}") for i in range(20)
+            ])
+            models.Ingredient.objects.bulk_create([
+                models.Ingredient(user=user, name=f"Ingredient {i}")
+                for i in range(20)
+            ])
+            models.Recipe.objects.bulk_create([
+                models.Recipe(user=user, title=f"Recipe {i}",
+                              time_minutes=i, price=5.00)
+                for i in range(50)
+            ])
+            tags = list(models.Tag.objects.filter(user=user))
+            ingredients = list(models.Ingredient.objects.filter(user=user))
+            recipes = list(models.Recipe.objects.filter(user=user))
+
+            models.RecipeTag.objects.bulk_create([
+                models.RecipeTag(recipe=recipe, tag=tags[i % 20])
+                for i, recipe in enumerate(recipes)
+            ])
+            models.RecipeIngredient.objects.bulk_create([
+                models.RecipeIngredient(
+                    recipe=recipe, ingredient=ingredients[i % 20])
+                for i, recipe in enumerate(recipes)
+            ])
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, index_name):
+        """Assert the query plan for a queryset mentions the index
+
+        :param queryset:
+        :param index_name:
+        :return:
+        """
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_recipe_list_uses_user_title_index(self):
+        """Test listing a user's recipes uses the (user, -title) index
+
+        :return:
+        """
+        queryset = models.Recipe.objects.filter(
+            user=self.users[0]).order_by("-title", "-id")[:10]
+
+        self.assertUsesIndex(queryset, "core_recipe_user_title_idx")
+
+    def test_tag_list_uses_user_name_index(self):
+        """Test listing a user's tags uses the (user, -name) index
+
+        :return:
+        """
+        queryset = models.Tag.objects.filter(
+            user=self.users[0]).order_by("-name", "-id")[:10]
+
+        self.assertUsesIndex(queryset, "core_tag_user_name_idx")
+
+    def test_ingredient_list_uses_user_name_index(self):
+        """Test listing a user's ingredients uses the (user, -name) index
+
+        :return:
+        """
+        queryset = models.Ingredient.objects.filter(
+            user=self.users[0]).order_by("-name", "-id")[:10]
+
+        self.assertUsesIndex(queryset, "core_ingr_user_name_idx")
+
+    def test_recipe_by_tag_uses_reverse_index(self):
+        """Test looking up recipes by tag uses the (tag, recipe) index
+
+        :return:
+        """
+        tag_ids = models.Tag.objects.filter(
+            user=self.users[0]).values_list("id", flat=True)[:2]
+        queryset = models.RecipeTag.objects.filter(
+            tag_id__in=list(tag_ids)).values("recipe_id")
+
+        self.assertUsesIndex(queryset, "core_rtags_tag_recipe_idx")
+
+    def test_recipe_by_ingredient_uses_reverse_index(self):
+        """Test looking up recipes by ingredient uses the reverse index
+
+        :return:
+        """
+        ingredient_ids = models.Ingredient.objects.filter(
+            user=self.users[0]).values_list("id", flat=True)[:2]
+        queryset = models.RecipeIngredient.objects.filter(
+            ingredient_id__in=list(ingredient_ids)).values("recipe_id")
+
+        self.assertUsesIndex(queryset, "core_ringr_ingr_recipe_idx")
@@ -0,0 +1,141 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core import media_gc
+from core.models import ImageBlob, Recipe
+
+
+class MediaGCTests(TestCase):
+    """Tests for collecting orphaned recipe media
+
+    """
+
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(
+            "test@travelperk.com", "password123")
+        self.image = self.store("uploads/recipe/aa/bb/kept.jpg")
+        self.variant = self.store("uploads/recipe/aa/bb/kept_thumb.jpg")
+        self.blob_image = self.store("uploads/recipe/cc/dd/blob.jpg")
+        self.orphans = [
+            self.store("uploads/recipe/aa/bb/orphan.jpg"),
+            self.store("uploads/recipe/aa/bb/orphan_thumb.jpg"),
+            self.store("uploads/recipe/legacy.jpg"),
+        ]
+        Recipe.objects.create(
+            user=user, title="Curry", time_minutes=5, price=5.00,
+            image=self.image, image_variants={"thumb": self.variant})
+        ImageBlob.objects.create(
+            sha256="0" * 64, image=self.blob_image, size=5, ref_count=1)
+
+    def tearDown(self) -> None:
+        for path in [self.image, self.variant, self.blob_image] + \
+                self.orphans:
+            default_storage.delete(path)
+
+    def store(self, path):
+        return default_storage.save(path, ContentFile(b"image"))
+
+    def test_walk_storage_sorted(self):
+        """Test the storage walk yields paths in plain string order
+
+        :return:
+        """
+        self.store("uploads/recipe/aa-1.jpg")
+        self.orphans.append("uploads/recipe/aa-1.jpg")
+
+        paths = list(media_gc.walk_storage("uploads/recipe"))
+
+        self.assertEqual(sorted(paths), paths)
+        self.assertIn("uploads/recipe/aa-1.jpg", paths)
+
+    def test_find_orphans(self):
+        """Test only unreferenced files are reported
+
+        :return:
+        """
+        orphans = list(media_gc.find_orphans(min_age=0))
+
+        self.assertEqual(sorted(self.orphans), orphans)
+
+    @override_settings(DB_POOLER="transaction")
+    def test_pooler_streams_in_transaction(self):
+        """Test a transaction pooler still gets a server-side cursor
+
+        The cursor must not be holdable, as those outlive the transaction.
+
+        :return:
+        """
+        refs = media_gc.referenced_paths()
+        self.assertEqual(self.image, next(refs))
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT is_holdable FROM pg_cursors "
+                           "WHERE name LIKE '_django_curs_%%'")
+            self.assertEqual([(False,)], cursor.fetchall())
+        refs.close()
+
+    def test_young_files_kept(self):
+        """Test files newer than the minimum age are not reported
+
+        :return:
+        """
+        self.assertEqual([], list(media_gc.find_orphans(min_age=3600)))
+
+    def test_dry_run(self):
+        """Test a dry run reports orphans without deleting them
+
+        :return:
+        """
+        stats = media_gc.collect_orphans(min_age=0, dry_run=True)
+
+        self.assertEqual(3, stats["orphans"])
+        self.assertEqual(0, stats["deleted"])
+        self.assertEqual(15, stats["bytes"])
+        for path in self.orphans:
+            self.assertTrue(default_storage.exists(path))
+
+    def test_collect_in_batches(self):
+        """Test orphans are deleted and referenced files kept
+
+        :return:
+        """
+        reports = []
+
+        stats = media_gc.collect_orphans(
+            batch_size=2, min_age=0, report=lambda s: reports.append(dict(s)))
+
+        self.assertEqual(3, stats["deleted"])
+        self.assertEqual([2, 3], [report["deleted"] for report in reports])
+        for path in self.orphans:
+            self.assertFalse(default_storage.exists(path))
+        for path in [self.image, self.variant, self.blob_image]:
+            self.assertTrue(default_storage.exists(path))
+
+    def test_recheck_before_delete(self):
+        """Test a file referenced after the scan started is kept
+
+        :return:
+        """
+        orphans = media_gc.find_orphans(min_age=0)
+        first = next(orphans)
+        Recipe.objects.filter(image=self.image).update(image=first)
+
+        self.assertEqual({first}, media_gc._recheck([first]))
+
+    def test_command(self):
+        """Test the command reports progress and a summary
+
+        :return:
+        """
+        out = StringIO()
+
+        call_command("gc_media", min_age=0, dry_run=True, stdout=out)
+
+        self.assertIn("orphans=3", out.getvalue())
+        self.assertIn("would delete 15 bytes", out.getvalue())
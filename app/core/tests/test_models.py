@@ -124,5 +124,5 @@ class ModelTests(TestCase):
 
         file_path = models.recipe_image_file_path(None, "my_image.jpg")
 
-        exp_path = f'uploads/recipe/{uuid}.jpg'
+        exp_path = f'uploads/recipe/d4/7c/{uuid}.jpg'
         self.assertEqual(exp_path, file_path)
@@ -0,0 +1,375 @@
+import tempfile
+import threading
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import aiodb, routers
+from core.models import Recipe
+from user import authentication
+
+RECIPES_URL = reverse("recipe:recipe-list")
+RECIPES_ASYNC_URL = reverse("recipe:recipe-list-async")
+
+REPLICAS = {
+    "ALIASES": ["replica_a", "replica_b"],
+    "NAMESPACES": ("recipe", "user"),
+    "PIN_SECONDS": 5,
+    "MAX_LAG": 2,
+    "CHECK_INTERVAL": 1,
+    "RETRY_INTERVAL": 10,
+}
+
+MEMCACHED = {
+    "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+    "LOCATION": "127.0.0.1:11211",
+}
+
+# A stand-in replica is a separate database, so the tests can see which
+# database a request read from.
+STANDIN = "replica_standin"
+HAS_STANDIN = STANDIN in settings.DATABASES
+# The test runner sets up the databases of skipped tests as well.
+STANDIN_DATABASES = {DEFAULT_DB_ALIAS, STANDIN} & set(settings.DATABASES)
+
+
+def _reset_caches():
+    routers.reset_replica_health()
+    authentication.local_cache.clear()
+    caches[routers.CACHE_ALIAS].clear()
+
+
+def _create_client(email):
+    """Return a user and a client authenticated with their token
+
+    Routing needs the token in the request, not a forced authentication.
+
+    :param email:
+    :return:
+    """
+    user = get_user_model().objects.create_user(
+        email=email, password="password123")
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+    return user, client
+
+
+class ReplicaRouterTests(TestCase):
+    """Tests for choosing replicas and pinning users"""
+
+    def setUp(self) -> None:
+        _reset_caches()
+        self.router = routers.ReplicaRouter()
+
+    def tearDown(self) -> None:
+        routers.set_read_alias(None)
+
+    def test_reads_follow_request_alias(self):
+        """Test reads use the request's replica, and the default otherwise
+
+        """
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+        routers.set_read_alias("replica_a")
+        self.assertEqual("replica_a", self.router.db_for_read(Recipe))
+
+    def test_writes_go_to_default(self):
+        """Test writes use the default database, even for replica rows
+
+        """
+        recipe = Recipe(title="Curry", time_minutes=5, price=1)
+        recipe._state.db = "replica_a"
+        routers.set_read_alias("replica_a")
+
+        self.assertEqual(
+            DEFAULT_DB_ALIAS,
+            self.router.db_for_write(Recipe, instance=recipe))
+
+    def test_pin_user(self):
+        """Test pinned users are remembered for PIN_SECONDS
+
+        """
+        routers.pin_user(1)
+
+        self.assertTrue(routers.is_pinned(1))
+        self.assertFalse(routers.is_pinned(2))
+
+    def test_pin_shared_between_workers(self):
+        """Test a pin made through one cache instance is seen by another
+
+        Each thread gets its own cache instances, as each worker does.
+
+        """
+        api_cache = {"BACKEND":
+                     "django.core.cache.backends.filebased.FileBasedCache"}
+        seen = {}
+
+        def read_pin():
+            seen["cache"] = caches[routers.CACHE_ALIAS]
+            seen["pinned"] = routers.is_pinned(1)
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+                CACHES=dict(settings.CACHES, api=dict(
+                    api_cache, LOCATION=directory))):
+            routers.pin_user(1)
+            thread = threading.Thread(target=read_pin)
+            thread.start()
+            thread.join()
+
+            self.assertIsNot(caches[routers.CACHE_ALIAS], seen["cache"])
+        self.assertTrue(seen["pinned"])
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_process_local_pin_cache_rejected(self):
+        """Test replicas need a pin cache shared by the workers
+
+        """
+        errors = routers.check_pin_cache(None)
+        self.assertEqual(["core.E001"], [error.id for error in errors])
+
+        with override_settings(CACHES=dict(settings.CACHES, api=MEMCACHED)):
+            self.assertEqual([], routers.check_pin_cache(None))
+
+    def test_pin_cache_unchecked_without_replicas(self):
+        """Test the pin cache may be local when no replica is configured
+
+        """
+        self.assertEqual([], routers.check_pin_cache(None))
+
+    @override_settings(DATABASE_REPLICAS=dict(REPLICAS, PIN_SECONDS=0))
+    def test_pin_disabled(self):
+        """Test no user is pinned when PIN_SECONDS is 0
+
+        """
+        routers.pin_user(1)
+
+        self.assertFalse(routers.is_pinned(1))
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_lagging_replica_skipped(self):
+        """Test replicas lagging more than MAX_LAG are not chosen
+
+        """
+        lags = {"replica_a": 10.0, "replica_b": 0.5}
+        with patch("core.routers.replica_lag", side_effect=lags.get), \
+                self.assertLogs("core.routers", "WARNING"):
+            for _ in range(5):
+                self.assertEqual("replica_b", routers.choose_replica())
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_unknown_lag_skipped(self):
+        """Test replicas that cannot tell their lag are not chosen
+
+        """
+        with patch("core.routers.replica_lag", return_value=None), \
+                self.assertLogs("core.routers", "WARNING"):
+            self.assertEqual(DEFAULT_DB_ALIAS, routers.choose_replica())
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_unreachable_replicas_fall_back(self):
+        """Test unreachable replicas fall back to the primary for a while
+
+        """
+        with patch("core.routers.replica_lag",
+                   side_effect=OperationalError("down")) as replica_lag, \
+                self.assertLogs("core.routers", "WARNING") as logs:
+            self.assertEqual(DEFAULT_DB_ALIAS, routers.choose_replica())
+            self.assertEqual(DEFAULT_DB_ALIAS, routers.choose_replica())
+
+        self.assertEqual(2, replica_lag.call_count)
+        self.assertEqual(2, len(logs.output))
+
+    @override_settings(
+        DATABASE_REPLICAS=dict(REPLICAS, ALIASES=["replica_a"]))
+    def test_checks_cached(self):
+        """Test a replica's lag is checked once per CHECK_INTERVAL
+
+        """
+        with patch("core.routers.replica_lag", return_value=0.0) as \
+                replica_lag, patch("core.routers.time.monotonic") as now:
+            now.return_value = 100.0
+            routers.choose_replica()
+            routers.choose_replica()
+            self.assertEqual(1, replica_lag.call_count)
+
+            now.return_value = 101.5
+            routers.choose_replica()
+            self.assertEqual(2, replica_lag.call_count)
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+@patch("core.routers.choose_replica", return_value=DEFAULT_DB_ALIAS)
+class ReplicaRoutingMiddlewareTests(TestCase):
+    """Tests for which requests read from a replica"""
+
+    def setUp(self) -> None:
+        _reset_caches()
+        self.user, self.client = _create_client("test@travelperk.com")
+
+    def test_safe_request_routed(self, choose_replica):
+        """Test safe token requests read from a replica
+
+        """
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        choose_replica.assert_called_once_with()
+        self.assertIsNone(routers.get_read_alias())
+
+    def test_write_pins_user(self, choose_replica):
+        """Test reads stay on the primary after the user writes
+
+        """
+        res = self.client.post(
+            RECIPES_URL, {"title": "Curry", "time_minutes": 5, "price": 1})
+        self.assertEqual(status.HTTP_201_CREATED, res.status_code)
+
+        self.client.get(RECIPES_URL)
+
+        choose_replica.assert_not_called()
+        self.assertTrue(routers.is_pinned(self.user.pk))
+
+    def test_other_users_not_pinned(self, choose_replica):
+        """Test one user's writes do not pin other users
+
+        """
+        other, other_client = _create_client("other@travelperk.com")
+        other_client.post(
+            RECIPES_URL, {"title": "Curry", "time_minutes": 5, "price": 1})
+
+        self.client.get(RECIPES_URL)
+
+        choose_replica.assert_called_once_with()
+
+    def test_anonymous_request_not_routed(self, choose_replica):
+        """Test requests without a valid token are not routed
+
+        """
+        APIClient().get(RECIPES_URL)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token invalid")
+        client.get(RECIPES_URL)
+
+        choose_replica.assert_not_called()
+
+    def test_other_namespaces_not_routed(self, choose_replica):
+        """Test requests outside the routed namespaces stay on the primary
+
+        """
+        with override_settings(
+                DATABASE_REPLICAS=dict(REPLICAS, NAMESPACES=("user",))):
+            self.client.get(RECIPES_URL)
+
+        choose_replica.assert_not_called()
+
+    def test_unsafe_request_not_routed(self, choose_replica):
+        """Test unsafe requests are not routed
+
+        """
+        self.client.post(
+            RECIPES_URL, {"title": "Curry", "time_minutes": 5, "price": 1})
+
+        choose_replica.assert_not_called()
+
+
+@skipUnless(HAS_STANDIN, "needs DB_TEST_REPLICA_NAME")
+@override_settings(DATABASE_REPLICAS=dict(REPLICAS, ALIASES=[STANDIN]))
+class ReplicaReadTests(TestCase):
+    """Tests reading through stand-in replica databases
+
+    The stand-in holds different recipes than the primary, so each response
+    shows which database it was read from.
+    """
+
+    databases = STANDIN_DATABASES
+
+    def setUp(self) -> None:
+        _reset_caches()
+        self.user, self.client = _create_client("test@travelperk.com")
+        self.user.save(using=STANDIN)
+        Recipe.objects.using(STANDIN).create(
+            user=self.user, title="Replica curry", time_minutes=5, price=1)
+        Recipe.objects.create(
+            user=self.user, title="Primary curry", time_minutes=5, price=1)
+
+    def _titles(self):
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        return [recipe["title"] for recipe in res.data]
+
+    def test_reads_from_replica(self):
+        """Test lists are read from a replica
+
+        """
+        self.assertEqual(["Replica curry"], self._titles())
+
+    def test_reads_own_writes(self):
+        """Test a user reads the primary right after writing
+
+        """
+        res = self.client.post(
+            RECIPES_URL, {"title": "Soup", "time_minutes": 5, "price": 1})
+        self.assertEqual(status.HTTP_201_CREATED, res.status_code)
+        self.assertFalse(
+            Recipe.objects.using(STANDIN).filter(title="Soup").exists())
+
+        self.assertEqual(["Soup", "Primary curry"], self._titles())
+
+    def test_lagging_replicas_fall_back(self):
+        """Test lists are read from the primary while replicas lag
+
+        """
+        with patch("core.routers.replica_lag", return_value=60.0), \
+                self.assertLogs("core.routers", "WARNING"):
+            self.assertEqual(["Primary curry"], self._titles())
+
+    def test_unreachable_replicas_fall_back(self):
+        """Test lists are read from the primary while replicas are down
+
+        """
+        with patch("core.routers.replica_lag",
+                   side_effect=OperationalError("down")), \
+                self.assertLogs("core.routers", "WARNING"):
+            self.assertEqual(["Primary curry"], self._titles())
+
+
+@skipUnless(HAS_STANDIN, "needs DB_TEST_REPLICA_NAME")
+@override_settings(DATABASE_REPLICAS=dict(REPLICAS, ALIASES=[STANDIN]))
+class AsyncReplicaReadTests(TransactionTestCase):
+    """Tests the async endpoints read through the request's replica
+
+    The async views only see committed rows, hence TransactionTestCase.
+    """
+
+    databases = STANDIN_DATABASES
+
+    def setUp(self) -> None:
+        _reset_caches()
+        self.user, self.client = _create_client("test@travelperk.com")
+        self.user.save(using=STANDIN)
+        Recipe.objects.using(STANDIN).create(
+            user=self.user, title="Replica curry", time_minutes=5, price=1)
+
+    def tearDown(self) -> None:
+        aiodb.close_pools()
+
+    def test_async_list_reads_from_replica(self):
+        """Test the async list is read from a replica
+
+        """
+        res = self.client.get(RECIPES_ASYNC_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(
+            ["Replica curry"],
+            [recipe["title"] for recipe in res.json()])
@@ -0,0 +1,129 @@
+import datetime
+import os
+import posixpath
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Recipe, recipe_image_file_path, sharded_image_path
+
+
+def sharded_thumb_path(name):
+    """Return where the thumb of a flat image named name is moved to
+
+    :param name:
+    :return:
+    """
+    directory = posixpath.dirname(sharded_image_path(f"{name}.jpg"))
+    return posixpath.join(directory, f"{name}_thumb.jpg")
+
+
+class ShardRecipeImagesTests(TestCase):
+    """Tests for moving recipe images into the sharded layout
+
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "test@travelperk.com", "password123")
+        self.paths = []
+
+    def tearDown(self) -> None:
+        for path in self.paths:
+            default_storage.delete(path)
+
+    def flat_recipe(self, name):
+        """Create a recipe whose image and variant use the flat layout
+
+        :param name:
+        :return:
+        """
+        image = default_storage.save(
+            f"uploads/recipe/{name}.jpg", ContentFile(b"image"))
+        thumb = default_storage.save(
+            f"uploads/recipe/{name}_thumb.jpg", ContentFile(b"thumb"))
+        self.paths += [
+            image, thumb, sharded_image_path(f"{name}.jpg"),
+            sharded_thumb_path(name)]
+
+        return Recipe.objects.create(
+            user=self.user, title=name, time_minutes=5, price=5.00,
+            image=image, image_variants={"thumb": thumb})
+
+    def test_new_uploads_are_sharded(self):
+        """Test new image paths use two levels of hashed directories
+
+        :return:
+        """
+        path = recipe_image_file_path(None, "curry.jpg")
+
+        self.assertRegex(path, r"^uploads/recipe/[0-9a-f]{2}/[0-9a-f]{2}/")
+        self.assertEqual(sharded_image_path(path.split("/")[-1]), path)
+
+    def test_moves_files_and_rewrites_paths(self):
+        """Test images and variants are moved and their paths updated
+
+        :return:
+        """
+        recipes = [self.flat_recipe(f"image{i}") for i in range(3)]
+        long_ago = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        Recipe.objects.update(updated_at=long_ago)
+        for recipe in recipes:
+            os.utime(default_storage.path(recipe.image.name),
+                     (long_ago.timestamp(), long_ago.timestamp()))
+        start = timezone.now()
+
+        call_command("shard_recipe_images", batch_size=2, stdout=StringIO())
+
+        for recipe in recipes:
+            old_image = recipe.image.name
+            recipe.refresh_from_db()
+            self.assertGreater(recipe.updated_at, long_ago)
+            # Moved files are not old enough for gc_media to collect.
+            self.assertGreaterEqual(
+                default_storage.get_modified_time(recipe.image.name),
+                start.replace(microsecond=0))
+            self.assertEqual(
+                sharded_image_path(old_image.split("/")[-1]),
+                recipe.image.name)
+            self.assertEqual(
+                sharded_thumb_path(recipe.title),
+                recipe.image_variants["thumb"])
+            self.assertFalse(default_storage.exists(old_image))
+            self.assertTrue(default_storage.exists(recipe.image.name))
+            self.assertTrue(
+                default_storage.exists(recipe.image_variants["thumb"]))
+
+    def test_resumes_after_interruption(self):
+        """Test a rerun finishes a batch whose files were already moved
+
+        :return:
+        """
+        recipe = self.flat_recipe("moved")
+        new_image = sharded_image_path("moved.jpg")
+        with default_storage.open(recipe.image.name) as f:
+            default_storage.save(new_image, f)
+        default_storage.delete(recipe.image.name)
+
+        call_command("shard_recipe_images", stdout=StringIO())
+
+        recipe.refresh_from_db()
+        self.assertEqual(new_image, recipe.image.name)
+
+    def test_limit(self):
+        """Test --limit stops after the given number of recipes
+
+        :return:
+        """
+        for i in range(3):
+            self.flat_recipe(f"limit{i}")
+
+        call_command("shard_recipe_images", limit=2, stdout=StringIO())
+
+        self.assertEqual(1, Recipe.objects.filter(
+            image__regex=r"^uploads/recipe/[^/]+$").count())
@@ -0,0 +1,231 @@
+import asyncio
+import re
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncClient, SimpleTestCase, TestCase, \
+    TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import aiodb, timing
+from core.models import Recipe
+from user import authentication
+
+RECIPES_URL = reverse("recipe:recipe-list")
+RECIPES_ASYNC_URL = reverse("recipe:recipe-list-async")
+CREATE_USER_URL = reverse("user:create")
+
+TIMING = {"SAMPLE_RATE": 1.0, "NAMESPACES": ("recipe", "user")}
+SLOW_SECONDS = 0.5
+
+
+async def slow_view(request):
+    await asyncio.sleep(SLOW_SECONDS)
+    return HttpResponse()
+
+
+# URLconf of the ASGI tests: a slow async view in a timed namespace.
+urlpatterns = [
+    path("slow/", include(([path("", slow_view, name="slow")], "recipe"))),
+]
+
+
+def _metrics(header):
+    """Return {name: (duration, description)} from a Server-Timing header
+
+    :param header:
+    :return:
+    """
+    metrics = {}
+    for metric in header.split(", "):
+        match = re.fullmatch(
+            r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', metric)
+        metrics[match[1]] = (float(match[2]), match[3])
+    return metrics
+
+
+class TimingTests(TestCase):
+    """Tests for the request timings"""
+
+    def tearDown(self) -> None:
+        timing.stop_timing()
+
+    def test_measure_excludes_queries(self):
+        """Test measured steps do not count the queries run meanwhile
+
+        """
+        timings = timing.start_timing()
+        with patch("core.timing.time.perf_counter", side_effect=[1.0, 3.0]):
+            with timing.measure("serializer"):
+                timings.add_query(0.5)
+
+        self.assertEqual({"serializer": 1.5}, timings.durations)
+        self.assertEqual((1, 0.5), (timings.queries, timings.db))
+
+    def test_measure_without_timing(self):
+        """Test nothing is recorded for requests that are not timed
+
+        """
+        with timing.measure("serializer"):
+            timing.record_query(0.5)
+
+        self.assertIsNone(timing.get_timings())
+
+    def test_header(self):
+        """Test the Server-Timing header lists every metric in ms
+
+        """
+        timings = timing.start_timing()
+        timings.add_query(0.002)
+        timings.add("serializer", 0.001)
+
+        self.assertEqual(
+            'db;dur=2.00;desc="1 queries", serializer;dur=1.00, '
+            'total;dur=5.00',
+            timings.as_header(0.005))
+
+
+@override_settings(SERVER_TIMING=TIMING)
+class ServerTimingMiddlewareTests(TestCase):
+    """Tests for the Server-Timing header and logs"""
+
+    def setUp(self) -> None:
+        authentication.local_cache.clear()
+        caches["api"].clear()
+
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com", password="password123")
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=5, price=1)
+
+    def test_list_timed(self):
+        """Test a sampled list reports its queries, auth and serializer
+
+        """
+        with CaptureQueriesContext(connection) as queries, \
+                self.assertLogs("core.middleware", "INFO") as logs:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        metrics = _metrics(res["Server-Timing"])
+        self.assertEqual(
+            ["auth", "db", "serializer", "total"], sorted(metrics))
+        self.assertEqual(f"{len(queries)} queries", metrics["db"][1])
+        self.assertGreater(metrics["db"][0], 0)
+        self.assertLessEqual(
+            metrics["db"][0] + metrics["auth"][0] +
+            metrics["serializer"][0], metrics["total"][0] + 0.01)
+
+        record = logs.records[0].timing
+        self.assertEqual("GET", record["method"])
+        self.assertEqual("recipe:recipe-list", record["view"])
+        self.assertEqual(200, record["status"])
+        self.assertEqual(len(queries), record["queries"])
+        self.assertIn("serializer_ms", record)
+
+    def test_write_timed(self):
+        """Test writes report their serializer time
+
+        """
+        res = self.client.post(CREATE_USER_URL, {
+            "email": "new@travelperk.com", "password": "password123",
+            "name": "New",
+        })
+
+        self.assertEqual(status.HTTP_201_CREATED, res.status_code)
+        self.assertIn("serializer", _metrics(res["Server-Timing"]))
+
+    def test_not_sampled(self):
+        """Test requests outside the sample are not timed
+
+        """
+        with override_settings(SERVER_TIMING=dict(TIMING, SAMPLE_RATE=0)):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertFalse(res.has_header("Server-Timing"))
+
+    def test_other_namespaces_not_timed(self):
+        """Test requests outside the timed namespaces are not timed
+
+        """
+        with override_settings(
+                SERVER_TIMING=dict(TIMING, NAMESPACES=("user",))):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header("Server-Timing"))
+        self.assertIsNone(timing.get_timings())
+
+    def test_unresolved_not_timed(self):
+        """Test requests that reach no view are not timed
+
+        """
+        res = self.client.get("/api/missing/")
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, res.status_code)
+        self.assertFalse(res.has_header("Server-Timing"))
+
+
+@override_settings(SERVER_TIMING=TIMING)
+class AsyncServerTimingTests(TransactionTestCase):
+    """Tests the async endpoints count the queries of core.aiodb
+
+    The async views only see committed rows, hence TransactionTestCase.
+    """
+
+    def setUp(self) -> None:
+        authentication.local_cache.clear()
+        caches["api"].clear()
+
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com", password="password123")
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def tearDown(self) -> None:
+        aiodb.close_pools()
+
+    def test_async_list_timed(self):
+        """Test the async list reports its pooled queries
+
+        """
+        res = self.client.get(RECIPES_ASYNC_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        metrics = _metrics(res["Server-Timing"])
+        # The token and its user, then the recipes.
+        self.assertEqual("3 queries", metrics["db"][1])
+        self.assertIn("auth", metrics)
+        self.assertIn("serializer", metrics)
+
+
+@override_settings(SERVER_TIMING=TIMING, ROOT_URLCONF=__name__)
+class AsgiServerTimingTests(SimpleTestCase):
+    """Tests the middleware keeps async views concurrent under ASGI"""
+
+    async def test_async_views_concurrent(self):
+        """Test concurrent requests to an async view are not serialized
+
+        """
+        client = AsyncClient()
+        start = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.get("/slow/") for _ in range(5)))
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, SLOW_SECONDS * 2)
+        for res in responses:
+            self.assertEqual(status.HTTP_200_OK, res.status_code)
+            self.assertIn("total", _metrics(res["Server-Timing"]))
@@ -0,0 +1,187 @@
+import contextlib
+import contextvars
+import functools
+import time
+
+from django.conf import settings
+
+# Timings of the current request, when it is sampled.
+_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, "SERVER_TIMING", {}).get(name, default)
+
+
+def get_sample_rate():
+    """Return the share of requests that are timed, from 0 to 1
+
+    :return:
+    """
+    return _setting("SAMPLE_RATE", 0.0)
+
+
+def get_timed_namespaces():
+    """Return the URL namespaces whose requests may be timed
+
+    :return:
+    """
+    return _setting("NAMESPACES", ())
+
+
+class RequestTimings:
+    """Query count and durations in seconds of one request
+
+    Durations measured with measure() exclude the queries run meanwhile,
+    which count towards db, so no time is counted twice.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.durations = {}
+
+    def add_query(self, seconds):
+        self.queries += 1
+        self.db += seconds
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def as_header(self, total):
+        """Return the Server-Timing header value, in milliseconds
+
+        :param total: seconds spent on the whole request
+        :return:
+        """
+        metrics = [f'db;dur={self.db * 1000:.2f};desc="{self.queries} '
+                   f'queries"']
+        metrics.extend(f"{name};dur={seconds * 1000:.2f}"
+                       for name, seconds in sorted(self.durations.items()))
+        metrics.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(metrics)
+
+    def as_dict(self, total):
+        """Return the timings for a structured log record, in milliseconds
+
+        :param total: seconds spent on the whole request
+        :return:
+        """
+        record = {"queries": self.queries, "db_ms": round(self.db * 1000, 2)}
+        record.update(
+            (f"{name}_ms", round(seconds * 1000, 2))
+            for name, seconds in sorted(self.durations.items()))
+        record["total_ms"] = round(total * 1000, 2)
+        return record
+
+
+def start_timing():
+    """Time the queries and measured steps of the current request
+
+    :return: the request's RequestTimings
+    """
+    timings = RequestTimings()
+    _timings.set(timings)
+    return timings
+
+
+def stop_timing():
+    """Stop timing the current request
+
+    :return:
+    """
+    _timings.set(None)
+
+
+def get_timings():
+    """Return the current request's timings, or None if it is not timed
+
+    :return:
+    """
+    return _timings.get()
+
+
+def record_query(seconds):
+    """Count a query run outside Django's cursors, such as core.aiodb's
+
+    :param seconds:
+    :return:
+    """
+    timings = _timings.get()
+    if timings is not None:
+        timings.add_query(seconds)
+
+
+def time_queries(execute, sql, params, many, context):
+    """Execute wrapper counting and timing the current request's queries
+
+    :param execute:
+    :param sql:
+    :param params:
+    :param many:
+    :param context:
+    :return:
+    """
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(time.perf_counter() - start)
+
+
+@contextlib.contextmanager
+def measure(name):
+    """Add the time spent in the block, less its queries, to a metric
+
+    :param name: metric name, e.g. "auth" or "serializer"
+    :return:
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+
+    start, db = time.perf_counter(), timings.db
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start - (timings.db - db))
+
+
+def _measured(name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with measure(name):
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
+class TimedViewMixin:
+    """Report a view's authentication and serializer time
+
+    Serializers are timed while validating and rendering their data, at the
+    top level only, so nested and list serializers are not counted twice.
+    """
+
+    def perform_authentication(self, request):
+        with measure("auth"):
+            super().perform_authentication(request)
+
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer, with validation and rendering timed
+
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        serializer = super().get_serializer(*args, **kwargs)
+        if _timings.get() is not None:
+            serializer.is_valid = _measured("serializer", serializer.is_valid)
+            serializer.to_representation = _measured(
+                "serializer", serializer.to_representation)
+        return serializer
@@ -0,0 +1,170 @@
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
+from rest_framework import serializers, status
+
+from core.models import Recipe, RecipeTag, RecipeIngredient, Tag, Ingredient
+from core.search import update_search_vectors
+from recipe.fields import RELATED_OBJECTS_CONTEXT, to_pk
+
+RECIPE_FIELDS = ("title", "time_minutes", "price", "link")
+RELATIONS = (
+    ("tags", RecipeTag, "tag", Tag),
+    ("ingredients", RecipeIngredient, "ingredient", Ingredient),
+)
+
+
+def _error(code, errors):
+    return {"status": code, "errors": errors}
+
+
+def _related_objects(user, items):
+    """Fetch every tag and ingredient referenced by the batch at once
+
+    :param user:
+    :param items:
+    :return: mapping of model to {pk: instance}
+    """
+    related = {}
+    for name, through, field, model in RELATIONS:
+        pks = set()
+        for item in items:
+            values = item.get(name) if isinstance(item, dict) else None
+            if isinstance(values, list):
+                pks.update(to_pk(pk) for pk in values)
+        pks.discard(None)
+
+        related[model] = model.objects.filter(user=user).in_bulk(pks) \
+            if pks else {}
+
+    return related
+
+
+def bulk_save_recipes(user, items, serializer_class, context):
+    """Validate and write a batch of recipes with a fixed number of queries
+
+    Items without an ``id`` are created, items with one update that recipe
+    (which must belong to the user and appear once per batch). Valid items
+    are written with bulk_create / bulk_update on the recipe and through
+    tables inside one transaction; invalid items are reported without
+    blocking the rest. Tags and ingredients for the whole batch are fetched
+    up front, so validating their ids costs no further queries.
+
+    :param user:
+    :param items: list of recipe payloads
+    :param serializer_class: serializer validating each item
+    :param context: serializer context
+    :return: list of per-item results, aligned with items
+    """
+    ids = {to_pk(item.get("id")) for item in items if isinstance(item, dict)}
+    ids.discard(None)
+    existing = Recipe.objects.filter(user=user).in_bulk(ids) if ids else {}
+
+    context = dict(
+        context, **{RELATED_OBJECTS_CONTEXT: _related_objects(user, items)})
+
+    results = [None] * len(items)
+    to_create, to_update = [], []
+    seen = set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = _error(
+                status.HTTP_400_BAD_REQUEST,
+                {"non_field_errors": ["Expected a recipe object."]})
+            continue
+
+        instance = None
+        if item.get("id") is not None:
+            pk = to_pk(item["id"])
+            if pk is None or pk in seen:
+                message = "A valid integer is required." if pk is None \
+                    else "Repeated in this batch."
+                results[index] = _error(
+                    status.HTTP_400_BAD_REQUEST, {"id": [message]})
+                continue
+            seen.add(pk)
+
+            instance = existing.get(pk)
+            if instance is None:
+                results[index] = _error(
+                    status.HTTP_404_NOT_FOUND, {"id": ["Not found."]})
+                continue
+
+        serializer = serializer_class(
+            instance, data=item, partial=instance is not None,
+            context=context)
+        try:
+            attrs = serializer.run_validation(item)
+        except serializers.ValidationError as exc:
+            results[index] = _error(status.HTTP_400_BAD_REQUEST, exc.detail)
+            continue
+
+        if instance is None:
+            instance = Recipe(user=user)
+            to_create.append((index, instance, attrs))
+        else:
+            to_update.append((index, instance, attrs))
+
+        for field in RECIPE_FIELDS:
+            if field in attrs:
+                setattr(instance, field, attrs[field])
+
+    with transaction.atomic():
+        _write(to_create, to_update)
+
+    saved = [instance for _, instance, _ in to_create + to_update]
+    prefetch_related_objects(
+        saved,
+        Prefetch("ingredients",
+                 queryset=Ingredient.objects.only("id").order_by("id")),
+        Prefetch("tags", queryset=Tag.objects.only("id").order_by("id")),
+    )
+
+    serializer = serializer_class(context=context)
+    for index, instance, _ in to_create:
+        results[index] = {
+            "status": status.HTTP_201_CREATED,
+            "data": serializer.to_representation(instance),
+        }
+    for index, instance, _ in to_update:
+        results[index] = {
+            "status": status.HTTP_200_OK,
+            "data": serializer.to_representation(instance),
+        }
+
+    return results
+
+
+def _write(to_create, to_update):
+    """Write validated recipes and their M2M links in bulk
+
+    :param to_create:
+    :param to_update:
+    :return:
+    """
+    Recipe.objects.bulk_create(
+        [instance for _, instance, _ in to_create])
+
+    if to_update:
+        now = timezone.now()
+        for _, instance, _ in to_update:
+            instance.updated_at = now
+        Recipe.objects.bulk_update(
+            [instance for _, instance, _ in to_update],
+            RECIPE_FIELDS + ("updated_at",))
+
+    for name, through, field, model in RELATIONS:
+        replaced = [
+            instance.pk for _, instance, attrs in to_update if name in attrs
+        ]
+        if replaced:
+            through.objects.filter(recipe_id__in=replaced).delete()
+
+        through.objects.bulk_create([
+            through(recipe=instance, **{field: related})
+            for _, instance, attrs in to_create + to_update
+            for related in dict.fromkeys(attrs.get(name, []))
+        ])
+
+    update_search_vectors(
+        instance.pk for _, instance, _ in to_create + to_update)
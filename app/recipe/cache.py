@@ -0,0 +1,138 @@
+import hashlib
+import uuid
+
+from django.core.cache import caches
+from rest_framework.response import Response
+
+CACHE_ALIAS = "api"
+HITS_KEY = "api:stats:hits"
+MISSES_KEY = "api:stats:misses"
+
+
+def get_cache():
+    """Return the cache backing list responses
+
+    :return:
+    """
+    return caches[CACHE_ALIAS]
+
+
+def get_user_version(user_id):
+    """Return the current cache version for a user's lists
+
+    Versions are random tokens rather than integers, so a version evicted
+    from the cache can never be recreated with a value that matches stale
+    entries.
+
+    :param user_id:
+    :return:
+    """
+    key = f"api:version:{user_id}"
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_user_version(user_id):
+    """Invalidate every cached list belonging to a user
+
+    :param user_id:
+    :return:
+    """
+    get_cache().set(f"api:version:{user_id}", uuid.uuid4().hex, None)
+
+
+def _incr(key):
+    cache = get_cache()
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def get_stats():
+    """Return the list cache hit and miss counters
+
+    :return:
+    """
+    cache = get_cache()
+    return {
+        "hits": cache.get(HITS_KEY, 0),
+        "misses": cache.get(MISSES_KEY, 0),
+    }
+
+
+class CachedListMixin:
+    """Cache list responses per user, query params and user version
+
+    Any successful unsafe request to the viewset bumps the user's version,
+    which orphans all of their cached lists at once. When the view also
+    computes a list ETag, it is part of the key so writes made outside the
+    API are picked up too.
+    """
+
+    def get_list_cache_key(self, request):
+        """Return the cache key for a list request
+
+        :param request:
+        :return:
+        """
+        params = sorted(request.query_params.lists())
+        validator = getattr(self, "list_etag", None)
+        digest = hashlib.md5(repr(
+            (request.get_host(), request.path, params, validator)
+        ).encode()).hexdigest()
+        version = get_user_version(request.user.pk)
+
+        return f"api:list:{self.basename}:{request.user.pk}:{version}:" \
+               f"{digest}"
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached list response, rendering it on a miss
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        cache = get_cache()
+        key = self.get_list_cache_key(request)
+
+        cached = cache.get(key)
+        if cached is not None:
+            _incr(HITS_KEY)
+            data, headers = cached
+            response = Response(data, headers=headers)
+            response["X-Cache"] = "HIT"
+            return response
+
+        _incr(MISSES_KEY)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {"Link": response["Link"]} \
+                if response.has_header("Link") else None
+            cache.set(key, (response.data, headers))
+        response["X-Cache"] = "MISS"
+
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Invalidate the user's cached lists after a successful write
+
+        :param request:
+        :param response:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        if request.method not in ("GET", "HEAD", "OPTIONS") and \
+                response.status_code < 400 and \
+                request.user.is_authenticated:
+            bump_user_version(request.user.pk)
+
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,203 @@
+import functools
+from types import SimpleNamespace
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import OuterRef, Subquery
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+from core.timing import measure
+from recipe.fields import ImageVariantsField, RecipeImageField
+from recipe.media import media_url
+
+
+class NotCompilable(Exception):
+    """Raised when a serializer uses a field the fast path cannot build"""
+
+
+# DRF fields whose to_representation returns the database value unchanged.
+IDENTITY_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+)
+
+
+class CompiledSerializer:
+    """Read-only fast path for a ModelSerializer's list output
+
+    Built once from the serializer's fields: rows are fetched with
+    ``values()``, many-to-many primary keys as one sorted array per row, and
+    each output dict is assembled by a precomputed function per field
+    instead of DRF's per-field ``get_attribute``/``to_representation``
+    calls. The output matches the serializer's, key order included.
+    """
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        self.model = serializer.Meta.model
+        self.columns = {"id"}
+        self.arrays = {}
+        self.builders = [
+            (name, self._compile(name, field))
+            for name, field in serializer.fields.items()
+            if not field.write_only
+        ]
+
+    def _compile(self, name, field):
+        """Return a function building the field's value from a row
+
+        :param name:
+        :param field:
+        :return:
+        """
+        if isinstance(field, RecipeImageField):
+            return self._compile_image(field)
+        if isinstance(field, ImageVariantsField):
+            return self._compile_variants()
+        if isinstance(field, ManyRelatedField):
+            return self._compile_pk_list(name, field)
+        if field.source == "*" or "." in field.source:
+            raise NotCompilable(name)
+
+        try:
+            model_field = self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise NotCompilable(name)
+        if not model_field.concrete or model_field.is_relation:
+            raise NotCompilable(name)
+
+        column = model_field.attname
+        self.columns.add(column)
+
+        if type(field) in IDENTITY_FIELDS:
+            return lambda row, context: row[column]
+
+        to_representation = field.to_representation
+        return lambda row, context: None if row[column] is None \
+            else to_representation(row[column])
+
+    def _compile_pk_list(self, name, field):
+        """Build a many-to-many field from a sorted array of related ids
+
+        :param name:
+        :param field:
+        :return:
+        """
+        child = field.child_relation
+        if not isinstance(child, PrimaryKeyRelatedField) or \
+                child.pk_field is not None:
+            raise NotCompilable(name)
+
+        m2m = self.model._meta.get_field(field.source)
+        through = m2m.remote_field.through
+        source = through._meta.get_field(m2m.m2m_field_name()).attname
+        target = through._meta.get_field(m2m.m2m_reverse_field_name()).attname
+
+        alias = f"_{name}_ids"
+        self.arrays[alias] = Subquery(
+            through.objects.filter(**{source: OuterRef("pk")})
+            .values(source)
+            .annotate(ids=ArrayAgg(target, ordering=target))
+            .values("ids"))
+
+        return lambda row, context: row[alias] or []
+
+    def _compile_image(self, field):
+        self.columns.update(("image", "user_id"))
+
+        def build(row, context):
+            if not row["image"]:
+                return None
+            return media_url(
+                row["image"], _recipe(row), context.get("request"))
+
+        return build
+
+    def _compile_variants(self):
+        self.columns.update(("image_variants", "user_id"))
+
+        def build(row, context):
+            recipe, request = _recipe(row), context.get("request")
+            return {
+                variant: media_url(path, recipe, request)
+                for variant, path in row["image_variants"].items()
+            }
+
+        return build
+
+    def values(self, queryset, extra=()):
+        """Return the queryset as dict rows carrying every needed column
+
+        :param queryset:
+        :param extra: further columns or annotations to include, such as
+            the ordering fields used by pagination
+        :return:
+        """
+        columns = self.columns | {name.lstrip("-") for name in extra}
+        return queryset.prefetch_related(None).annotate(
+            **self.arrays).values(*columns, *self.arrays)
+
+    def to_representation(self, rows, context):
+        """Return the output dicts for the rows
+
+        :param rows:
+        :param context: serializer context
+        :return:
+        """
+        builders = self.builders
+        return [
+            {name: build(row, context) for name, build in builders}
+            for row in rows
+        ]
+
+
+def _recipe(row):
+    return SimpleNamespace(pk=row["id"], user_id=row["user_id"])
+
+
+@functools.lru_cache(maxsize=None)
+def get_compiled(serializer_class):
+    """Return the compiled serializer, or None if it cannot be compiled
+
+    :param serializer_class:
+    :return:
+    """
+    try:
+        return CompiledSerializer(serializer_class)
+    except NotCompilable:
+        return None
+
+
+class CompiledListMixin:
+    """List action rendered through the compiled serializer when possible
+
+    """
+
+    def list(self, request, *args, **kwargs):
+        """Return the list response built from dict rows
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        compiled = get_compiled(self.get_serializer_class())
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = compiled.values(queryset, queryset.query.order_by)
+        context = self.get_serializer_context()
+
+        page = self.paginate_queryset(rows)
+        with measure("serializer"):
+            data = compiled.to_representation(
+                rows if page is None else page, context)
+
+        if page is not None:
+            return self.get_paginated_response(data)
+
+        return Response(data)
@@ -0,0 +1,130 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from recipe.media import signing_window_start
+
+
+def _etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+class ConditionalMixin:
+    """Base for answering If-None-Match / If-Modified-Since with 304
+
+    """
+
+    def get_validator_queryset(self):
+        """Return the user's rows whose changes invalidate a response
+
+        :return:
+        """
+        return self.queryset.filter(user=self.request.user)
+
+    @staticmethod
+    def get_validators(parts, last_modified):
+        """Return the ETag and Last-Modified of a response
+
+        With signed media URLs the body also changes with the signing
+        window, so a client is never told its expired URLs are current.
+
+        :param parts: values the ETag is derived from
+        :param last_modified:
+        :return: (etag, last_modified)
+        """
+        window_start = signing_window_start()
+        if window_start is not None:
+            parts += (window_start,)
+            if last_modified is not None:
+                last_modified = max(last_modified, window_start)
+
+        return _etag(*parts), last_modified
+
+    def conditional_response(self, request, etag, last_modified, handler,
+                             *args, **kwargs):
+        """Return 304 if the client is current, else the handler response
+
+        :param request:
+        :param etag:
+        :param last_modified:
+        :param handler:
+        :return:
+        """
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+
+        return response
+
+
+class ConditionalListMixin(ConditionalMixin):
+    """Conditional GET for list actions
+
+    The validator comes from a single aggregate over the user's rows (newest
+    updated_at and row count, so deletions are noticed too), served from the
+    (user, updated_at) index. When the client is up to date the rows are
+    never loaded or serialized. The ETag is kept on the view as
+    ``list_etag`` so the list cache can key on it.
+    """
+
+    def list(self, request, *args, **kwargs):
+        """List rows unless the client's copy is current
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        state = self.get_validator_queryset().aggregate(
+            last_modified=Max("updated_at"), count=Count("id"))
+        etag, last_modified = self.get_validators(
+            (self.basename, state["count"], state["last_modified"],
+             sorted(request.query_params.lists())),
+            state["last_modified"])
+        self.list_etag = etag
+
+        return self.conditional_response(
+            request, etag, last_modified, super().list, *args, **kwargs)
+
+
+class ConditionalRetrieveMixin(ConditionalMixin):
+    """Conditional GET for retrieve actions
+
+    Only the row's updated_at is read before deciding whether to load and
+    serialize it.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a row unless the client's copy is current
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            last_modified = self.get_validator_queryset().filter(
+                **{self.lookup_field: lookup}
+            ).values_list("updated_at", flat=True).first()
+        except (TypeError, ValueError):
+            last_modified = None
+
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators(
+            (self.basename, lookup, last_modified), last_modified)
+
+        return self.conditional_response(
+            request, etag, last_modified, super().retrieve, *args, **kwargs)
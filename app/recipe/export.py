@@ -0,0 +1,118 @@
+import csv
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import OuterRef, Subquery
+
+from core.models import RecipeIngredient, RecipeTag
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+EXPORT_FIELDS = (
+    "id", "title", "time_minutes", "price", "link", "tags", "ingredients",
+    "updated_at",
+)
+# Rows fetched per round trip of the server-side cursor.
+CHUNK_SIZE = 2000
+# Rendered rows are joined into chunks of about this many bytes, so the
+# server writes a few large chunks instead of one per row.
+WRITE_SIZE = 64 * 2 ** 10
+
+
+def _names(through, field):
+    return Subquery(
+        through.objects.filter(recipe_id=OuterRef("pk"))
+        .values("recipe_id")
+        .annotate(names=ArrayAgg(f"{field}__name", ordering=f"{field}__name"))
+        .values("names"))
+
+
+def export_rows(queryset):
+    """Yield recipes as dicts with their tag and ingredient names
+
+    Rows are read through a server-side cursor, CHUNK_SIZE at a time, so
+    memory does not depend on the number of recipes.
+
+    :param queryset: recipes to export, already filtered to one user
+    :return:
+    """
+    rows = queryset.prefetch_related(None).annotate(
+        tag_names=_names(RecipeTag, "tag"),
+        ingredient_names=_names(RecipeIngredient, "ingredient"),
+    ).values(
+        "id", "title", "time_minutes", "price", "link", "updated_at",
+        "tag_names", "ingredient_names",
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    for row in rows:
+        row["tags"] = row.pop("tag_names") or []
+        row["ingredients"] = row.pop("ingredient_names") or []
+        yield row
+
+
+def _buffered(lines):
+    """Join rendered lines into chunks of about WRITE_SIZE bytes
+
+    :param lines:
+    :return:
+    """
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= WRITE_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def render_ndjson(rows):
+    """Yield one JSON document per line
+
+    :param rows:
+    :return:
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for row in rows:
+        yield encoder.encode({name: row[name] for name in EXPORT_FIELDS}) \
+            + "\n"
+
+
+class _Line:
+    """File-like object returning what csv.writer writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    """Yield a header line then one CSV line per recipe
+
+    Tag and ingredient names are joined with "|".
+
+    :param rows:
+    :return:
+    """
+    writer = csv.writer(_Line())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([
+            "|".join(row[name]) if name in ("tags", "ingredients")
+            else row[name].isoformat() if name == "updated_at"
+            else row[name]
+            for name in EXPORT_FIELDS
+        ])
+
+
+def render_export(queryset, export_format):
+    """Return an iterator of text chunks exporting the recipes
+
+    :param queryset:
+    :param export_format: "ndjson" or "csv"
+    :return:
+    """
+    render = render_csv if export_format == "csv" else render_ndjson
+    return _buffered(render(export_rows(queryset)))
@@ -0,0 +1,146 @@
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+from recipe.media import media_url
+
+RELATED_OBJECTS_CONTEXT = "related_objects"
+
+
+def to_pk(value):
+    """Return value as an integer primary key, or None if it is not one
+
+    :param value:
+    :return:
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class BatchedManyRelatedField(ManyRelatedField):
+    """Many related field that resolves all submitted ids in one query
+
+    Missing ids are reported together. When the serializer context carries
+    ``related_objects`` (a mapping of model to {pk: instance}, already
+    limited to the user), the ids are resolved from it without any query.
+    """
+
+    default_error_messages = {
+        'does_not_exist':
+            'Invalid pk(s) {pk_values} - object(s) do not exist.',
+    }
+
+    def to_internal_value(self, data):
+        """Return the related instances for the submitted ids
+
+        :param data:
+        :return:
+        """
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pks = []
+        for item in data:
+            pk = to_pk(item)
+            if pk is None:
+                self.child_relation.fail(
+                    'incorrect_type', data_type=type(item).__name__)
+            if pk not in pks:
+                pks.append(pk)
+
+        queryset = self.child_relation.get_queryset()
+        cached = self.context.get(RELATED_OBJECTS_CONTEXT, {}).get(
+            queryset.model)
+        if cached is not None:
+            found = {pk: cached[pk] for pk in pks if pk in cached}
+        else:
+            found = queryset.in_bulk(pks) if pks else {}
+
+        missing = [pk for pk in pks if pk not in found]
+        if missing:
+            self.fail('does_not_exist',
+                      pk_values=", ".join(str(pk) for pk in missing))
+
+        return [found[pk] for pk in pks]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field limited to objects owned by the requesting user
+
+    With ``many=True`` it validates every id in a single query.
+    """
+
+    def get_queryset(self):
+        """Return the queryset filtered to the requesting user
+
+        :return:
+        """
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return queryset.none()
+
+        return queryset.filter(user=request.user)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return BatchedManyRelatedField(**list_kwargs)
+
+
+class RecipeImageField(serializers.ImageField):
+    """Image field for recipe images
+
+    Files from ``BoundedImageUploadHandler`` carry the format and size read
+    from their header, so Pillow does not open them a second time. Other
+    files are validated as usual. URLs are signed when
+    ``MEDIA_SIGNED_URLS`` is set.
+    """
+
+    def to_internal_value(self, data):
+        if getattr(data, 'image_format', None) is not None:
+            return serializers.FileField.to_internal_value(self, data)
+
+        return super().to_internal_value(data)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+
+        return media_url(value.name, value.instance, self.context.get(
+            'request'))
+
+
+class ImageVariantsField(serializers.Field):
+    """Read-only mapping of image variant name to URL
+
+    Reads the whole recipe, since signed URLs need its id and owner. URLs
+    are absolute when the serializer context carries the request, like
+    DRF's own ImageField.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        """Return the URL of every stored variant
+
+        :param value: recipe
+        :return:
+        """
+        request = self.context.get('request')
+        return {
+            variant: media_url(path, value, request)
+            for variant, path in value.image_variants.items()
+        }
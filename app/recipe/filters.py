@@ -0,0 +1,77 @@
+from django.db.models import Count, Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+
+MATCH_ANY = "any"
+MATCH_ALL = "all"
+
+
+def params_to_ints(value):
+    """Convert a comma separated string of ids to a set of integers
+
+    :param value:
+    :return:
+    """
+    try:
+        return {int(str_id) for str_id in value.split(",") if str_id}
+    except ValueError:
+        raise ValidationError(f"Invalid id list: {value}")
+
+
+def filter_by_related_ids(queryset, through, field, ids, match=MATCH_ANY):
+    """Filter recipes by the related ids linked through an M2M table
+
+    Both modes use a subquery on the through table instead of a join, so
+    each recipe is returned at most once. "any" is a correlated EXISTS probe
+    of the (recipe, related) unique index; "all" groups the links for the
+    requested ids through the (related, recipe) index and keeps recipes
+    linked to every one of them.
+
+    :param queryset: Recipe queryset
+    :param through: M2M through model, e.g. RecipeTag
+    :param field: column on the through model holding the related id
+    :param ids: set of related ids
+    :param match: "any" to match at least one id, "all" to match every id
+    :return:
+    """
+    if match == MATCH_ANY:
+        links = through.objects.filter(
+            recipe=OuterRef("pk"), **{f"{field}__in": ids})
+        return queryset.filter(Exists(links))
+    elif match == MATCH_ALL:
+        complete = through.objects.filter(
+            **{f"{field}__in": ids}
+        ).order_by().values("recipe").annotate(
+            matched=Count("*")
+        ).filter(matched=len(ids)).values("recipe")
+        return queryset.filter(pk__in=complete)
+
+    raise ValidationError(
+        f"Invalid match value: {match}, expected "
+        f"'{MATCH_ANY}' or '{MATCH_ALL}'")
+
+
+def filter_by_query_params(queryset, query_params, relations):
+    """Apply the id filters requested in the query params
+
+    Each relation is a (param, through, field) tuple. The ids are read from
+    ``?<param>=1,2`` and the semantics from ``?<param>_match=any|all``.
+
+    :param queryset:
+    :param query_params:
+    :param relations:
+    :return:
+    """
+    for param, through, field in relations:
+        value = query_params.get(param)
+        if not value:
+            continue
+
+        ids = params_to_ints(value)
+        if not ids:
+            continue
+
+        match = query_params.get(f"{param}_match", MATCH_ANY)
+        queryset = filter_by_related_ids(
+            queryset, through, field, ids, match)
+
+    return queryset
@@ -0,0 +1,260 @@
+import datetime
+import mimetypes
+import posixpath
+import re
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, \
+    HttpResponseForbidden, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, urlencode
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+from core.models import Recipe
+
+SIGNING_SALT = "recipe.media"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+STREAM_CHUNK_SIZE = 64 * 2 ** 10
+
+
+def _signer():
+    return signing.Signer(salt=SIGNING_SALT)
+
+
+def _signed_value(recipe_id, user_id, expires, path):
+    return f"{recipe_id}:{user_id}:{expires}:{path}"
+
+
+def sign_media_path(path, recipe):
+    """Return the query string granting the recipe owner access to path
+
+    The expiry is rounded up to the next signing window, so the URL stays
+    the same for that window and can be cached by browsers and proxies.
+
+    :param path: storage path of the image or one of its variants
+    :param recipe:
+    :return:
+    """
+    window = settings.MEDIA_SIGNED_URL_WINDOW
+    expires = (int(time.time()) // window + 2) * window
+    value = _signed_value(recipe.pk, recipe.user_id, expires, path)
+    return urlencode({
+        "r": recipe.pk,
+        "u": recipe.user_id,
+        "e": expires,
+        "s": _signer().signature(value),
+    })
+
+
+def signing_window_start():
+    """Return when the current signing window began, or None if unsigned
+
+    Signed URLs rendered within a window are identical, so responses
+    embedding them only change when it does.
+
+    :return:
+    """
+    if not settings.MEDIA_SIGNED_URLS:
+        return None
+
+    window = settings.MEDIA_SIGNED_URL_WINDOW
+    return datetime.datetime.fromtimestamp(
+        int(time.time()) // window * window, tz=datetime.timezone.utc)
+
+
+def media_url(path, recipe, request=None):
+    """Return the URL of a recipe image file, signed when configured
+
+    :param path:
+    :param recipe:
+    :param request: makes the URL absolute when given
+    :return:
+    """
+    url = default_storage.url(path)
+    if settings.MEDIA_SIGNED_URLS:
+        url = f"{url}?{sign_media_path(path, recipe)}"
+
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def _check_signature(request, path):
+    """Return True if the request carries a valid, unexpired signature
+
+    The signed recipe must still belong to the signed user and still use
+    path as its image or one of its variants.
+
+    :param request:
+    :param path:
+    :return:
+    """
+    try:
+        recipe_id = int(request.GET["r"])
+        user_id = int(request.GET["u"])
+        expires = int(request.GET["e"])
+        signature = request.GET["s"]
+    except (KeyError, ValueError):
+        return False
+
+    value = _signed_value(recipe_id, user_id, expires, path)
+    if not signing.constant_time_compare(
+            signature, _signer().signature(value)):
+        return False
+    if expires < time.time():
+        return False
+
+    recipe = Recipe.objects.filter(pk=recipe_id, user_id=user_id).values(
+        "image", "image_variants").first()
+    if recipe is None:
+        return False
+
+    return path == recipe["image"] or path in recipe["image_variants"].values()
+
+
+def _cache_control():
+    if settings.MEDIA_SIGNED_URLS:
+        return f"private, max-age={settings.MEDIA_SIGNED_URL_WINDOW}"
+
+    # Uploads get unique names and variants content-hashed ones, so a file
+    # is never rewritten in place (see core.images.variant_path).
+    return "public, max-age=31536000, immutable"
+
+
+def _parse_range(header, size):
+    """Return the (start, end) byte range requested, inclusive
+
+    Only single ranges are supported; anything else is served in full.
+
+    :param header: value of the Range header
+    :param size: file size
+    :return: (start, end), None for the whole file, or False if the range
+        cannot be satisfied
+    """
+    match = RANGE_RE.match(header or "")
+    if match is None:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+
+    if start >= size or start > end:
+        return False
+
+    return start, end
+
+
+def _read_range(fullpath, start, length):
+    with fullpath.open("rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _serve_file(request, fullpath, stat, content_type):
+    """Stream the file from Python, honouring single Range requests
+
+    :param request:
+    :param fullpath:
+    :param stat:
+    :param content_type:
+    :return:
+    """
+    byte_range = _parse_range(request.META.get("HTTP_RANGE"), stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+
+    if byte_range is None:
+        response = FileResponse(
+            fullpath.open("rb"), content_type=content_type)
+        response["Content-Length"] = stat.st_size
+        return response
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        _read_range(fullpath, start, end - start + 1),
+        status=206, content_type=content_type)
+    response["Content-Length"] = end - start + 1
+    response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    return response
+
+
+def _offload(fullpath, path, content_type):
+    """Return an empty response telling the web server to send the file
+
+    The server streams the bytes and handles Range requests itself.
+
+    :param fullpath:
+    :param path:
+    :param content_type:
+    :return:
+    """
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SERVE_MODE == "x-accel":
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + path
+    else:
+        response["X-Sendfile"] = str(fullpath)
+
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Authorize a media request and serve the file
+
+    Depending on ``MEDIA_SERVE_MODE`` the file is streamed by Django
+    ("django") or handed to nginx ("x-accel") or Apache/lighttpd
+    ("x-sendfile") through a response header.
+
+    :param request:
+    :param path:
+    :return:
+    """
+    path = posixpath.normpath(path).lstrip("/")
+    try:
+        fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404()
+
+    if settings.MEDIA_SIGNED_URLS and not _check_signature(request, path):
+        return HttpResponseForbidden()
+
+    try:
+        stat = fullpath.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404()
+    if not fullpath.is_file():
+        raise Http404()
+
+    if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"),
+                              stat.st_mtime, stat.st_size):
+        response = HttpResponseNotModified()
+    else:
+        content_type, _ = mimetypes.guess_type(str(fullpath))
+        content_type = content_type or "application/octet-stream"
+
+        if settings.MEDIA_SERVE_MODE == "django":
+            response = _serve_file(request, fullpath, stat, content_type)
+        else:
+            response = _offload(fullpath, path, content_type)
+
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Cache-Control"] = _cache_control()
+    response["Accept-Ranges"] = "bytes"
+    return response
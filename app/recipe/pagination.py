@@ -0,0 +1,255 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Keyset (seek) pagination over the queryset's own ordering
+
+    The ordering already applied by the viewset is extended with a unique
+    tiebreaker on ``id`` and the position of the last row is encoded into an
+    opaque cursor. Each page filters on that position instead of using an
+    OFFSET, so deep pages cost the same as the first one.
+
+    The response body stays a plain list; cursors are returned in a ``Link``
+    header with ``rel="next"`` and ``rel="prev"``.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    tiebreaker = "id"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self):
+        self.page_size = api_settings.PAGE_SIZE or 100
+        self.base_url = None
+        self.next_position = None
+        self.previous_position = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of rows after or before the cursor
+
+        :param queryset:
+        :param request:
+        :param view:
+        :return:
+        """
+        return self.get_page(list(self.get_page_queryset(queryset, request)))
+
+    def get_page_queryset(self, queryset, request):
+        """Return the queryset of the requested page plus one lookahead row
+
+        Evaluating it and passing the rows to get_page completes the
+        pagination, which lets async views run the query themselves.
+
+        :param queryset:
+        :param request:
+        :return:
+        """
+        self.page_size_requested = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.next_position = None
+        self.previous_position = None
+
+        ordering = self.get_ordering(queryset)
+        self.position, self.reverse = self.decode_cursor(
+            request, len(ordering))
+
+        if self.reverse:
+            ordering = [self._flip(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+
+        if self.position is not None:
+            self.position = self.clean_position(
+                queryset, ordering, self.position)
+            queryset = queryset.filter(self._seek(ordering, self.position))
+
+        self.ordering = ordering
+        return queryset[:self.page_size_requested + 1]
+
+    def get_page(self, results):
+        """Trim the fetched rows to the page and record the cursors
+
+        :param results: rows of the queryset from get_page_queryset
+        :return:
+        """
+        page_size, ordering = self.page_size_requested, self.ordering
+        has_more = len(results) > page_size
+        results = results[:page_size]
+
+        if self.reverse:
+            results.reverse()
+            ordering = [self._flip(field) for field in ordering]
+
+        if not results:
+            return results
+
+        first = self._position(ordering, results[0])
+        last = self._position(ordering, results[-1])
+
+        if self.reverse:
+            self.previous_position = first if has_more else None
+            self.next_position = last
+        else:
+            self.previous_position = first \
+                if self.position is not None else None
+            self.next_position = last if has_more else None
+
+        return results
+
+    def get_paginated_response(self, data):
+        """Return the page with cursor links in the Link header
+
+        :param data:
+        :return:
+        """
+        return Response(data, headers=self.get_link_headers())
+
+    def get_link_headers(self):
+        """Return the Link header for the current page, or None
+
+        :return:
+        """
+        links = []
+        if self.next_position is not None:
+            links.append('<{}>; rel="next"'.format(
+                self.encode_cursor(self.next_position, reverse=False)))
+        if self.previous_position is not None:
+            links.append('<{}>; rel="prev"'.format(
+                self.encode_cursor(self.previous_position, reverse=True)))
+
+        return {"Link": ", ".join(links)} if links else None
+
+    def get_page_size(self, request):
+        """Return the requested page size, bounded by max_page_size
+
+        :param request:
+        :return:
+        """
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """Return the queryset ordering extended with the id tiebreaker
+
+        :param queryset:
+        :return:
+        """
+        ordering = list(queryset.query.order_by) or ["-" + self.tiebreaker]
+        if not any(f.lstrip("-") in (self.tiebreaker, "pk") for f in ordering):
+            descending = ordering[0].startswith("-")
+            ordering.append(
+                ("-" if descending else "") + self.tiebreaker)
+
+        return ordering
+
+    def decode_cursor(self, request, length):
+        """Decode the cursor query param into a position and direction
+
+        :param request:
+        :param length:
+        :return:
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded))
+            position = cursor["p"]
+            reverse = bool(cursor.get("r"))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != length:
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def clean_position(self, queryset, ordering, position):
+        """Convert a decoded position to the types of its ordering fields
+
+        :param queryset:
+        :param ordering:
+        :param position:
+        :return:
+        """
+        cleaned = []
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            try:
+                if name in queryset.query.annotations:
+                    model_field = queryset.query.annotations[name].output_field
+                elif name == "pk":
+                    model_field = queryset.model._meta.pk
+                else:
+                    model_field = queryset.model._meta.get_field(name)
+                if value is None:
+                    raise ValidationError("null position")
+                cleaned.append(model_field.to_python(value))
+            except (FieldDoesNotExist, ValidationError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return cleaned
+
+    def encode_cursor(self, position, reverse):
+        """Return the URL for the page starting at the given position
+
+        :param position:
+        :param reverse:
+        :return:
+        """
+        cursor = {"p": position}
+        if reverse:
+            cursor["r"] = 1
+
+        data = json.dumps(cursor, separators=(",", ":"), default=str)
+        encoded = base64.urlsafe_b64encode(data.encode()).decode()
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, encoded.rstrip("="))
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith("-") else "-" + field
+
+    @staticmethod
+    def _position(ordering, instance):
+        if isinstance(instance, dict):
+            return [instance[f.lstrip("-")] for f in ordering]
+
+        return [getattr(instance, f.lstrip("-")) for f in ordering]
+
+    @staticmethod
+    def _seek(ordering, position):
+        """Build the row-value comparison for rows past the position
+
+        :param ordering:
+        :param position:
+        :return:
+        """
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            term = Q(**{f"{name}__{lookup}": position[index]})
+            for prev_field, prev_value in zip(ordering, position[:index]):
+                term &= Q(**{prev_field.lstrip("-"): prev_value})
+            condition |= term
+
+        return condition
@@ -1,8 +1,53 @@
+from django.db.models.functions import Lower
 from rest_framework import serializers
+from core.images import attach_image
 from core.models import Tag, Ingredient, Recipe
+from recipe.fields import ImageVariantsField, RecipeImageField, \
+    UserPrimaryKeyRelatedField
 
 
-class TagSerializer(serializers.ModelSerializer):
+class RecipeAttrSerializer(serializers.ModelSerializer):
+    """Base serializer for per-user named recipe attributes
+
+    """
+
+    def validate_name(self, value):
+        """Reject names the user already has, ignoring case
+
+        :param value:
+        :return:
+        """
+        request = self.context.get("request")
+        if request is None:
+            return value
+
+        duplicates = self.Meta.model.objects.filter(
+            user=request.user
+        ).annotate(lower_name=Lower("name")).filter(
+            lower_name=value.lower())
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+
+        if duplicates.exists():
+            raise serializers.ValidationError(
+                f"{self.Meta.model._meta.verbose_name.capitalize()} "
+                f"'{value}' already exists.")
+
+        return value
+
+
+class NameListSerializer(serializers.Serializer):
+    """Serializer for a batch of tag or ingredient names
+
+    """
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+
+class TagSerializer(RecipeAttrSerializer):
     """Serializer for Tag objects
 
     """
@@ -13,7 +58,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(RecipeAttrSerializer):
     """Serializer for Ingredient objects
 
     """
@@ -29,18 +74,20 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     """
 
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True, queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True, queryset=Tag.objects.all()
     )
+    image = RecipeImageField(read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'title', 'ingredients', 'tags', 'time_minutes', 'price',
-            'link')
+            'link', 'image', 'image_variants')
         read_only_fields = ('id',)
 
 
@@ -58,7 +105,20 @@ class RecipeImageSerializer(serializers.ModelSerializer):
 
     """
 
+    image = RecipeImageField()
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'image_variants')
         read_only_fields = ('id',)
+
+    def update(self, instance, validated_data):
+        """Attach the uploaded image, sharing files with identical content
+
+        :param instance:
+        :param validated_data:
+        :return:
+        """
+        attach_image(instance, validated_data["image"])
+        return instance
@@ -0,0 +1,256 @@
+import asyncio
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core import aiodb
+from core.models import Tag, Ingredient, Recipe
+from user import authentication
+
+RECIPES_ASYNC_URL = reverse("recipe:recipe-list-async")
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_ASYNC_URL = reverse("recipe:tag-list-async")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_ASYNC_URL = reverse("recipe:ingredient-list-async")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+def detail_url(recipe_id, suffix=""):
+    """Return the sync or async recipe detail URL
+
+    :param recipe_id:
+    :param suffix: "-async" for the async endpoint
+    :return:
+    """
+    return reverse(f"recipe:recipe-detail{suffix}", args=[recipe_id])
+
+
+class AsyncRecipeAPITests(TransactionTestCase):
+    """Tests for the async read endpoints
+
+    The async views query through their own connections, which only see
+    committed rows, hence TransactionTestCase.
+    """
+
+    def setUp(self) -> None:
+        authentication.local_cache.clear()
+        caches[authentication.CACHE_ALIAS].clear()
+
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com",
+            password="password123",
+            name="Test User"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.vegan = Tag.objects.create(user=self.user, name="Vegan")
+        dessert = Tag.objects.create(user=self.user, name="Dessert")
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+
+        self.curry = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=30, price=5.5,
+            image="uploads/recipe/aa/bb/x.jpg",
+            image_variants={"thumb": "uploads/recipe/aa/bb/x_thumb.jpg"})
+        self.curry.tags.add(self.vegan, dessert)
+        self.curry.ingredients.add(salt)
+        for i in range(3):
+            Recipe.objects.create(
+                user=self.user, title=f"Plain {i}", time_minutes=5,
+                price=1)
+
+    def tearDown(self) -> None:
+        aiodb.close_pools()
+
+    def assertSameResponse(self, sync_url, async_url, params=None):
+        """Assert the sync and async endpoints return the same body
+
+        :param sync_url:
+        :param async_url:
+        :param params:
+        :return:
+        """
+        expected = self.client.get(sync_url, params)
+        actual = self.client.get(async_url, params)
+
+        self.assertEqual(status.HTTP_200_OK, actual.status_code)
+        self.assertEqual(expected.content, actual.content)
+        self.assertEqual(
+            expected.get("Link"),
+            actual.get("Link", "").replace(async_url, sync_url) or None)
+        return actual
+
+    def test_list_recipes(self):
+        """Test the async recipe list matches the sync one
+
+        """
+        self.assertSameResponse(RECIPES_URL, RECIPES_ASYNC_URL)
+
+    def test_list_recipes_filtered_and_searched(self):
+        """Test filters and search apply to the async list
+
+        """
+        res = self.assertSameResponse(
+            RECIPES_URL, RECIPES_ASYNC_URL, {"tags": str(self.vegan.pk)})
+        self.assertEqual([self.curry.pk], [r["id"] for r in res.json()])
+
+        self.assertSameResponse(
+            RECIPES_URL, RECIPES_ASYNC_URL, {"search": "curry"})
+
+    def test_list_recipes_paginated(self):
+        """Test keyset pages and their links match the sync list
+
+        """
+        res = self.assertSameResponse(
+            RECIPES_URL, RECIPES_ASYNC_URL, {"page_size": 2})
+
+        url = res["Link"].split(";")[0].strip("<>")
+        cursor = parse_qs(urlparse(url).query)["cursor"][0]
+        self.assertSameResponse(RECIPES_URL, RECIPES_ASYNC_URL, {
+            "page_size": 2, "cursor": cursor})
+
+    def test_list_limited_to_user(self):
+        """Test other users' recipes are not listed
+
+        """
+        other = get_user_model().objects.create_user(
+            email="other@travelperk.com", password="password123")
+        Recipe.objects.create(
+            user=other, title="Secret", time_minutes=1, price=1)
+
+        res = self.client.get(RECIPES_ASYNC_URL)
+
+        self.assertNotIn("Secret", [r["title"] for r in res.json()])
+
+    def test_list_tags_and_ingredients(self):
+        """Test the async tag and ingredient lists match the sync ones
+
+        """
+        self.assertSameResponse(TAGS_URL, TAGS_ASYNC_URL)
+        self.assertSameResponse(INGREDIENTS_URL, INGREDIENTS_ASYNC_URL)
+
+    def test_retrieve_recipe(self):
+        """Test the async detail matches the sync one
+
+        """
+        self.assertSameResponse(
+            detail_url(self.curry.pk), detail_url(self.curry.pk, "-async"))
+
+    def test_retrieve_other_users_recipe(self):
+        """Test another user's recipe is not found
+
+        """
+        other = get_user_model().objects.create_user(
+            email="other@travelperk.com", password="password123")
+        recipe = Recipe.objects.create(
+            user=other, title="Secret", time_minutes=1, price=1)
+
+        res = self.client.get(detail_url(recipe.pk, "-async"))
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, res.status_code)
+
+    def test_errors_match_sync_api(self):
+        """Test invalid filters and cursors fail like the sync list
+
+        """
+        for params in ({"tags": "x"}, {"cursor": "garbage"}):
+            expected = self.client.get(RECIPES_URL, params)
+            actual = self.client.get(RECIPES_ASYNC_URL, params)
+
+            self.assertEqual(expected.status_code, actual.status_code)
+            self.assertEqual(expected.json(), actual.json())
+
+    def test_authentication_required(self):
+        """Test requests without a valid token are rejected
+
+        """
+        res = APIClient().get(RECIPES_ASYNC_URL)
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, res.status_code)
+        self.assertEqual("Token", res["WWW-Authenticate"])
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token invalid")
+        res = client.get(RECIPES_ASYNC_URL)
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, res.status_code)
+
+    def test_only_get_allowed(self):
+        """Test the async endpoints are read only
+
+        """
+        res = self.client.post(RECIPES_ASYNC_URL, {"title": "New"})
+
+        self.assertEqual(status.HTTP_405_METHOD_NOT_ALLOWED, res.status_code)
+
+
+class AsyncTokenAuthenticationTests(TransactionTestCase):
+    """Tests for the async path of the cached token authentication
+
+    """
+
+    def setUp(self) -> None:
+        authentication.local_cache.clear()
+        caches[authentication.CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com", password="password123")
+        self.token = Token.objects.create(user=self.user)
+        self.auth = authentication.CachedTokenAuthentication()
+
+    def tearDown(self) -> None:
+        aiodb.close_pools()
+
+    def authenticate(self, key):
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Token {key}")
+        return asyncio.run(self.auth.authenticate_async(request))
+
+    def test_loads_and_caches_credentials(self):
+        """Test a token is loaded once, then served from the caches
+
+        """
+        user, token = self.authenticate(self.token.key)
+
+        self.assertEqual(self.user, user)
+        self.assertEqual(self.token.key, token.key)
+        self.assertIsNotNone(authentication.local_cache.get(self.token.key))
+        self.assertIsNotNone(caches[authentication.CACHE_ALIAS].get(
+            authentication.CACHE_PREFIX + self.token.key))
+
+        with patch("user.authentication.fetch_instances") as fetch:
+            user, _ = self.authenticate(self.token.key)
+
+        fetch.assert_not_called()
+        self.assertEqual(self.user, user)
+
+    def test_invalid_token(self):
+        """Test an unknown token is rejected
+
+        """
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate("unknown")
+
+    def test_inactive_user(self):
+        """Test an inactive user is rejected
+
+        """
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.token.key)
+
+    def test_no_header(self):
+        """Test requests without a token are left unauthenticated
+
+        """
+        request = APIRequestFactory().get("/")
+
+        self.assertIsNone(asyncio.run(self.auth.authenticate_async(request)))
@@ -0,0 +1,205 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import RecipeSerializer
+
+BULK_URL = reverse("recipe:recipe-bulk")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def recipe_payload(**params):
+    """Return a recipe payload for the bulk endpoint
+
+    :param params:
+    :return:
+    """
+    payload = {
+        "title": "Sample Recipe",
+        "time_minutes": 10,
+        "price": "5.00",
+        "tags": [],
+        "ingredients": []
+    }
+    payload.update(params)
+
+    return payload
+
+
+class TestBulkRecipeAPI(TestCase):
+    """Tests for the bulk recipe endpoint
+
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com",
+            password="password123",
+            name="Test User"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, items):
+        """Post a batch of recipes as JSON
+
+        :param items:
+        :return:
+        """
+        return self.client.post(BULK_URL, items, format="json")
+
+    def test_bulk_create(self):
+        """Test creating several recipes with tags and ingredients
+
+        :return:
+        """
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        ingredient = Ingredient.objects.create(user=self.user, name="Tofu")
+
+        res = self.post([
+            recipe_payload(title="Tofu Curry", tags=[tag.id],
+                           ingredients=[ingredient.id]),
+            recipe_payload(title="Tofu Salad", tags=[tag.id, tag.id]),
+        ])
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        recipes = Recipe.objects.filter(user=self.user).order_by("title")
+        self.assertEqual(["Tofu Curry", "Tofu Salad"],
+                         [recipe.title for recipe in recipes])
+        self.assertEqual([tag], list(recipes[1].tags.all()))
+        self.assertEqual([ingredient], list(recipes[0].ingredients.all()))
+
+        results = res.data["results"]
+        self.assertEqual([201, 201], [r["status"] for r in results])
+        self.assertEqual(
+            RecipeSerializer(recipes[0]).data, results[0]["data"])
+
+    def test_bulk_created_recipes_searchable(self):
+        """Test bulk created recipes are indexed for search
+
+        :return:
+        """
+        self.post([recipe_payload(title="Saffron Risotto")])
+
+        res = self.client.get(RECIPES_URL, {"search": "saffron"})
+
+        self.assertEqual(1, len(res.data))
+
+    def test_bulk_update(self):
+        """Test updating existing recipes and replacing their tags
+
+        :return:
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=5, price=5.00)
+        old_tag = Tag.objects.create(user=self.user, name="Hot")
+        new_tag = Tag.objects.create(user=self.user, name="Mild")
+        recipe.tags.add(old_tag)
+
+        res = self.post([{"id": recipe.id, "title": "Korma",
+                          "tags": [new_tag.id]}])
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        recipe.refresh_from_db()
+        self.assertEqual("Korma", recipe.title)
+        self.assertEqual(5, recipe.time_minutes)
+        self.assertEqual([new_tag], list(recipe.tags.all()))
+
+    def test_bulk_string_id(self):
+        """Test ids sent as strings update their recipe
+
+        :return:
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=5, price=5.00)
+
+        res = self.post([{"id": str(recipe.id), "title": "Korma"},
+                         {"id": "curry", "title": "Soup"}])
+
+        results = res.data["results"]
+        self.assertEqual([200, 400], [r["status"] for r in results])
+        self.assertIn("id", results[1]["errors"])
+        recipe.refresh_from_db()
+        self.assertEqual("Korma", recipe.title)
+
+    def test_bulk_repeated_id(self):
+        """Test an id repeated in one batch is only written once
+
+        :return:
+        """
+        recipe = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=5, price=5.00)
+
+        res = self.post([{"id": recipe.id, "title": "Korma"},
+                         {"id": str(recipe.id), "title": "Soup"}])
+
+        self.assertEqual(status.HTTP_207_MULTI_STATUS, res.status_code)
+        results = res.data["results"]
+        self.assertEqual([200, 400], [r["status"] for r in results])
+        self.assertIn("id", results[1]["errors"])
+        recipe.refresh_from_db()
+        self.assertEqual("Korma", recipe.title)
+
+    def test_bulk_partial_failure(self):
+        """Test invalid items are reported while valid ones are saved
+
+        :return:
+        """
+        other_user = get_user_model().objects.create_user(
+            email="test2@travelperk.com",
+            password="password123",
+        )
+        other_recipe = Recipe.objects.create(
+            user=other_user, title="Curry", time_minutes=5, price=5.00)
+
+        res = self.post([
+            recipe_payload(title="Valid"),
+            recipe_payload(title=""),
+            {"id": other_recipe.id, "title": "Stolen"},
+        ])
+
+        self.assertEqual(status.HTTP_207_MULTI_STATUS, res.status_code)
+        results = res.data["results"]
+        self.assertEqual([201, 400, 404], [r["status"] for r in results])
+        self.assertIn("title", results[1]["errors"])
+        self.assertEqual(1, Recipe.objects.filter(user=self.user).count())
+        other_recipe.refresh_from_db()
+        self.assertEqual("Curry", other_recipe.title)
+
+    def test_bulk_rejects_non_list(self):
+        """Test the payload must be a list
+
+        :return:
+        """
+        res = self.post(recipe_payload())
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+
+    def test_bulk_create_query_count_constant(self):
+        """Test the queries do not grow with the batch size
+
+        :return:
+        """
+        tags = [
+            Tag.objects.create(user=self.user, name=f"Tag {i}")
+            for i in range(3)
+        ]
+        ingredient = Ingredient.objects.create(user=self.user, name="Tofu")
+
+        def count_queries(size):
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.post([
+                    recipe_payload(
+                        title=f"Recipe {i}",
+                        tags=[tag.id for tag in tags],
+                        ingredients=[ingredient.id])
+                    for i in range(size)
+                ])
+            self.assertEqual(status.HTTP_200_OK, res.status_code)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(count_queries(2), count_queries(20))
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag
+from recipe import cache
+
+TAGS_URL = reverse("recipe:tag-list")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+class TestListCache(TestCase):
+    """Tests for the per-user list response cache
+
+    """
+
+    def setUp(self) -> None:
+        cache.get_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com",
+            password="password123",
+            name="Test User"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test a repeated list request only runs the validator query
+
+        :return:
+        """
+        Tag.objects.create(user=self.user, name="Vegan")
+        first = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual("MISS", first["X-Cache"])
+        self.assertEqual("HIT", second["X-Cache"])
+        self.assertEqual(first.data, second.data)
+        self.assertEqual({"hits": 1, "misses": 1}, cache.get_stats())
+
+    def test_query_params_cached_separately(self):
+        """Test different query params do not share a cache entry
+
+        :return:
+        """
+        Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=5, price=5.00)
+
+        self.client.get(RECIPES_URL)
+        res = self.client.get(RECIPES_URL, {"search": "pasta"})
+
+        self.assertEqual("MISS", res["X-Cache"])
+        self.assertEqual([], res.data)
+
+    def test_write_invalidates_user_lists(self):
+        """Test creating through the API invalidates cached lists
+
+        :return:
+        """
+        self.client.get(TAGS_URL)
+        self.client.get(RECIPES_URL)
+
+        res = self.client.post(TAGS_URL, {"name": "Vegan"})
+        self.assertEqual(status.HTTP_201_CREATED, res.status_code)
+
+        tags = self.client.get(TAGS_URL)
+        recipes = self.client.get(RECIPES_URL)
+
+        self.assertEqual("MISS", tags["X-Cache"])
+        self.assertEqual("MISS", recipes["X-Cache"])
+        self.assertEqual(["Vegan"], [tag["name"] for tag in tags.data])
+
+    def test_cache_limited_to_user(self):
+        """Test users never see each other's cached lists
+
+        :return:
+        """
+        other_user = get_user_model().objects.create_user(
+            email="test2@travelperk.com",
+            password="password123",
+            name="Test User 2"
+        )
+        Tag.objects.create(user=self.user, name="Vegan")
+        self.client.get(TAGS_URL)
+
+        self.client.force_authenticate(other_user)
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual("MISS", res["X-Cache"])
+        self.assertEqual([], res.data)
@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import serializers
+from recipe.compiled import get_compiled
+
+
+class TestCompiledSerializer(TestCase):
+    """Tests for the compiled list serializers
+
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com",
+            password="password123",
+            name="Test User"
+        )
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ("Vegan", "Dessert", "Crème brûlée")]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name)
+                       for name in ("Salt", "Pepper")]
+
+        first = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=30, price=5.5,
+            link="https://example.com/curry")
+        first.tags.add(tags[2], tags[0])
+        first.ingredients.add(*ingredients)
+
+        second = Recipe.objects.create(
+            user=self.user, title="Ünïcode \"quoted\"", time_minutes=0,
+            price=10, image="uploads/recipe/aa/bb/x.jpg",
+            image_variants={"thumb": "uploads/recipe/aa/bb/x_thumb.jpg",
+                            "medium": "uploads/recipe/aa/bb/x_medium.jpg"})
+        second.tags.add(tags[1])
+
+        Recipe.objects.create(
+            user=self.user, title="Plain", time_minutes=5, price=0.99)
+
+        request = APIRequestFactory().get("/api/recipe/recipes/")
+        request.user = self.user
+        self.context = {"request": request}
+
+    def assertSameOutput(self, serializer_class, queryset):
+        """Assert both serializers render the same JSON bytes
+
+        :param serializer_class:
+        :param queryset:
+        :return:
+        """
+        compiled = get_compiled(serializer_class)
+        expected = JSONRenderer().render(
+            serializer_class(queryset, many=True, context=self.context).data)
+        actual = JSONRenderer().render(compiled.to_representation(
+            compiled.values(queryset), self.context))
+
+        self.assertEqual(expected, actual)
+
+    def recipes(self):
+        return Recipe.objects.order_by("-title").prefetch_related(
+            Prefetch("tags", queryset=Tag.objects.order_by("id")),
+            Prefetch("ingredients",
+                     queryset=Ingredient.objects.order_by("id")))
+
+    def test_tags_match(self):
+        """Test compiled tag output matches TagSerializer
+
+        :return:
+        """
+        self.assertSameOutput(
+            serializers.TagSerializer, Tag.objects.order_by("-name"))
+
+    def test_ingredients_match(self):
+        """Test compiled ingredient output matches IngredientSerializer
+
+        :return:
+        """
+        self.assertSameOutput(
+            serializers.IngredientSerializer,
+            Ingredient.objects.order_by("-name"))
+
+    def test_recipes_match(self):
+        """Test compiled recipe output matches RecipeSerializer
+
+        :return:
+        """
+        self.assertSameOutput(serializers.RecipeSerializer, self.recipes())
+
+    @override_settings(MEDIA_SIGNED_URLS=True)
+    def test_recipes_match_signed_urls(self):
+        """Test compiled image URLs are signed like the serializer's
+
+        :return:
+        """
+        self.assertSameOutput(serializers.RecipeSerializer, self.recipes())
+
+    def test_recipes_match_without_request(self):
+        """Test relative URLs match when there is no request in context
+
+        :return:
+        """
+        self.context = {}
+
+        self.assertSameOutput(serializers.RecipeSerializer, self.recipes())
+
+    def test_nested_serializer_not_compiled(self):
+        """Test serializers with nested fields fall back to DRF
+
+        :return:
+        """
+        self.assertIsNone(get_compiled(serializers.RecipeDetailSerializer))
@@ -0,0 +1,172 @@
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag
+
+TAGS_URL = reverse("recipe:tag-list")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL
+
+    :param recipe_id:
+    :return:
+    """
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+class TestConditionalGet(TestCase):
+    """Tests for ETag / Last-Modified revalidation
+
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com",
+            password="password123",
+            name="Test User"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=5, price=5.00)
+
+    def test_list_not_modified(self):
+        """Test a current ETag returns 304 with only the validator query
+
+        :return:
+        """
+        res = self.client.get(RECIPES_URL)
+        self.assertIn("ETag", res)
+        self.assertIn("Last-Modified", res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                RECIPES_URL, HTTP_IF_NONE_MATCH=res["ETag"])
+
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, res.status_code)
+
+    def test_list_if_modified_since(self):
+        """Test If-Modified-Since returns 304 for an unchanged list
+
+        :return:
+        """
+        res = self.client.get(TAGS_URL)
+        self.assertNotIn("Last-Modified", res)
+
+        Tag.objects.create(user=self.user, name="Vegan")
+        res = self.client.get(TAGS_URL)
+        res = self.client.get(
+            TAGS_URL, HTTP_IF_MODIFIED_SINCE=res["Last-Modified"])
+
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, res.status_code)
+
+    def test_list_modified_by_m2m_change(self):
+        """Test adding a tag to a recipe changes the list validator
+
+        :return:
+        """
+        etag = self.client.get(RECIPES_URL)["ETag"]
+
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name="Hot"))
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertNotEqual(etag, res["ETag"])
+
+    def test_list_modified_by_delete(self):
+        """Test deleting a recipe changes the list validator
+
+        :return:
+        """
+        Recipe.objects.create(
+            user=self.user, title="Pasta", time_minutes=5, price=5.00)
+        etag = self.client.get(RECIPES_URL)["ETag"]
+
+        self.recipe.delete()
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(1, len(res.data))
+
+    def test_list_validator_varies_with_params(self):
+        """Test a list ETag does not validate a differently filtered list
+
+        :return:
+        """
+        etag = self.client.get(RECIPES_URL)["ETag"]
+
+        res = self.client.get(
+            RECIPES_URL, {"search": "curry"}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+
+    def test_detail_not_modified(self):
+        """Test a current ETag on a recipe detail returns 304
+
+        :return:
+        """
+        etag = self.client.get(detail_url(self.recipe.id))["ETag"]
+
+        with self.assertNumQueries(1):
+            res = self.client.get(
+                detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, res.status_code)
+
+    def test_detail_modified_by_tag_rename(self):
+        """Test renaming a recipe's tag changes the detail validator
+
+        :return:
+        """
+        tag = Tag.objects.create(user=self.user, name="Hot")
+        self.recipe.tags.add(tag)
+        etag = self.client.get(detail_url(self.recipe.id))["ETag"]
+
+        tag.name = "Mild"
+        tag.save()
+        res = self.client.get(
+            detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual("Mild", res.data["tags"][0]["name"])
+
+    def test_detail_missing_recipe(self):
+        """Test retrieving a missing recipe still returns 404
+
+        :return:
+        """
+        res = self.client.get(detail_url(self.recipe.id + 1000))
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, res.status_code)
+
+    @override_settings(MEDIA_SIGNED_URLS=True, MEDIA_SIGNED_URL_WINDOW=60)
+    def test_signed_urls_expire_validators(self):
+        """Test validators change with the signing window of media URLs
+
+        :return:
+        """
+        start = (int(time.time()) // 60 + 1) * 60
+        for url in (RECIPES_URL, detail_url(self.recipe.id)):
+            with patch("recipe.media.time") as clock:
+                clock.time.return_value = start
+                res = self.client.get(url)
+                etag, last_modified = res["ETag"], res["Last-Modified"]
+
+                clock.time.return_value = start + 59
+                res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    status.HTTP_304_NOT_MODIFIED, res.status_code)
+
+                clock.time.return_value = start + 60
+                res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(status.HTTP_200_OK, res.status_code)
+                res = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(status.HTTP_200_OK, res.status_code)
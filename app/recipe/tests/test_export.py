@@ -0,0 +1,168 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import export
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def read_stream(res):
+    """Return the body of a streaming response as text
+
+    :param res:
+    :return:
+    """
+    return b"".join(res.streaming_content).decode("utf-8")
+
+
+class TestRecipeExport(TestCase):
+    """Tests for the streaming recipe export
+
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com",
+            password="password123",
+            name="Test User"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name="Vegan")
+        dessert = Tag.objects.create(user=self.user, name="Dessert")
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+        pepper = Ingredient.objects.create(user=self.user, name="Pepper")
+
+        self.curry = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=30, price=5.5,
+            link="https://example.com/curry")
+        self.curry.tags.add(self.vegan, dessert)
+        self.curry.ingredients.add(salt, pepper)
+
+        self.cake = Recipe.objects.create(
+            user=self.user, title="Crème, \"brûlée\"", time_minutes=5,
+            price=10)
+
+    def test_export_ndjson(self):
+        """Test each recipe is one JSON line with resolved names
+
+        """
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertIsInstance(res, StreamingHttpResponse)
+        self.assertTrue(res["Content-Type"].startswith("application/x-ndjson"))
+        self.assertIn("recipes.ndjson", res["Content-Disposition"])
+
+        rows = [json.loads(line) for line in read_stream(res).splitlines()]
+        self.assertEqual([self.curry.pk, self.cake.pk],
+                         [row["id"] for row in rows])
+        self.assertEqual(["Dessert", "Vegan"], rows[0]["tags"])
+        self.assertEqual(["Pepper", "Salt"], rows[0]["ingredients"])
+        self.assertEqual("5.50", rows[0]["price"])
+        self.assertEqual([], rows[1]["tags"])
+        self.assertEqual("Crème, \"brûlée\"", rows[1]["title"])
+
+    def test_export_csv(self):
+        """Test the CSV export has a header and joins names
+
+        """
+        res = self.client.get(EXPORT_URL, {"type": "csv"})
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertTrue(res["Content-Type"].startswith("text/csv"))
+
+        rows = list(csv.DictReader(io.StringIO(read_stream(res))))
+        self.assertEqual(list(export.EXPORT_FIELDS), list(rows[0]))
+        self.assertEqual("Dessert|Vegan", rows[0]["tags"])
+        self.assertEqual("Pepper|Salt", rows[0]["ingredients"])
+        self.assertEqual("Crème, \"brûlée\"", rows[1]["title"])
+        self.assertEqual("", rows[1]["ingredients"])
+
+    def test_export_applies_filters(self):
+        """Test the list filters narrow the export
+
+        """
+        res = self.client.get(EXPORT_URL, {"tags": str(self.vegan.pk)})
+
+        rows = [json.loads(line) for line in read_stream(res).splitlines()]
+        self.assertEqual([self.curry.pk], [row["id"] for row in rows])
+
+    def test_export_limited_to_user(self):
+        """Test recipes of other users are not exported
+
+        """
+        other = get_user_model().objects.create_user(
+            email="other@travelperk.com", password="password123")
+        Recipe.objects.create(
+            user=other, title="Secret", time_minutes=1, price=1)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertNotIn("Secret", read_stream(res))
+
+    def test_export_unknown_type(self):
+        """Test an unknown export type is rejected
+
+        """
+        res = self.client.get(EXPORT_URL, {"type": "xml"})
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+
+    def test_export_login_required(self):
+        """Test the export requires authentication
+
+        """
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, res.status_code)
+
+    def test_output_is_buffered(self):
+        """Test rows are written in chunks rather than one per recipe
+
+        """
+        lines = [f"{i:0100d}\n" for i in range(2000)]
+
+        chunks = list(export._buffered(iter(lines)))
+
+        self.assertEqual("".join(lines), "".join(chunks))
+        self.assertLess(len(chunks), 10)
+
+    def test_export_command(self):
+        """Test the command writes the export to a file
+
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "recipes.csv")
+            call_command("export_recipes", "--format", "csv",
+                         "--user", self.user.email, "--output", path)
+
+            with open(path, encoding="utf-8", newline="") as f:
+                rows = list(csv.DictReader(f))
+
+        self.assertEqual(2, len(rows))
+        self.assertEqual("Curry", rows[0]["title"])
+
+    def test_export_command_stdout(self):
+        """Test the command writes NDJSON to stdout by default
+
+        """
+        out = io.StringIO()
+        call_command("export_recipes", stdout=out)
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([self.curry.pk, self.cake.pk],
+                         [row["id"] for row in rows])
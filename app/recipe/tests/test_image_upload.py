@@ -0,0 +1,183 @@
+import os
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageBlob, Recipe, sharded_image_path
+
+UPLOAD_DIR = "uploads/recipe"
+
+
+def image_upload_url(recipe_id):
+    """Return recipe image URL
+
+    :param recipe_id:
+    :return:
+    """
+    return reverse("recipe:recipe-upload-image", args=[recipe_id])
+
+
+def sample_upload(size=(10, 10), image_format="JPEG", noise=False):
+    """Return an uploaded image file of the given size and format
+
+    :param size:
+    :param image_format:
+    :param noise:
+    :return:
+    """
+    image = Image.effect_noise(size, 64).convert("RGB") if noise \
+        else Image.new("RGB", size)
+    out = BytesIO()
+    image.save(out, format=image_format)
+    return SimpleUploadedFile(
+        f"image.{image_format.lower()}", out.getvalue())
+
+
+def leftover_uploads():
+    """Return the temporary upload files left in the upload directory
+
+    :return:
+    """
+    if not default_storage.exists(UPLOAD_DIR):
+        return []
+
+    _, files = default_storage.listdir(UPLOAD_DIR)
+    return [name for name in files if ".upload" in name]
+
+
+class TestBoundedImageUpload(TestCase):
+    """Tests for the streaming, size-bounded image upload handler
+
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com",
+            password="password123",
+            name="Test User"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=5, price=5.00)
+        self.url = image_upload_url(self.recipe.id)
+
+    def tearDown(self) -> None:
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+    def test_upload_moved_into_place(self):
+        """Test a valid upload is stored without leaving temporary files
+
+        :return:
+        """
+        res = self.client.post(
+            self.url, {"image": sample_upload()}, format="multipart")
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(
+            sharded_image_path(os.path.basename(self.recipe.image.name)),
+            self.recipe.image.name)
+        self.assertEqual(
+            ImageBlob.objects.get().sha256,
+            os.path.splitext(os.path.basename(self.recipe.image.name))[0])
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertEqual([], leftover_uploads())
+
+    def test_identical_uploads_deduplicated(self):
+        """Test uploading the same image to two recipes stores it once
+
+        :return:
+        """
+        other = Recipe.objects.create(
+            user=self.user, title="Dal", time_minutes=5, price=5.00)
+        upload = sample_upload()
+
+        self.client.post(self.url, {"image": upload}, format="multipart")
+        upload.seek(0)
+        self.client.post(
+            image_upload_url(other.id), {"image": upload},
+            format="multipart")
+
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, other.image.name)
+        self.assertEqual(2, ImageBlob.objects.get().ref_count)
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=2000)
+    def test_upload_too_large_while_streaming(self):
+        """Test an upload is rejected once it exceeds the byte limit
+
+        :return:
+        """
+        upload = sample_upload((100, 100), noise=True)
+        self.assertGreater(upload.size, 2000)
+
+        res = self.client.post(self.url, {"image": upload},
+                               format="multipart")
+
+        self.assertEqual(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, res.status_code)
+        self.assertEqual([], leftover_uploads())
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=2000)
+    def test_upload_too_large_content_length(self):
+        """Test a request body far above the limit is rejected up front
+
+        :return:
+        """
+        upload = sample_upload((400, 400), noise=True)
+
+        res = self.client.post(self.url, {"image": upload},
+                               format="multipart")
+
+        self.assertEqual(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, res.status_code)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=100)
+    def test_upload_too_many_pixels(self):
+        """Test an image above the pixel limit is rejected
+
+        :return:
+        """
+        res = self.client.post(
+            self.url, {"image": sample_upload((20, 20))}, format="multipart")
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+        self.assertIn("image", res.data)
+        self.assertEqual([], leftover_uploads())
+
+    def test_upload_unsupported_format(self):
+        """Test formats outside the allowed list are rejected
+
+        :return:
+        """
+        res = self.client.post(
+            self.url, {"image": sample_upload(image_format="BMP")},
+            format="multipart")
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+        self.assertIn("image", res.data)
+
+    def test_upload_not_an_image(self):
+        """Test a file that is not an image is rejected
+
+        :return:
+        """
+        upload = SimpleUploadedFile("image.jpg", b"not an image" * 100)
+
+        res = self.client.post(self.url, {"image": upload},
+                               format="multipart")
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+        self.assertEqual([], leftover_uploads())
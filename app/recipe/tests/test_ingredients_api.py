@@ -7,6 +7,7 @@ from core.models import Ingredient
 from recipe.serializers import IngredientSerializer
 
 INGREDIENTS_URL = reverse("recipe:ingredient-list")
+INGREDIENTS_BULK_URL = reverse("recipe:ingredient-bulk")
 
 
 class TestPublicIngredientsAPI(TestCase):
@@ -104,3 +105,21 @@ class TestPrivateTagsAPI(TestCase):
         res = self.client.post(INGREDIENTS_URL, payload)
 
         self.assertEquals(status.HTTP_400_BAD_REQUEST, res.status_code)
+
+    def test_bulk_get_or_create_ingredients(self):
+        """Test resolving ingredient names matches existing ones by case
+
+        :return:
+        """
+        existing = Ingredient.objects.create(user=self.user, name="Salt")
+
+        res = self.client.post(INGREDIENTS_BULK_URL, {
+            "names": ["salt", "Pepper"]
+        }, format="json")
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(
+            [{"id": existing.id, "name": "Salt"},
+             {"id": Ingredient.objects.get(name="Pepper").id,
+              "name": "Pepper"}],
+            res.data)
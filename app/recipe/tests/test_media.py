@@ -0,0 +1,228 @@
+import os
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+CONTENT = bytes(range(256)) * 4
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL
+
+    :param recipe_id:
+    :return:
+    """
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+class TestServeMedia(TestCase):
+    """Tests for serving uploaded media
+
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com",
+            password="password123",
+            name="Test User"
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=5, price=5.00)
+        self.recipe.image.save("curry.jpg", ContentFile(CONTENT))
+        self.url = self.recipe.image.url
+
+    def tearDown(self) -> None:
+        self.recipe.image.delete()
+
+    def test_serve_with_cache_headers(self):
+        """Test media is served with long-lived cache headers
+
+        :return:
+        """
+        res = self.client.get(self.url)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(CONTENT, b"".join(res.streaming_content))
+        self.assertEqual("image/jpeg", res["Content-Type"])
+        self.assertEqual("bytes", res["Accept-Ranges"])
+        self.assertIn("immutable", res["Cache-Control"])
+        self.assertTrue(res.has_header("Last-Modified"))
+
+    def test_serve_range(self):
+        """Test a byte range is served as partial content
+
+        :return:
+        """
+        res = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+
+        self.assertEqual(status.HTTP_206_PARTIAL_CONTENT, res.status_code)
+        self.assertEqual(CONTENT[10:20], b"".join(res.streaming_content))
+        self.assertEqual(f"bytes 10-19/{len(CONTENT)}", res["Content-Range"])
+
+    def test_serve_suffix_range(self):
+        """Test a suffix range returns the end of the file
+
+        :return:
+        """
+        res = self.client.get(self.url, HTTP_RANGE="bytes=-5")
+
+        self.assertEqual(status.HTTP_206_PARTIAL_CONTENT, res.status_code)
+        self.assertEqual(CONTENT[-5:], b"".join(res.streaming_content))
+
+    def test_serve_unsatisfiable_range(self):
+        """Test a range past the end of the file is rejected
+
+        :return:
+        """
+        res = self.client.get(self.url, HTTP_RANGE="bytes=5000-")
+
+        self.assertEqual(
+            status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, res.status_code)
+        self.assertEqual(f"bytes */{len(CONTENT)}", res["Content-Range"])
+
+    def test_serve_not_modified(self):
+        """Test a fresh If-Modified-Since returns 304
+
+        :return:
+        """
+        mtime = os.stat(self.recipe.image.path).st_mtime
+
+        res = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=http_date(mtime))
+
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, res.status_code)
+
+    def test_serve_path_traversal(self):
+        """Test paths outside the media root are not served
+
+        :return:
+        """
+        res = self.client.get("/media/../../../etc/passwd")
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, res.status_code)
+
+    @override_settings(MEDIA_SERVE_MODE="x-accel",
+                       MEDIA_ACCEL_PREFIX="/protected-media/")
+    def test_serve_x_accel_redirect(self):
+        """Test nginx mode hands the file over with X-Accel-Redirect
+
+        :return:
+        """
+        res = self.client.get(self.url)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(
+            "/protected-media/" + self.recipe.image.name,
+            res["X-Accel-Redirect"])
+        self.assertEqual(b"", res.content)
+        self.assertIn("immutable", res["Cache-Control"])
+
+    @override_settings(MEDIA_SERVE_MODE="x-sendfile")
+    def test_serve_x_sendfile(self):
+        """Test sendfile mode hands the file over with X-Sendfile
+
+        :return:
+        """
+        res = self.client.get(self.url)
+
+        self.assertEqual(self.recipe.image.path, res["X-Sendfile"])
+        self.assertEqual(b"", res.content)
+
+
+@override_settings(MEDIA_SIGNED_URLS=True)
+class TestSignedMedia(TestCase):
+    """Tests for signed media URLs
+
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com",
+            password="password123",
+            name="Test User"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Curry", time_minutes=5, price=5.00)
+        self.recipe.image.save("curry.jpg", ContentFile(CONTENT))
+
+    def tearDown(self) -> None:
+        self.recipe.image.delete()
+
+    def signed_url(self):
+        return self.client.get(detail_url(self.recipe.id)).data["image"]
+
+    def test_signed_url_served(self):
+        """Test the URL returned by the API grants access to the image
+
+        :return:
+        """
+        res = self.client.get(self.signed_url())
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertIn("private", res["Cache-Control"])
+
+    def test_signed_url_stable_within_window(self):
+        """Test repeated requests get the same, cacheable URL
+
+        :return:
+        """
+        self.assertEqual(self.signed_url(), self.signed_url())
+
+    def test_unsigned_url_forbidden(self):
+        """Test the bare media URL is rejected
+
+        :return:
+        """
+        res = self.client.get(self.recipe.image.url)
+
+        self.assertEqual(status.HTTP_403_FORBIDDEN, res.status_code)
+
+    def test_tampered_url_forbidden(self):
+        """Test changing the signed owner invalidates the URL
+
+        :return:
+        """
+        url = self.signed_url().replace(
+            f"u={self.user.id}", f"u={self.user.id + 1}")
+
+        res = self.client.get(url)
+
+        self.assertEqual(status.HTTP_403_FORBIDDEN, res.status_code)
+
+    def test_changed_owner_forbidden(self):
+        """Test a URL stops working once the recipe changes owner
+
+        :return:
+        """
+        url = self.signed_url()
+        other_user = get_user_model().objects.create_user(
+            email="test2@travelperk.com", password="password123")
+        Recipe.objects.filter(pk=self.recipe.id).update(user=other_user)
+
+        res = self.client.get(url)
+
+        self.assertEqual(status.HTTP_403_FORBIDDEN, res.status_code)
+
+    def test_expired_url_forbidden(self):
+        """Test a URL is rejected after it expires
+
+        :return:
+        """
+        url = self.signed_url()
+
+        with patch("recipe.media.time.time",
+                   return_value=time.time() + 3 * 3600):
+            res = self.client.get(url)
+
+        self.assertEqual(status.HTTP_403_FORBIDDEN, res.status_code)
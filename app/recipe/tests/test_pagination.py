@@ -0,0 +1,141 @@
+import base64
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Tag, Recipe
+
+TAGS_URL = reverse("recipe:tag-list")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def link_url(res, rel):
+    """Return the URL with the given rel from the Link header
+
+    :param res:
+    :param rel:
+    :return:
+    """
+    for url, found in re.findall(r'<([^>]+)>; rel="(\w+)"',
+                                 res.get("Link", "")):
+        if found == rel:
+            return url
+
+    return None
+
+
+def cursor(position):
+    """Return a cursor param for a raw position
+
+    :param position:
+    :return:
+    """
+    data = json.dumps({"p": position}).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+class TestKeysetPagination(TestCase):
+    """Tests for keyset pagination of list endpoints
+
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com",
+            password="password123",
+            name="Test User"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_pages_follow_ordering_with_tiebreaker(self):
+        """Test paging through recipes visits every row once, in order
+
+        :return:
+        """
+        for title in ["Vegan", "Dessert", "Dessert", "Curry", "Dessert"]:
+            Recipe.objects.create(
+                user=self.user, title=title, time_minutes=5, price=5.00)
+
+        expected = list(Recipe.objects.order_by("-title", "-id").values_list(
+            "id", flat=True))
+
+        seen = []
+        url = RECIPES_URL + "?page_size=2"
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(status.HTTP_200_OK, res.status_code)
+            self.assertLessEqual(len(res.data), 2)
+            seen.extend(recipe["id"] for recipe in res.data)
+            url = link_url(res, "next")
+
+        self.assertEqual(expected, seen)
+
+    def test_previous_link_returns_previous_page(self):
+        """Test the prev link returns the page before the cursor
+
+        :return:
+        """
+        for i in range(5):
+            Recipe.objects.create(
+                user=self.user, title=f"Recipe {i}", time_minutes=5,
+                price=5.00)
+
+        first = self.client.get(RECIPES_URL, {"page_size": 2})
+        second = self.client.get(link_url(first, "next"))
+        back = self.client.get(link_url(second, "prev"))
+
+        self.assertIsNone(link_url(first, "prev"))
+        self.assertEqual(
+            ["Recipe 4", "Recipe 3"], [r["title"] for r in first.data])
+        self.assertEqual(
+            ["Recipe 2", "Recipe 1"], [r["title"] for r in second.data])
+        self.assertEqual(first.data, back.data)
+
+    def test_page_size_bounded(self):
+        """Test the default page size applies without a page_size param
+
+        :return:
+        """
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(1, len(res.data))
+        self.assertFalse(res.has_header("Link"))
+
+    def test_invalid_cursor(self):
+        """Test an invalid cursor is rejected
+
+        :return:
+        """
+        res = self.client.get(TAGS_URL, {"cursor": "notacursor"})
+
+        self.assertEqual(status.HTTP_404_NOT_FOUND, res.status_code)
+
+    def test_invalid_cursor_values(self):
+        """Test cursors with values of the wrong type are rejected
+
+        :return:
+        """
+        for position in (["x", "notnum"], ["x", None], [None, 1],
+                         ["x", [1]]):
+            res = self.client.get(TAGS_URL, {"cursor": cursor(position)})
+
+            self.assertEqual(
+                status.HTTP_404_NOT_FOUND, res.status_code, position)
+
+    def test_cursor_values_converted(self):
+        """Test cursor values are converted to their field's type
+
+        :return:
+        """
+        Tag.objects.create(user=self.user, name="A")
+        res = self.client.get(TAGS_URL, {"cursor": cursor(["B", "999999"])})
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(["A"], [tag["name"] for tag in res.data])
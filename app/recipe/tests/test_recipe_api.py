@@ -4,8 +4,11 @@ import os
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import connection
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APIClient
 from core.models import Recipe, Tag, Ingredient
@@ -156,6 +159,46 @@ class TestPrivateTagsAPI(TestCase):
 
         self.assertEqual(serializer.data, res.data)
 
+    def test_list_recipes_query_count_constant(self):
+        """Test listing recipes costs the same queries for any row count
+
+        :return:
+        """
+        for i in range(5):
+            recipe = sample_recipe(self.user, title=f"Recipe {i}")
+            recipe.tags.add(sample_tag(self.user, name=f"Tag {i}"))
+            recipe.ingredients.add(
+                sample_ingredient(self.user, name=f"Ingredient {i}"))
+
+        # Validator aggregate, then recipes with their tag and ingredient
+        # id arrays
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(5, len(res.data))
+        self.assertEqual(1, len(res.data[0]['tags']))
+        self.assertEqual(1, len(res.data[0]['ingredients']))
+
+    def test_view_recipe_detail_query_count(self):
+        """Test retrieving a recipe prefetches its nested objects
+
+        :return:
+        """
+        recipe = sample_recipe(user=self.user)
+        for i in range(3):
+            recipe.tags.add(sample_tag(self.user, name=f"Tag {i}"))
+            recipe.ingredients.add(
+                sample_ingredient(self.user, name=f"Ingredient {i}"))
+
+        # Validator lookup, recipe, ingredients, tags
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(3, len(res.data['tags']))
+        self.assertEqual(3, len(res.data['ingredients']))
+
     def test_create_basic_recipe(self):
         """Test creating recipe
 
@@ -220,6 +263,72 @@ class TestPrivateTagsAPI(TestCase):
         self.assertIn(ingredient1, recipe.ingredients.all())
         self.assertIn(ingredient2, recipe.ingredients.all())
 
+    def test_create_recipe_with_other_users_tag(self):
+        """Test tags belonging to another user are rejected
+
+        :return:
+        """
+        other_user = get_user_model().objects.create_user(
+            email="test2@travelperk.com",
+            password="password123",
+            name="Test User 2"
+        )
+        tag = sample_tag(user=other_user, name="Vegan")
+
+        payload = {
+            "title": "Avocado Lime Cheesecake",
+            "tags": [tag.id],
+            "time_minutes": 60,
+            "price": 20.00
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+        self.assertIn(str(tag.id), str(res.data["tags"]))
+
+    def test_create_recipe_reports_all_missing_ids(self):
+        """Test every missing ingredient id is reported in one error
+
+        :return:
+        """
+        ingredient = sample_ingredient(user=self.user)
+        payload = {
+            "title": "Thai Prawn Red Curry",
+            "ingredients": [ingredient.id, 99998, 99999],
+            "time_minutes": 20,
+            "price": 7.00
+        }
+
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+        self.assertIn("99998, 99999", str(res.data["ingredients"]))
+
+    def test_create_recipe_validation_query_count(self):
+        """Test validating ingredient ids costs one query for any count
+
+        :return:
+        """
+        ingredients = [
+            sample_ingredient(user=self.user, name=f"Ingredient {i}")
+            for i in range(40)
+        ]
+
+        def count_queries(count):
+            payload = {
+                "title": "Stew",
+                "ingredients": [i.id for i in ingredients[:count]],
+                "time_minutes": 20,
+                "price": 7.00
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECIPES_URL, payload)
+            self.assertEqual(status.HTTP_201_CREATED, res.status_code)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(count_queries(1), count_queries(40))
+
     def test_partial_update_recipe(self):
         """Test updating a recipe with patch
 
@@ -323,6 +432,47 @@ class TestRecipeImageUpload(TestCase):
 
         self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
 
+    def test_upload_image_defers_variants(self):
+        """Test uploading returns before the variants are rendered
+
+        :return:
+        """
+        url = image_upload_url(self.recipe.id)
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new("RGB", (10, 10)).save(ntf, format="JPEG")
+            ntf.seek(0)
+            res = self.client.post(url, {"image": ntf}, format="multipart")
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual({}, res.data["image_variants"])
+
+    @override_settings(RECIPE_IMAGE_EAGER=True)
+    def test_recipe_detail_lists_image_variants(self):
+        """Test the recipe serializers return the variant URLs
+
+        :return:
+        """
+        url = image_upload_url(self.recipe.id)
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new("RGB", (800, 600)).save(ntf, format="JPEG")
+            ntf.seek(0)
+            self.client.post(url, {"image": ntf}, format="multipart")
+
+        self.recipe.refresh_from_db()
+        for path in self.recipe.image_variants.values():
+            self.addCleanup(default_storage.delete, path)
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual({"thumb", "medium"}, set(res.data["image_variants"]))
+        self.assertRegex(
+            res.data["image_variants"]["thumb"], r"_thumb_[0-9a-f]{12}\.jpg$")
+        self.assertTrue(res.data["image_variants"]["thumb"].startswith(
+            "http://testserver/media/uploads/recipe/"))
+
     def test_filter_recipes_by_tags(self):
         """Test returning recipes with specific tags
 
@@ -382,3 +532,60 @@ class TestRecipeImageUpload(TestCase):
         self.assertIn(serializer1.data, res.data)
         self.assertIn(serializer2.data, res.data)
         self.assertNotIn(serializer3.data, res.data)
+
+    def test_filter_recipes_no_duplicates(self):
+        """Test a recipe matching several filter ids is returned once
+
+        :return:
+        """
+        recipe = sample_recipe(self.user, title="Thai Vegetable Curry")
+        tag1 = sample_tag(self.user, name="Vegan")
+        tag2 = sample_tag(self.user, name="Spicy")
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(
+            RECIPES_URL, {
+                'tags': f'{tag1.id},{tag2.id}'
+            }
+        )
+
+        self.assertEqual(1, len(res.data))
+
+    def test_filter_recipes_match_all(self):
+        """Test match=all only returns recipes with every requested tag
+
+        :return:
+        """
+        recipe1 = sample_recipe(self.user, title="Thai Vegetable Curry")
+        recipe2 = sample_recipe(self.user, title="Aubergine with Tahini")
+        tag1 = sample_tag(self.user, name="Vegan")
+        tag2 = sample_tag(self.user, name="Spicy")
+        ingredient = sample_ingredient(self.user, name="Aubergine")
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+        recipe1.ingredients.add(ingredient)
+        recipe2.ingredients.add(ingredient)
+
+        res = self.client.get(
+            RECIPES_URL, {
+                'tags': f'{tag1.id},{tag2.id}',
+                'tags_match': 'all',
+                'ingredients': f'{ingredient.id}',
+                'ingredients_match': 'all',
+            }
+        )
+
+        self.assertEqual(
+            [RecipeSerializer(recipe1).data], res.data)
+
+    def test_filter_recipes_invalid_params(self):
+        """Test invalid filter params are rejected
+
+        :return:
+        """
+        res1 = self.client.get(RECIPES_URL, {'tags': 'abc'})
+        res2 = self.client.get(
+            RECIPES_URL, {'tags': '1', 'tags_match': 'some'})
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res1.status_code)
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res2.status_code)
@@ -0,0 +1,151 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+from recipe.tests.test_pagination import link_url
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def sample_recipe(user, **params):
+    """Create and return sample recipe
+
+    :param user:
+    :param params:
+    :return:
+    """
+    defaults = {
+        "title": "Sample Recipe",
+        "time_minutes": 10,
+        "price": 5.00
+    }
+
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class TestRecipeSearchAPI(TestCase):
+    """Tests for full-text recipe search
+
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com",
+            password="password123",
+            name="Test User"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, text):
+        """Search recipes and return the matching titles
+
+        :param text:
+        :return:
+        """
+        res = self.client.get(RECIPES_URL, {"search": text})
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+
+        return [recipe["title"] for recipe in res.data]
+
+    def test_search_title(self):
+        """Test searching matches recipe titles, including word stems
+
+        :return:
+        """
+        sample_recipe(self.user, title="Roasted Carrots")
+        sample_recipe(self.user, title="Fish and chips")
+
+        self.assertEqual(["Roasted Carrots"], self.search("carrot"))
+
+    def test_search_tags_and_ingredients(self):
+        """Test searching matches tag and ingredient names
+
+        :return:
+        """
+        recipe1 = sample_recipe(self.user, title="Thai Curry")
+        recipe2 = sample_recipe(self.user, title="Aubergine with Tahini")
+        recipe1.tags.add(Tag.objects.create(user=self.user, name="Spicy"))
+        recipe2.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Sesame"))
+
+        self.assertEqual(["Thai Curry"], self.search("spicy"))
+        self.assertEqual(["Aubergine with Tahini"], self.search("sesame"))
+
+    def test_search_ranks_title_matches_first(self):
+        """Test title matches rank above tag matches
+
+        :return:
+        """
+        recipe = sample_recipe(self.user, title="Beans on toast")
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Chicken"))
+        sample_recipe(self.user, title="Chicken cacciatore")
+
+        self.assertEqual(
+            ["Chicken cacciatore", "Beans on toast"], self.search("chicken"))
+
+    def test_search_tracks_changes(self):
+        """Test the index follows renames and removed relations
+
+        :return:
+        """
+        recipe = sample_recipe(self.user, title="Thai Curry")
+        tag = Tag.objects.create(user=self.user, name="Spicy")
+        ingredient = Ingredient.objects.create(user=self.user, name="Lime")
+        recipe.tags.add(tag)
+        ingredient.recipe_set.add(recipe)
+
+        tag.name = "Mild"
+        tag.save()
+        self.assertEqual([], self.search("spicy"))
+        self.assertEqual(["Thai Curry"], self.search("mild"))
+
+        ingredient.recipe_set.clear()
+        self.assertEqual([], self.search("lime"))
+
+        recipe.title = "Green Curry"
+        recipe.save()
+        self.assertEqual(["Green Curry"], self.search("green"))
+
+    def test_search_limited_to_user(self):
+        """Test search only returns the authenticated user's recipes
+
+        :return:
+        """
+        other_user = get_user_model().objects.create_user(
+            email="test2@travelperk.com",
+            password="password123",
+            name="Test User 2"
+        )
+        sample_recipe(other_user, title="Roasted Carrots")
+
+        self.assertEqual([], self.search("carrot"))
+
+    def test_search_pages_to_the_end(self):
+        """Test paging through search results visits each match once
+
+        :return:
+        """
+        tag = Tag.objects.create(user=self.user, name="Chicken")
+        titles = set()
+        for i in range(9):
+            recipe = sample_recipe(
+                self.user, title=f"Chicken curry {i}" if i % 2
+                else f"Stew {i}")
+            recipe.tags.add(tag)
+            titles.add(recipe.title)
+
+        seen = []
+        url, params = RECIPES_URL, {"search": "chicken", "page_size": 2}
+        while url and len(seen) <= len(titles):
+            res = self.client.get(url, params)
+            self.assertEqual(status.HTTP_200_OK, res.status_code)
+            seen.extend(recipe["title"] for recipe in res.data)
+            url, params = link_url(res, "next"), None
+
+        self.assertEqual(len(titles), len(seen))
+        self.assertEqual(titles, set(seen))
@@ -7,6 +7,7 @@ from core.models import Tag
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse("recipe:tag-list")
+TAGS_BULK_URL = reverse("recipe:tag-bulk")
 
 
 class TestPublicTagsAPI(TestCase):
@@ -104,3 +105,96 @@ class TestPrivateTagsAPI(TestCase):
         res = self.client.post(TAGS_URL, payload)
 
         self.assertEquals(status.HTTP_400_BAD_REQUEST, res.status_code)
+
+    def test_create_tag_duplicate_name(self):
+        """Test creating a tag whose name exists in another case fails
+
+        :return:
+        """
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.post(TAGS_URL, {"name": "VEGAN"})
+
+        self.assertEquals(status.HTTP_400_BAD_REQUEST, res.status_code)
+        self.assertEqual(1, Tag.objects.filter(user=self.user).count())
+
+    def test_bulk_get_or_create_tags(self):
+        """Test resolving several tag names in a single query
+
+        :return:
+        """
+        existing = Tag.objects.create(user=self.user, name="Vegan")
+
+        with self.assertNumQueries(1):
+            res = self.client.post(TAGS_BULK_URL, {
+                "names": ["vegan", "Dessert", "Spicy", "dessert"]
+            }, format="json")
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(
+            ["Vegan", "Dessert", "Spicy", "Dessert"],
+            [tag["name"] for tag in res.data])
+        self.assertEqual(existing.id, res.data[0]["id"])
+        self.assertEqual(res.data[1]["id"], res.data[3]["id"])
+        self.assertEqual(3, Tag.objects.filter(user=self.user).count())
+
+    def test_bulk_get_or_create_non_ascii(self):
+        """Test names match as the database lowercases them
+
+        Python lowercases "İ" to two characters and a final "Σ" to "ς",
+        unlike the database's unique index.
+
+        :return:
+        """
+        city = Tag.objects.create(user=self.user, name="istanbul")
+        road = Tag.objects.create(user=self.user, name="ΟΔΟΣ")
+
+        res = self.client.post(
+            TAGS_BULK_URL, ["İstanbul", "οδοσ"], format="json")
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(
+            [(city.id, "istanbul"), (road.id, "ΟΔΟΣ")],
+            [(tag["id"], tag["name"]) for tag in res.data])
+        self.assertEqual(2, Tag.objects.filter(user=self.user).count())
+
+    def test_bulk_get_or_create_idempotent(self):
+        """Test repeating a bulk request returns the same ids
+
+        :return:
+        """
+        first = self.client.post(
+            TAGS_BULK_URL, ["Vegan", "Dessert"], format="json")
+        second = self.client.post(
+            TAGS_BULK_URL, ["Vegan", "Dessert"], format="json")
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(2, Tag.objects.filter(user=self.user).count())
+
+    def test_bulk_get_or_create_scoped_to_user(self):
+        """Test bulk names resolve to the authenticated user's tags
+
+        :return:
+        """
+        other_user = get_user_model().objects.create_user(
+            email="test2@travelperk.com",
+            password="password123",
+            name="Test User 2"
+        )
+        other_tag = Tag.objects.create(user=other_user, name="Vegan")
+
+        res = self.client.post(TAGS_BULK_URL, ["Vegan"], format="json")
+
+        self.assertNotEqual(other_tag.id, res.data[0]["id"])
+        self.assertTrue(
+            Tag.objects.filter(user=self.user, name="Vegan").exists())
+
+    def test_bulk_get_or_create_invalid(self):
+        """Test blank names are rejected
+
+        :return:
+        """
+        res = self.client.post(TAGS_BULK_URL, ["Vegan", ""], format="json")
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+        self.assertFalse(Tag.objects.exists())
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from core.models import RECIPE_IMAGE_DIR
+
+# Room for the multipart boundaries and headers around the file itself.
+MULTIPART_OVERHEAD = 64 * 2 ** 10
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Uploaded file is too large."
+    default_code = "upload_too_large"
+
+
+class StreamedImageFile(TemporaryUploadedFile):
+    """Uploaded image written to a temporary file in a chosen directory
+
+    Placing it on the same filesystem as its final location lets the file
+    storage move it into place with a rename instead of copying it.
+    ``image_format`` and ``image_size`` are read from the header and
+    ``sha256`` is computed while the file streams in.
+    """
+
+    def __init__(self, directory, name, content_type, charset,
+                 content_type_extra=None):
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(
+            suffix=".upload" + ext, dir=directory)
+        super(TemporaryUploadedFile, self).__init__(
+            file, name, content_type, 0, charset, content_type_extra)
+        self.image_format = None
+        self.image_size = None
+        self.sha256 = None
+
+
+class BoundedImageUploadHandler(FileUploadHandler):
+    """Upload handler streaming images to disk within byte and pixel limits
+
+    Every chunk goes straight to a file in the upload directory, so memory
+    use per request stays at one chunk plus the buffered header. The format
+    and dimensions are read from the header with Pillow, which does not
+    decode pixel data, and the upload is rejected as soon as a limit is
+    exceeded. The content hash used for deduplication is computed on the
+    way.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = settings.RECIPE_IMAGE_MAX_BYTES
+        self.max_pixels = settings.RECIPE_IMAGE_MAX_PIXELS
+        self.max_header_bytes = settings.RECIPE_IMAGE_MAX_HEADER_BYTES
+        self.formats = settings.RECIPE_IMAGE_FORMATS
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > self.max_bytes + MULTIPART_OVERHEAD:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b""
+        self.hasher = hashlib.sha256()
+        self.file = StreamedImageFile(
+            self._upload_directory(), self.file_name, self.content_type,
+            self.charset, self.content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_bytes:
+            self._abort()
+            raise UploadTooLarge()
+
+        if self.file.image_format is None:
+            self._read_header(raw_data)
+
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.file.image_format is None:
+            self._abort()
+            self._invalid("Upload a valid image.")
+
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.hasher.hexdigest()
+        return self.file
+
+    def _read_header(self, raw_data):
+        """Identify the image from the bytes received so far
+
+        :param raw_data:
+        :return:
+        """
+        self.header += raw_data
+        try:
+            with Image.open(BytesIO(self.header)) as image:
+                image_format, size = image.format, image.size
+        except Image.DecompressionBombError:
+            self._abort()
+            self._invalid("Image dimensions are too large.")
+        except (OSError, SyntaxError, ValueError):
+            if len(self.header) >= self.max_header_bytes:
+                self._abort()
+                self._invalid("Upload a valid image.")
+            return
+
+        self.header = b""
+        if image_format not in self.formats:
+            self._abort()
+            self._invalid(f"Unsupported image format {image_format}.")
+        if size[0] * size[1] > self.max_pixels:
+            self._abort()
+            self._invalid("Image dimensions are too large.")
+
+        self.file.image_format = image_format
+        self.file.image_size = size
+
+    def _upload_directory(self):
+        """Return the base directory of the recipe image layout
+
+        :return:
+        """
+        try:
+            directory = default_storage.path(RECIPE_IMAGE_DIR)
+        except NotImplementedError:
+            return settings.FILE_UPLOAD_TEMP_DIR
+
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def _abort(self):
+        self.file.close()
+
+    def _invalid(self, message):
+        raise serializers.ValidationError({self.field_name: [message]})
+
+
+def use_image_upload_handler(request):
+    """Stream the files of this request through BoundedImageUploadHandler
+
+    Must run before ``request.data`` is first accessed.
+
+    :param request:
+    :return:
+    """
+    request._request.upload_handlers = [
+        BoundedImageUploadHandler(request._request)]
@@ -9,6 +9,15 @@ router.register("recipes", views.RecipeViewSet)
 
 app_name = "recipe"
 
+# The async read endpoints come first so the router's detail routes do not
+# take "async" for a primary key.
 urlpatterns = [
+    path("recipes/async/", views.recipe_list_async,
+         name="recipe-list-async"),
+    path("recipes/async/<int:pk>/", views.recipe_detail_async,
+         name="recipe-detail-async"),
+    path("tags/async/", views.tag_list_async, name="tag-list-async"),
+    path("ingredients/async/", views.ingredient_list_async,
+         name="ingredient-list-async"),
     path('', include(router.urls))
 ]
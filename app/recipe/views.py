@@ -1,20 +1,45 @@
+import asyncio
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import HttpResponse, HttpResponseNotAllowed, \
+    StreamingHttpResponse
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, NotAuthenticated, \
+    NotFound
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework.response import Response
 
-from core.models import Tag, Ingredient, Recipe
-from recipe import serializers
-
-
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+from core.aiodb import fetch_values
+from core.models import Tag, Ingredient, Recipe, RecipeTag, \
+    RecipeIngredient
+from core.search import search_recipes
+from core.timing import TimedViewMixin, measure
+from recipe import filters, serializers
+from recipe.bulk import bulk_save_recipes
+from recipe.cache import CachedListMixin
+from recipe.compiled import CompiledListMixin, get_compiled
+from recipe.conditional import ConditionalListMixin, \
+    ConditionalRetrieveMixin
+from recipe.export import EXPORT_FORMATS, render_export
+from recipe.uploads import use_image_upload_handler
+from user.authentication import CachedTokenAuthentication
+
+
+class BaseRecipeAttrViewSet(TimedViewMixin,
+                            ConditionalListMixin,
+                            CachedListMixin,
+                            CompiledListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Generic base viewset class
 
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
@@ -32,6 +57,28 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         """
         serializer.save(user=self.request.user)
 
+    @action(methods=["POST"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        """Get or create several things by name in one round trip
+
+        :param request:
+        :return:
+        """
+        data = request.data
+        if isinstance(data, list):
+            data = {"names": data}
+
+        serializer = serializers.NameListSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        names = serializer.validated_data["names"]
+        found = self.queryset.model.objects.bulk_get_or_create(
+            request.user, names)
+
+        return Response([
+            {"id": found[name][0], "name": found[name][1]} for name in names
+        ])
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database
@@ -49,43 +96,65 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(TimedViewMixin,
+                    ConditionalListMixin,
+                    ConditionalRetrieveMixin,
+                    CachedListMixin,
+                    CompiledListMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in database
 
     """
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
-    def _params_to_ints(self, qs):
-        """Convert a list of string ids to a list of integers
-
-        :param qs:
-        :return:
-        """
-        return [int(str_id) for str_id in qs.split(",")]
-
     def get_queryset(self):
         """Filter queryset appropriately
 
         :return:
         """
-        tags = self.request.query_params.get("tags")
-        ingredients = self.request.query_params.get("ingredients")
+        queryset = filters.filter_by_query_params(
+            self.queryset, self.request.query_params, (
+                ("tags", RecipeTag, "tag_id"),
+                ("ingredients", RecipeIngredient, "ingredient_id"),
+            ))
 
-        queryset = self.queryset
+        queryset = queryset.filter(user=self.request.user)
 
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+        search = self.request.query_params.get("search")
+        if search:
+            queryset = search_recipes(queryset, search)
+        else:
+            queryset = queryset.order_by("-title")
 
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        return self._prefetch_for_action(queryset)
 
-        queryset = queryset.filter(user=self.request.user).order_by(
-            "-title")
+    def _prefetch_for_action(self, queryset):
+        """Prefetch the M2M relations needed by the action's serializer
+
+        Only the columns the serializer renders are loaded, so listing or
+        retrieving recipes costs a fixed number of queries. Related objects
+        come in id order, which the compiled list serializer relies on.
+
+        :param queryset:
+        :return:
+        """
+        if self.action == "retrieve":
+            return queryset.prefetch_related(
+                Prefetch("ingredients", queryset=Ingredient.objects.only(
+                    "id", "name").order_by("id")),
+                Prefetch("tags", queryset=Tag.objects.only(
+                    "id", "name").order_by("id")),
+            )
+        elif self.action in ("list", "update", "partial_update"):
+            return queryset.prefetch_related(
+                Prefetch("ingredients", queryset=Ingredient.objects.only(
+                    "id").order_by("id")),
+                Prefetch("tags", queryset=Tag.objects.only(
+                    "id").order_by("id")),
+            )
 
         return queryset
 
@@ -109,14 +178,85 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    @action(methods=["POST"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        """Create or update a batch of recipes
+
+        :param request:
+        :return:
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {"detail": "Expected a list of recipes."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(items) > settings.RECIPE_BULK_MAX_ITEMS:
+            return Response(
+                {"detail": f"At most {settings.RECIPE_BULK_MAX_ITEMS} "
+                           f"recipes per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = bulk_save_recipes(
+            request.user, items, serializers.RecipeSerializer,
+            self.get_serializer_context())
+
+        failed = sum(1 for result in results if "errors" in result)
+        if not failed:
+            code = status.HTTP_200_OK
+        elif failed == len(results):
+            code = status.HTTP_400_BAD_REQUEST
+        else:
+            code = status.HTTP_207_MULTI_STATUS
+
+        return Response({"results": results}, status=code)
+
+    @action(methods=["GET"], detail=False, url_path="export")
+    def export(self, request):
+        """Stream every matching recipe as NDJSON or CSV
+
+        The ``type`` query parameter picks the format; the list filters and
+        search apply as usual. Rows are read from a server-side cursor and
+        written as they are rendered, so memory stays flat however many
+        recipes there are.
+
+        :param request:
+        :return:
+        """
+        export_format = request.query_params.get("type", "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"detail": f"Unknown export type, expected one of "
+                           f"{', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # The rows are read after the response has left the middleware, so
+        # the database routed to for this request is fixed now.
+        queryset = self.get_queryset()
+        response = StreamingHttpResponse(
+            render_export(queryset.using(queryset.db), export_format),
+            content_type=f"{EXPORT_FORMATS[export_format]}; charset=utf-8")
+        response["Content-Disposition"] = \
+            f'attachment; filename="recipes.{export_format}"'
+        return response
+
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe
 
+        The file is streamed to disk within the configured byte and pixel
+        limits, and shared with other recipes uploading the same content.
+        Variants of new content are rendered in the background, so the
+        response may list no variants yet.
+
         :param request:
         :param pk:
         :return:
         """
+        use_image_upload_handler(request)
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
@@ -131,3 +271,160 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+def _json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    """Render data the way the DRF views do
+
+    :param data:
+    :param status_code:
+    :param headers:
+    :return:
+    """
+    response = HttpResponse(
+        JSONRenderer().render(data), status=status_code,
+        content_type="application/json")
+    for name, value in (headers or {}).items():
+        response[name] = value
+
+    return response
+
+
+async def _run_async_view(request, viewset_class, action_name, handler,
+                          **kwargs):
+    """Authenticate a GET request and run an async handler for a viewset
+
+    The viewset is only used to build the queryset, serializer context and
+    paginator, so filtering and scoping match its sync actions. API errors
+    are rendered as DRF's exception handler would.
+
+    :param request:
+    :param viewset_class:
+    :param action_name:
+    :param handler: coroutine function taking the viewset instance
+    :param kwargs: URL kwargs
+    :return:
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+
+    authenticator = CachedTokenAuthentication()
+    try:
+        with measure("auth"):
+            credentials = await authenticator.authenticate_async(request)
+        if credentials is None:
+            raise NotAuthenticated()
+
+        drf_request = Request(request)
+        drf_request.user, drf_request.auth = credentials
+        view = viewset_class(
+            request=drf_request, action=action_name, format_kwarg=None,
+            args=(), kwargs=kwargs)
+
+        return await handler(view)
+    except APIException as exc:
+        data = exc.detail if isinstance(exc.detail, (list, dict)) \
+            else {"detail": exc.detail}
+        response = _json_response(data, exc.status_code)
+        if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+            response["WWW-Authenticate"] = \
+                authenticator.authenticate_header(request)
+        return response
+
+
+async def _list(view):
+    """Return a keyset page of the viewset's list through the async pool
+
+    :param view:
+    :return:
+    """
+    queryset = view.filter_queryset(view.get_queryset())
+    compiled = get_compiled(view.get_serializer_class())
+    rows = compiled.values(queryset, queryset.query.order_by)
+
+    paginator = view.paginator
+    if paginator is None:
+        rows = await fetch_values(rows)
+        headers = None
+    else:
+        rows = paginator.get_page(await fetch_values(
+            paginator.get_page_queryset(rows, view.request)))
+        headers = paginator.get_link_headers()
+
+    with measure("serializer"):
+        data = compiled.to_representation(
+            rows, view.get_serializer_context())
+
+    return _json_response(data, headers=headers)
+
+
+async def _retrieve(view):
+    """Return a recipe with its tags and ingredients through the async pool
+
+    The recipe row is read first, then the tags and ingredients are fetched
+    concurrently on two pooled connections.
+
+    :param view:
+    :return:
+    """
+    compiled = get_compiled(serializers.RecipeSerializer)
+    rows = await fetch_values(compiled.values(
+        view.get_queryset().filter(pk=view.kwargs["pk"])))
+    if not rows:
+        raise NotFound()
+
+    with measure("serializer"):
+        recipe = compiled.to_representation(
+            rows, view.get_serializer_context())[0]
+    recipe["ingredients"], recipe["tags"] = await asyncio.gather(
+        fetch_values(Ingredient.objects.filter(
+            pk__in=recipe["ingredients"]).order_by("id").values(
+            "id", "name")),
+        fetch_values(Tag.objects.filter(
+            pk__in=recipe["tags"]).order_by("id").values("id", "name")),
+    )
+
+    return _json_response(recipe)
+
+
+async def recipe_list_async(request):
+    """List recipes without blocking the event loop
+
+    Natively async under ASGI: token authentication and queries run through
+    core.aiodb instead of a thread hop. Supports the sync list's filters,
+    search and keyset pagination; conditional GET and the response cache
+    stay with the sync endpoint.
+
+    :param request:
+    :return:
+    """
+    return await _run_async_view(request, RecipeViewSet, "list", _list)
+
+
+async def recipe_detail_async(request, pk):
+    """Retrieve a recipe without blocking the event loop
+
+    :param request:
+    :param pk:
+    :return:
+    """
+    return await _run_async_view(
+        request, RecipeViewSet, "retrieve", _retrieve, pk=pk)
+
+
+async def tag_list_async(request):
+    """List tags without blocking the event loop
+
+    :param request:
+    :return:
+    """
+    return await _run_async_view(request, TagViewSet, "list", _list)
+
+
+async def ingredient_list_async(request):
+    """List ingredients without blocking the event loop
+
+    :param request:
+    :return:
+    """
+    return await _run_async_view(request, IngredientViewSet, "list", _list)
@@ -0,0 +1,239 @@
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, \
+    get_authorization_header
+from django.utils.translation import ugettext_lazy as _
+
+from core.aiodb import fetch_instances
+
+CACHE_ALIAS = "api"
+CACHE_PREFIX = "auth:token:"
+
+
+def _setting(name, default):
+    return getattr(settings, "AUTH_TOKEN_CACHE", {}).get(name, default)
+
+
+class LocalTTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire
+
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired
+
+        :param key:
+        :return:
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used when full
+
+        :param key:
+        :param value:
+        :return:
+        """
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LocalTTLCache(
+    max_size=_setting("LOCAL_SIZE", 1024),
+    ttl=_setting("LOCAL_TTL", 30),
+)
+
+
+def invalidate_token(key):
+    """Drop a token from the local and shared caches
+
+    Other processes' local caches keep the entry until LOCAL_TTL expires.
+
+    :param key:
+    :return:
+    """
+    local_cache.delete(key)
+    caches[CACHE_ALIAS].delete(CACHE_PREFIX + key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that avoids the token/user query when cached
+
+    Lookups go through a per-process LRU, then the shared cache, and only
+    then to the database. Tokens are invalidated when deleted and when their
+    user is saved, which covers deactivation.
+
+    The caches only hold the user's id and is_active flag, never credential
+    hashes. Cache hits return a user with just those fields loaded; the
+    others are loaded from the database when first accessed.
+    """
+
+    def authenticate(self, request):
+        """Return the (user, token) pair for the request, or None
+
+        :param request:
+        :return:
+        """
+        key = self.get_token_key(request)
+        return None if key is None else self.authenticate_credentials(key)
+
+    async def authenticate_async(self, request):
+        """Return the (user, token) pair without blocking the event loop
+
+        Local cache hits never leave the loop. The shared cache is read on a
+        worker thread and the database through core.aiodb.
+
+        :param request: Django or DRF request
+        :return:
+        """
+        key = self.get_token_key(request)
+        if key is None:
+            return None
+
+        entry = local_cache.get(key)
+        if entry is None:
+            entry = await sync_to_async(_shared_get, thread_sensitive=False)(
+                key)
+            if entry is None:
+                user, token = await self._fetch_credentials(key)
+                entry = _cache_entry(user)
+                await sync_to_async(_shared_set, thread_sensitive=False)(
+                    key, entry)
+            local_cache.set(key, entry)
+
+        return self._check_entry(key, entry)
+
+    def get_token_key(self, request):
+        """Return the token key from the Authorization header, or None
+
+        :param request:
+        :return:
+        """
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            msg = _('Invalid token header. No credentials provided.')
+            raise exceptions.AuthenticationFailed(msg)
+        elif len(auth) > 2:
+            msg = _('Invalid token header. '
+                    'Token string should not contain spaces.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            msg = _('Invalid token header. '
+                    'Token string should not contain invalid characters.')
+            raise exceptions.AuthenticationFailed(msg)
+
+    def authenticate_credentials(self, key):
+        """Return the (user, token) pair for a token key
+
+        :param key:
+        :return:
+        """
+        entry = local_cache.get(key)
+
+        if entry is None:
+            entry = _shared_get(key)
+            if entry is None:
+                user, token = super().authenticate_credentials(key)
+                entry = _cache_entry(user)
+                _shared_set(key, entry)
+            local_cache.set(key, entry)
+
+        return self._check_entry(key, entry)
+
+    async def _fetch_credentials(self, key):
+        """Load a token and its user through the async connection pool
+
+        :param key:
+        :return:
+        """
+        tokens = await fetch_instances(self.get_model().objects.filter(
+            key=key))
+        if not tokens:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        token = tokens[0]
+        users = await fetch_instances(get_user_model().objects.filter(
+            pk=token.user_id))
+        if not users:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        token.user = users[0]
+        return token.user, token
+
+    def _check_entry(self, key, entry):
+        """Return the (user, token) pair of an active user's cache entry
+
+        Each request gets its own instances, so none can mutate another's.
+
+        :param key:
+        :param entry: (user id, is_active) as stored by _cache_entry
+        :return:
+        """
+        user_id, is_active = entry
+        if not is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+
+        user_model = get_user_model()
+        user = user_model.from_db(
+            None, [user_model._meta.pk.attname, "is_active"],
+            [user_id, is_active])
+        token = self.get_model().from_db(
+            None, ["key", "user_id"], [key, user_id])
+        token.user = user
+        return user, token
+
+
+def _cache_entry(user):
+    return user.pk, user.is_active
+
+
+def _shared_get(key):
+    return caches[CACHE_ALIAS].get(CACHE_PREFIX + key)
+
+
+def _shared_set(key, entry):
+    caches[CACHE_ALIAS].set(
+        CACHE_PREFIX + key, entry, _setting("SHARED_TTL", 300))
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+
+
+class PoolSaturated(Exception):
+    """Raised when the hashing pool cannot accept more work"""
+
+
+class BoundedHashPool:
+    """Size-limited thread pool for password hashing
+
+    PBKDF2 runs in OpenSSL with the GIL released, so a few threads keep the
+    CPU busy while the event loop keeps serving other requests. At most
+    ``workers`` hashes run at once and at most ``queue_size`` wait; further
+    submissions are rejected so a burst of logins cannot queue unbounded
+    work.
+    """
+
+    def __init__(self, workers, queue_size):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._submitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool and return its result
+
+        :param fn:
+        :param args:
+        :return:
+        """
+        with self._lock:
+            if self._pending >= self.capacity:
+                self._rejected += 1
+                raise PoolSaturated()
+            self._pending += 1
+            self._submitted += 1
+
+        enqueued = time.monotonic()
+
+        def job():
+            waited = time.monotonic() - enqueued
+            with self._lock:
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return fn(*args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, job)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+    def stats(self):
+        """Return queueing and back-pressure counters
+
+        :return:
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self._pending,
+                "queued": max(0, self._pending - self.workers),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_avg_ms": (
+                    self._wait_total / self._completed * 1000
+                    if self._completed else 0.0),
+                "wait_max_ms": self._wait_max * 1000,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide hashing pool, creating it on first use
+
+    :return:
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BoundedHashPool(
+                workers=getattr(
+                    settings, "PASSWORD_HASH_WORKERS",
+                    min(4, os.cpu_count() or 1)),
+                queue_size=getattr(settings, "PASSWORD_HASH_QUEUE", 64),
+            )
+
+    return _pool
+
+
+def _get_user(email):
+    user_model = get_user_model()
+    try:
+        return user_model._default_manager.get_by_natural_key(email)
+    except user_model.DoesNotExist:
+        return None
+
+
+async def authenticate_async(email, password):
+    """Return the active user matching the credentials, or None
+
+    The user lookup runs on Django's sync thread and the password check on
+    the bounded hashing pool. Unknown emails hash the password anyway so the
+    response time does not reveal whether the account exists.
+
+    :param email:
+    :param password:
+    :return:
+    """
+    user = await sync_to_async(_get_user)(email)
+    pool = get_pool()
+
+    if user is None:
+        await pool.run(make_password, password)
+        return None
+
+    if not await pool.run(check_password, password, user.password):
+        return None
+
+    return user if user.is_active else None
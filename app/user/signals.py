@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import invalidate_token
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Stop accepting a deleted token from the cache
+
+    :param sender:
+    :param instance:
+    :param kwargs:
+    :return:
+    """
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created=False, raw=False, **kwargs):
+    """Drop cached tokens of a changed (e.g. deactivated) user
+
+    :param sender:
+    :param instance:
+    :param created:
+    :param raw:
+    :param kwargs:
+    :return:
+    """
+    if created or raw:
+        return
+
+    for key in Token.objects.filter(user=instance).values_list(
+            "key", flat=True):
+        invalidate_token(key)
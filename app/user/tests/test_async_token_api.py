@@ -0,0 +1,128 @@
+import asyncio
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from user import hashing
+
+TOKEN_ASYNC_URL = reverse("user:token-async")
+
+
+class AsyncTokenAPITest(TestCase):
+    """Tests for the non-blocking token endpoint
+
+    """
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.payload = {
+            "email": "test@travelperk.com",
+            "password": "testpass"
+        }
+
+    def test_create_token_for_user(self):
+        """Test that a token is returned for valid credentials
+
+        :return:
+        """
+        get_user_model().objects.create_user(**self.payload)
+
+        res = self.client.post(TOKEN_ASYNC_URL, self.payload, format="json")
+
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertIn("token", res.json())
+
+    def test_create_token_invalid_credentials(self):
+        """Test that a wrong password is rejected
+
+        :return:
+        """
+        get_user_model().objects.create_user(**self.payload)
+
+        res = self.client.post(TOKEN_ASYNC_URL, {
+            "email": self.payload["email"],
+            "password": "wrongg"
+        })
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+        self.assertNotIn("token", res.json())
+
+    def test_create_token_inactive_user(self):
+        """Test that an inactive user does not get a token
+
+        :return:
+        """
+        get_user_model().objects.create_user(is_active=False, **self.payload)
+
+        res = self.client.post(TOKEN_ASYNC_URL, self.payload)
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+
+    @patch("user.hashing.make_password")
+    def test_unknown_email_still_hashes(self, mock_make_password):
+        """Test that unknown emails pay for a dummy hash
+
+        :return:
+        """
+        res = self.client.post(TOKEN_ASYNC_URL, self.payload)
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+        mock_make_password.assert_called_once_with(self.payload["password"])
+
+    def test_create_token_missing_field(self):
+        """Test that email and password are required
+
+        :return:
+        """
+        res = self.client.post(TOKEN_ASYNC_URL, {"email": "one"})
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, res.status_code)
+        self.assertIn("password", res.json())
+
+    def test_saturated_pool_rejected(self):
+        """Test that logins are shed with 503 when the pool is full
+
+        :return:
+        """
+        pool = hashing.BoundedHashPool(workers=1, queue_size=0)
+        pool.capacity = 0
+
+        with patch("user.hashing.get_pool", return_value=pool):
+            res = self.client.post(TOKEN_ASYNC_URL, self.payload)
+
+        self.assertEqual(status.HTTP_503_SERVICE_UNAVAILABLE, res.status_code)
+        self.assertIn("Retry-After", res)
+        self.assertEqual(1, pool.stats()["rejected"])
+
+
+class BoundedHashPoolTests(TestCase):
+    """Tests for the bounded hashing pool
+
+    """
+
+    def test_bounded_queue(self):
+        """Test jobs beyond workers plus queue size are rejected
+
+        :return:
+        """
+        pool = hashing.BoundedHashPool(workers=1, queue_size=1)
+
+        async def burst():
+            return await asyncio.gather(
+                *(pool.run(sum, [1, 2]) for _ in range(3)),
+                return_exceptions=True)
+
+        results = asyncio.run(burst())
+
+        self.assertEqual([3, 3], [r for r in results if r == 3])
+        self.assertTrue(
+            any(isinstance(r, hashing.PoolSaturated) for r in results))
+        stats = pool.stats()
+        self.assertEqual(2, stats["completed"])
+        self.assertEqual(1, stats["rejected"])
+        self.assertEqual(0, stats["in_flight"])
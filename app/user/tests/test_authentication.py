@@ -0,0 +1,154 @@
+from django.core.cache import caches
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from user import authentication
+
+ME_URL = reverse("user:me")
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Tests for the cached token authentication
+
+    """
+
+    def setUp(self) -> None:
+        authentication.local_cache.clear()
+        caches[authentication.CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create_user(
+            email="test@travelperk.com",
+            password="password123",
+            name="Test User"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_warm_token_skips_database(self):
+        """Test a cached token authenticates without any query
+
+        :return:
+        """
+        with self.assertNumQueries(2):
+            res = self.client.get(ME_URL)
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+
+        # Only the profile itself is read.
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(status.HTTP_200_OK, res.status_code)
+        self.assertEqual(self.user.email, res.data["email"])
+
+    def test_shared_cache_used_when_local_cold(self):
+        """Test the shared cache is consulted before the database
+
+        :return:
+        """
+        self.client.get(ME_URL)
+        authentication.local_cache.clear()
+
+        with self.assertNumQueries(0):
+            user, token = authentication.CachedTokenAuthentication() \
+                .authenticate_credentials(self.token.key)
+
+        self.assertEqual((self.user.pk, self.token.key),
+                         (user.pk, token.key))
+        self.assertEqual(self.user.pk, token.user_id)
+
+    def test_shared_cache_holds_no_credentials(self):
+        """Test the shared cache only stores the user's id and status
+
+        :return:
+        """
+        self.client.get(ME_URL)
+
+        entry = caches[authentication.CACHE_ALIAS].get(
+            authentication.CACHE_PREFIX + self.token.key)
+
+        self.assertEqual((self.user.pk, True), entry)
+
+    def test_cached_user_loads_fields_on_access(self):
+        """Test fields left out of the cache are read from the database
+
+        :return:
+        """
+        authenticator = authentication.CachedTokenAuthentication()
+        authenticator.authenticate_credentials(self.token.key)
+
+        user, _ = authenticator.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.user.email, user.email)
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token invalidates the cached entry
+
+        :return:
+        """
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, res.status_code)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user invalidates their cached tokens
+
+        :return:
+        """
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, res.status_code)
+
+    def test_profile_update_visible(self):
+        """Test updating the profile is not hidden by the cached user
+
+        :return:
+        """
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {"name": "New Name"})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual("New Name", res.data["name"])
+
+
+class LocalTTLCacheTests(TestCase):
+    """Tests for the bounded local LRU cache
+
+    """
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache never grows past its size
+
+        :return:
+        """
+        cache = authentication.LocalTTLCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(1, cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(3, cache.get("c"))
+
+    def test_entries_expire(self):
+        """Test entries are dropped once their TTL has passed
+
+        :return:
+        """
+        cache = authentication.LocalTTLCache(max_size=2, ttl=-1)
+        cache.set("a", 1)
+
+        self.assertIsNone(cache.get("a"))
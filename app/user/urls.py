@@ -6,5 +6,7 @@ app_name = 'user'
 urlpatterns = [
     path("create/", views.CreateUserView.as_view(), name='create'),
     path("token/", views.CreateAuthTokenView.as_view(), name='token'),
+    path("token/async/", views.create_auth_token_async,
+         name='token-async'),
     path("me/", views.ManageUserView.as_view(), name='me'),
 ]
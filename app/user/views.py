@@ -1,17 +1,28 @@
-from rest_framework import generics, authentication, permissions
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import generics, permissions, serializers
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
+
+from core.timing import TimedViewMixin, measure
+from user.authentication import CachedTokenAuthentication
+from user.hashing import PoolSaturated, authenticate_async
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(TimedViewMixin, generics.CreateAPIView):
     """Create new user in the system
 
     """
     serializer_class = UserSerializer
 
 
-class CreateAuthTokenView(ObtainAuthToken):
+class CreateAuthTokenView(TimedViewMixin, ObtainAuthToken):
     """Create a new auth token for a user
 
     """
@@ -19,17 +30,72 @@ class CreateAuthTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+async def create_auth_token_async(request):
+    """Create a new auth token for a user without blocking a worker
+
+    Runs natively on the event loop under ASGI (app/asgi.py); Django 3.1 only
+    supports async function views. Password hashing happens on a bounded
+    thread pool and when it is saturated the request is rejected with 503
+    instead of queueing without limit.
+
+    :param request:
+    :return:
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse({"detail": "JSON parse error"}, status=400)
+    else:
+        data = request.POST
+
+    try:
+        attrs = AuthTokenSerializer().to_internal_value(data)
+    except serializers.ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+
+    try:
+        with measure("auth"):
+            user = await authenticate_async(
+                attrs["email"], attrs["password"])
+    except PoolSaturated:
+        response = JsonResponse(
+            {"detail": "Too many login attempts, try again shortly."},
+            status=503)
+        response["Retry-After"] = "1"
+        return response
+
+    if user is None:
+        msg = _("Unable to authenticate with provided credentials.")
+        return JsonResponse({"non_field_errors": [msg]}, status=400)
+
+    token, created = await sync_to_async(Token.objects.get_or_create)(
+        user=user)
+
+    return JsonResponse({"token": token.key})
+
+
+# Token clients are not browsers; csrf_exempt() would hide the coroutine
+create_auth_token_async.csrf_exempt = True
+
+
+class ManageUserView(TimedViewMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user
 
     """
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         """Retrieve and return authenticated user
 
+        The cached authentication only loads the user's id, so the profile
+        is read in full here with one query.
+
         :return:
         """
-        return self.request.user
+        return get_user_model().objects.get(pk=self.request.user.pk)